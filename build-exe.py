@@ -25,6 +25,7 @@ def build_command(poetry: bool = False, dist: str = "."):
         "--hidden-import src.backend.tx_cos",
         "--hidden-import src.strategy.compress",
         "--hidden-import src.strategy.increment",
+        "--hidden-import src.strategy.dedup",
         "--hidden-import src.backend.backend_cmd",
         "--hidden-import src.backup.backup_cmd",
         "--hidden-import src.console.console_cmd",
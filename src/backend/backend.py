@@ -36,6 +36,9 @@ class AbstractBackend(metaclass=ABCMeta):
     @abstractmethod
     async def rmdir(self, path: StrPath) -> None: ...
 
+    @abstractmethod
+    async def rmfile(self, path: StrPath) -> None: ...
+
     @abstractmethod
     async def list_dir(
         self, path: StrPath = Path()
@@ -63,6 +66,8 @@ class AbstractBackend(metaclass=ABCMeta):
 
 
 class Backend(AbstractBackend):
+    RMFILE_SUPPORTED: bool = True
+    """是否支持删除单个文件, 不支持时 `rmfile` 抛出 `BackendError`"""
     __mkdir_cache: Set[Path]
 
     @override
@@ -93,6 +98,9 @@ class Backend(AbstractBackend):
     @abstractmethod
     async def _rmdir(self, path: Path) -> None: ...
 
+    @abstractmethod
+    async def _rmfile(self, path: Path) -> None: ...
+
     @abstractmethod
     async def _list_dir(
         self, path: Path = Path()
@@ -164,6 +172,13 @@ class Backend(AbstractBackend):
         self.logger.debug(f"删除目录: {_color(path)}")
         await self._rmdir(path)
 
+    @override
+    async def rmfile(self, path: StrPath) -> None:
+        if isinstance(path, str):
+            path = Path(path)
+        self.logger.debug(f"删除文件: {_color(path)}")
+        await self._rmfile(path)
+
     @override
     async def list_dir(
         self, path: StrPath = "."
@@ -4,7 +4,7 @@ from typing import List, Literal, Tuple, final, override
 from src.utils import Style
 
 from ..backend import Backend, BackendResult
-from .sdk import get_file, list_dir, mkdir, put_file, refresh_token
+from .sdk import delete, get_file, list_dir, mkdir, put_file, refresh_token
 from .sdk.exceptions import BackendError, BaiduError
 
 
@@ -26,6 +26,10 @@ class BaiduBackend(Backend):
         # raise NotImplemented
         ...
 
+    @override
+    async def _rmfile(self, path: Path) -> None:
+        await delete(path)
+
     @override
     async def _list_dir(
         self, path: Path = Path()
@@ -1,3 +1,4 @@
+from .api.delete_api import delete as delete
 from .api.get_file_api import get_file as get_file
 from .api.list_dir_api import list_dir as list_dir
 from .api.mkdir_api import mkdir as mkdir
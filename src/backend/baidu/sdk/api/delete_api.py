@@ -0,0 +1,41 @@
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+from src.utils import Style, run_sync
+
+from ..const import PATH_ROOT
+from ..exceptions import BaiduDeleteError
+from ..openapi_client import ApiClient, ApiException
+from ..openapi_client.api.filemanager_api import FilemanagerApi
+from ..sdk_config import config, get_logger
+
+
+async def filemanager_delete(path: str) -> Dict[str, Any]:
+    with ApiClient() as client:
+        # 接口声明无返回值, 读取原始响应以检查错误码
+        resp = await run_sync(
+            lambda: FilemanagerApi(client).filemanagerdelete(  # type: ignore
+                access_token=config.access_token,
+                _async=0,
+                filelist=json.dumps([path]),
+                _preload_content=False,
+            )
+        )()
+        return json.loads(resp.data)
+
+
+async def delete(path: Path):
+    logger = get_logger("delete").opt(colors=True)
+    logger.debug(f"删除: {Style.PATH_DEBUG(path)}")
+    try:
+        resp = await filemanager_delete((PATH_ROOT / path).as_posix())
+    except (ApiException, ValueError) as err:
+        raise BaiduDeleteError(
+            f"删除 {Style.PATH(path)} 时遇到错误:\n{Style.RED(err)}"
+        ) from err
+
+    if resp["errno"] != 0:
+        raise BaiduDeleteError(
+            f"删除 {Style.PATH(path)} 失败, 错误码: {Style.RED(resp['errno'])}"
+        )
@@ -31,3 +31,7 @@ class BaiduListDirectoryError(BaiduError):
 
 class BaiduGetFileError(BaiduError):
     pass
+
+
+class BaiduDeleteError(BaiduError):
+    pass
@@ -38,6 +38,13 @@ class LocalBackend(Backend):
         except Exception as e:
             raise BackendError(f"删除文件夹时出错: {e!r}") from e
 
+    @override
+    async def _rmfile(self, path: Path) -> None:
+        try:
+            (self.root / path).unlink()
+        except Exception as e:
+            raise BackendError(f"删除文件时出错: {e!r}") from e
+
     @override
     async def _list_dir(
         self, path: Path = Path()
@@ -53,6 +53,7 @@ def solve_params(key: str, *data: Any) -> bytes:
 
 @final
 class ServerBackend(Backend):
+    RMFILE_SUPPORTED = False
     session: ClientSession
     __request_count: int
 
@@ -111,6 +112,11 @@ class ServerBackend(Backend):
             self.logger.error(res.message)
             raise BackendError(f"删除文件夹时出错: {res.message}")
 
+    @override
+    async def _rmfile(self, path: Path) -> None:
+        # 服务端未提供删除单个文件的接口
+        raise BackendError("ServerBackend 不支持删除文件")
+
     @override
     async def _list_dir(
         self, path: Path = Path()
@@ -7,7 +7,7 @@ from src.utils import Style, run_sync
 from ..backend import Backend
 from ..config import parse_config
 from .config import Config
-from .sdk import init_client, get_file, put_file, list_dir, rm_dir
+from .sdk import init_client, get_file, put_file, list_dir, rm_dir, rm_file
 
 config = parse_config(Config)
 init_client(
@@ -29,6 +29,14 @@ class TencentCOSBackend(Backend):
     async def _rmdir(self, path: Path) -> None:
         await run_sync(rm_dir)(path.as_posix())
 
+    @override
+    async def _rmfile(self, path: Path) -> None:
+        try:
+            await run_sync(rm_file)(path)
+        except Exception as e:
+            msg = f"删除文件时出现错误: {e.__class__.__name__} - {e}"
+            raise BackendError(msg) from e
+
     @override
     async def _list_dir(
         self, path: Path = Path()
@@ -1,4 +1,5 @@
 import asyncio
+from typing import Optional
 
 from src.config import BackupConfig
 from src.const.exceptions import RestartBackup, StopOperation
@@ -24,6 +25,7 @@ class Backup(object):
                 try:
                     await self.make_backup()
                     self.logger.success("备份完成")
+                    await self.compact()
                     break
                 except StopOperation as e:
                     # 中止备份
@@ -41,3 +43,42 @@ class Backup(object):
             else:
                 self.logger.error("备份失败: 达到最大重试次数")
                 return
+
+    async def estimate(self) -> None:
+        """预估备份, 不复制, 压缩或上传任何文件"""
+        assert isinstance(self, StrategyProtocol)
+        with self.logger.catch():
+            try:
+                await self.make_estimate()
+                self.logger.success("预估完成")
+            except StopOperation as e:
+                self.logger.warning(f"预估备份错误: {Style.RED(e, False)}")
+
+    async def compact(
+        self, start: Optional[str] = None, end: Optional[str] = None
+    ) -> None:
+        """合并备份
+
+        Args:
+            start (Optional[str]): 合并范围内第一个备份的uuid
+            end (Optional[str]): 合并范围内最后一个备份的uuid.
+                均为 `None` 时按 `compact_after` 自动合并最早的备份
+        """
+        assert isinstance(self, StrategyProtocol)
+        with self.logger.catch():
+            try:
+                if start is None or end is None:
+                    await self.compact_history()
+                else:
+                    await self.make_compact(start, end)
+            except StopOperation as e:
+                self.logger.warning(f"合并备份错误: {Style.RED(e, False)}")
+
+    async def prune(self) -> None:
+        """按保留规则删除过期的备份"""
+        assert isinstance(self, StrategyProtocol)
+        with self.logger.catch():
+            try:
+                await self.make_prune()
+            except StopOperation as e:
+                self.logger.warning(f"删除过期备份错误: {Style.RED(e, False)}")
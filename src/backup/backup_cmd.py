@@ -24,6 +24,56 @@ async def cmd_backup(args: List[str]) -> None:
     await BackupHost.run_backup(backup)
 
 
+@Console.register("estimate", "预估备份", arglen=[0, 1])
+async def cmd_estimate(args: List[str]) -> None:
+    if not args:
+        command = Console.styled_command("estimate", "<name>")
+        cmd_estimate.logger.info(
+            f"{command} - 预估备份的文件数量与大小, 不压缩或上传任何文件"
+        )
+        return
+
+    [name] = args
+    backup = find_backup(name)
+
+    if backup is None:
+        raise CommandExit(f"未找到名为 [{Style.CYAN(name)}] 的备份项")
+
+    await BackupHost.run_estimate(backup)
+
+
+@Console.register("compact", "合并备份", arglen=[0, 3])
+async def cmd_compact(args: List[str]) -> None:
+    if not args:
+        command = Console.styled_command("compact", "<name>", "<start>", "<end>")
+        cmd_compact.logger.info(f"{command} - 将 uuid 从 start 至 end 的备份合并为一个")
+        return
+
+    name, start, end = args
+    backup = find_backup(name)
+
+    if backup is None:
+        raise CommandExit(f"未找到名为 [{Style.CYAN(name)}] 的备份项")
+
+    await BackupHost.run_compact(backup, start, end)
+
+
+@Console.register("prune", "按保留规则删除过期备份", arglen=[0, 1])
+async def cmd_prune(args: List[str]) -> None:
+    if not args:
+        command = Console.styled_command("prune", "<name>")
+        cmd_prune.logger.info(f"{command} - 按保留规则删除过期备份")
+        return
+
+    [name] = args
+    backup = find_backup(name)
+
+    if backup is None:
+        raise CommandExit(f"未找到名为 [{Style.CYAN(name)}] 的备份项")
+
+    await BackupHost.run_prune(backup)
+
+
 @Console.register("stop", "退出程序", arglen=0)
 async def cmd_stop_host(_) -> None:
     await BackupHost.stop()
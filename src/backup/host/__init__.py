@@ -1,3 +1,6 @@
 from ._host import start as start
 from ._host import run_backup as run_backup
+from ._host import run_compact as run_compact
+from ._host import run_estimate as run_estimate
+from ._host import run_prune as run_prune
 from ._host import stop as stop
\ No newline at end of file
@@ -1,10 +1,10 @@
 import asyncio
 from datetime import datetime
-from typing import Dict
+from typing import Awaitable, Callable, Dict
 
 from src.config import BackupConfig, config
 from src.log import get_logger
-from src.utils import Style
+from src.utils import WATCH_SUPPORTED, Style, Watcher, get_journal
 
 from ..backup import Backup
 
@@ -12,6 +12,9 @@ __logger = get_logger("BackupHost").opt(colors=True)
 __last_run: Dict[str, datetime] = {}
 __running: bool = False
 __backup_task: Dict[str, asyncio.Task[None]] = {}
+__last_prune: Dict[str, datetime] = {}
+__watchers: Dict[str, Watcher] = {}
+PRUNE_INTERVAL = 3600
 
 
 @__logger.catch
@@ -23,6 +26,66 @@ async def run_backup(config: BackupConfig) -> None:
     __backup_task[config.name] = task
 
 
+def __schedule(
+    config: BackupConfig, name: str, job: Callable[[], Awaitable[None]]
+) -> None:
+    """在备份任务槽中创建任务, 避免同时修改备份记录
+
+    已有任务未完成时, 新任务排在其后执行, 不阻塞调用方
+    """
+    prev = __backup_task.get(config.name)
+
+    @__logger.catch
+    async def run() -> None:
+        if prev is not None and not prev.done():
+            __logger.info(f"等待备份任务完成: [{Style.CYAN(config.name)}]")
+            await asyncio.wait({prev})
+        __logger.info(f"创建{name}任务: [{Style.CYAN(config.name)}]")
+        await job()
+
+    __backup_task[config.name] = asyncio.create_task(run())
+
+
+@__logger.catch
+async def run_compact(config: BackupConfig, start: str, end: str) -> None:
+    async def compact() -> None:
+        backup = await Backup.create(config)
+        await backup.compact(start, end)
+
+    __schedule(config, "合并", compact)
+
+
+@__logger.catch
+async def run_prune(config: BackupConfig) -> None:
+    __last_prune[config.name] = datetime.now()
+
+    async def prune() -> None:
+        backup = await Backup.create(config, silent=True)
+        await backup.prune()
+
+    __schedule(config, "过期备份清理", prune)
+
+
+@__logger.catch
+async def run_estimate(config: BackupConfig) -> None:
+    # 预估同样会更新本地的文件状态缓存, 与备份任务共用任务槽
+    async def estimate() -> None:
+        backup = await Backup.create(config, silent=True)
+        await backup.estimate()
+
+    __schedule(config, "预估", estimate)
+
+
+def __need_prune(backup: BackupConfig) -> bool:
+    if not backup.retention.enabled:
+        return False
+    last_prune = __last_prune.get(backup.name)
+    return (
+        last_prune is None
+        or (datetime.now() - last_prune).total_seconds() >= PRUNE_INTERVAL
+    )
+
+
 @__logger.catch()
 async def __run() -> None:
     while __running:
@@ -42,12 +105,39 @@ async def __run() -> None:
                 or (last_run - now).microseconds / 1000 > backup.interval
             ):
                 await run_backup(backup)
+            elif __need_prune(backup):
+                # 在备份间隔内定期清理过期备份
+                await run_prune(backup)
         await asyncio.sleep(1)
 
 
+async def __start_watchers() -> None:
+    for backup in config.backup_list:
+        if not backup.watch or backup.mode != "increment":
+            continue
+        if not WATCH_SUPPORTED:
+            __logger.warning(f"[{Style.CYAN(backup.name)}] 当前系统不支持监视文件变化")
+            continue
+
+        watcher = Watcher(
+            backup.local_path, get_journal(backup.name), backup.filters.compile()
+        )
+        try:
+            await watcher.start()
+        except OSError as e:
+            __logger.warning(
+                f"[{Style.CYAN(backup.name)}] 监视文件变化失败, "
+                f"将完整遍历本地目录: {Style.RED(e)}"
+            )
+            continue
+        __watchers[backup.name] = watcher
+        __logger.info(f"开始监视文件变化: [{Style.CYAN(backup.name)}]")
+
+
 async def start() -> None:
     global __running, __task
     __logger.info(f"正在初始化 {Style.GREEN('BackupHost')} ...")
+    await __start_watchers()
     __logger.info("开始备份...")
     __running = True
     await __run()
@@ -63,4 +153,7 @@ async def stop() -> None:
     for task in __backup_task.values():
         while not task.done():
             await asyncio.sleep(0.05)
+    for watcher in __watchers.values():
+        watcher.stop()
+    __watchers.clear()
     __logger.info(f"{Style.GREEN('BackupHost')} 已终止")
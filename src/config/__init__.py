@@ -1,6 +1,10 @@
 from .config import Config as Config
 from .config import init_config as _init
 from .config import BackupConfig as BackupConfig
+from .config import CompressionConfig as CompressionConfig
+from .config import DeltaConfig as DeltaConfig
+from .config import FilterConfig as FilterConfig
+from .config import RetentionConfig as RetentionConfig
 from .config_model import ConfigModel as ConfigModel
 
 config = _init()
@@ -5,17 +5,153 @@ from typing import List
 
 from pydantic import BaseModel, Field
 
-from src.const import BackupMode
-from src.utils import Style
+from src.const import BackupMode, HashAlgorithm, RestoreMode, StagingMode
+from src.utils import HASH_INSTALL_HINT, PathFilter, Style, hash_supported
 
 from .config_model import ConfigModel
 
 
+class RetentionConfig(BaseModel):
+    keep_last: int = Field(default=0)
+    """保留最近的备份数量"""
+    hourly: int = Field(default=0)
+    """保留最近若干小时中每小时的最后一个备份"""
+    daily: int = Field(default=0)
+    """保留最近若干天中每天的最后一个备份"""
+    weekly: int = Field(default=0)
+    """保留最近若干周中每周的最后一个备份"""
+    max_age: int = Field(default=0)
+    """备份的最长保留天数, 0 表示不限制"""
+
+    @property
+    def enabled(self) -> bool:
+        return any(
+            (self.keep_last, self.hourly, self.daily, self.weekly, self.max_age)
+        )
+
+
+DEFAULT_STORE_EXTENSIONS = {
+    *("7z", "zip", "rar", "gz", "tgz", "bz2", "xz", "zst", "lz4", "cab"),
+    *("jar", "apk", "whl", "docx", "xlsx", "pptx", "odt", "epub"),
+    *("jpg", "jpeg", "png", "gif", "webp", "heic", "avif"),
+    *("mp3", "aac", "m4a", "ogg", "opus", "flac", "wma"),
+    *("mp4", "m4v", "mkv", "webm", "avi", "mov", "wmv", "flv"),
+}
+
+
+class CompressionConfig(BaseModel):
+    level: int = Field(default=5)
+    """压缩等级 (-mx), 0-9, 0 表示仅存储"""
+    method: str = Field(default="LZMA2")
+    """压缩算法 (-m0), 如 LZMA2, LZMA, PPMd, BZip2"""
+    threads: int = Field(default=0)
+    """压缩线程数 (-mmt), 0 表示由 7z 自动决定"""
+    solid_block: str = Field(default="")
+    """固实块大小 (-ms), 如 "64m", "off" 表示关闭固实压缩, 为空时使用 7z 默认值"""
+    store_extensions: List[str] = Field(
+        default_factory=lambda: sorted(DEFAULT_STORE_EXTENSIONS)
+    )
+    """仅存储不压缩的文件扩展名 (increment模式)"""
+    entropy_threshold: float = Field(default=7.5)
+    """
+    采样数据的信息熵 (比特/字节) 不低于该值的文件仅存储 (increment模式)
+    ----
+    最大值为 8, 0 表示不采样
+    """
+
+    def switches(self) -> List[str]:
+        """对应的 7z 压缩参数"""
+        if self.level <= 0:
+            return ["-mx0"]
+
+        args = [f"-mx{self.level}", f"-m0={self.method}"]
+        if self.threads > 0:
+            args.append(f"-mmt{self.threads}")
+        if self.solid_block:
+            args.append(f"-ms={self.solid_block}")
+        return args
+
+
+class DeltaConfig(BaseModel):
+    min_size: int = Field(default=0)
+    """不小于该值 (MB) 的修改文件只备份与上次备份的差异, 0 表示不启用"""
+    block_size: int = Field(default=64)
+    """比较差异的块大小 (KB)"""
+    max_chain: int = Field(default=10)
+    """连续备份差异的最大次数, 超过后备份完整文件"""
+
+
+class FilterConfig(BaseModel):
+    exclude: List[str] = Field(default_factory=list)
+    """
+    排除的路径, 语法同 gitignore
+    ----
+    如 `node_modules/`, `*.tmp`, `/build/`, `.git/objects/`, `!keep.tmp`
+    """
+    include: List[str] = Field(default_factory=list)
+    """仅备份匹配的文件, 语法同 `exclude`, 为空时备份所有文件"""
+    max_size: int = Field(default=0)
+    """跳过大于该值的文件 (MB), 0 表示不限制"""
+
+    def compile(self) -> PathFilter:
+        """编译为过滤规则"""
+        return PathFilter(self.exclude, self.include, self.max_size * 1024 * 1024)
+
+
 class BackupConfig(BaseModel):
     name: str
     mode: BackupMode
     local_path: Path
     interval: int
+    hash_algo: HashAlgorithm = Field(default="md5")
+    """计算文件哈希值使用的算法"""
+    hash_workers: int = Field(default=0)
+    """计算文件哈希值的线程数, 0 表示自动"""
+    paranoid: bool = Field(default=False)
+    """
+    忽略本地文件状态缓存, 强制重新计算所有文件的哈希值
+    ----
+    compress模式下以文件内容而非大小与修改时间计算本地目录的指纹
+    """
+    checkpoint_interval: int = Field(default=50)
+    """每隔多少次备份上传一次完整备份状态, 0 表示不上传"""
+    staging: StagingMode = Field(default="list")
+    """
+    increment模式暂存待压缩文件的方式
+    ----
+    * list: 将文件列表传递给 7z, 直接压缩本地文件, 不占用额外空间
+    * link: 通过 reflink/硬链接 暂存文件, 不支持时复制文件
+    * copy: 复制文件到缓存目录
+    * stream: 计算哈希值的同时复制新增的文件到缓存目录, 新增的文件只读取一次;
+      已备份的文件比对后只复制内容变化的文件
+    """
+    compression: CompressionConfig = Field(default_factory=CompressionConfig)
+    """压缩参数"""
+    filters: FilterConfig = Field(default_factory=FilterConfig)
+    """文件过滤规则 (increment, compress模式)"""
+    delta: DeltaConfig = Field(default_factory=DeltaConfig)
+    """
+    increment模式下较大文件的差异备份
+    ----
+    适用于追加写入的日志, 数据库等文件, 恢复时依次应用差异
+    """
+    watch: bool = Field(default=False)
+    """
+    increment模式下在后台监视本地文件变化 (inotify, 仅 Linux)
+    ----
+    备份时只检查发生变化的路径, 无法确定变化时完整遍历本地目录
+    """
+    compact_after: int = Field(default=0)
+    """备份数量超过该值时, 在备份完成后将最早的备份合并, 0 表示不自动合并"""
+    retention: RetentionConfig = Field(default_factory=RetentionConfig)
+    """备份保留规则, 均为 0 时保留所有备份"""
+    restore_mode: RestoreMode = Field(default="replace")
+    """
+    恢复备份的方式
+    ----
+    * replace: 删除本地路径后替换为恢复结果
+    * inplace: 仅下载并覆盖与备份不一致的文件, 删除备份中不存在的文件
+    """
 
     @staticmethod
     @functools.cache
@@ -54,4 +190,11 @@ def init_config() -> Config:
     if is_experiment:
         logger.warning("启用实验性功能可能会产生意料之外的结果, 请谨慎使用")
 
+    for item in config.backup_list:
+        if not hash_supported(item.hash_algo):
+            logger.error(
+                f"备份项 {Style.GREEN(item.name)} 使用的哈希算法 "
+                f"{Style.YELLOW(item.hash_algo)} 不可用, 请先执行 {HASH_INSTALL_HINT}"
+            )
+
     return config
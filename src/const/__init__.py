@@ -7,11 +7,15 @@ VERSION = "0.4.0"
 PATH = _path
 
 type BackendType = _t.Literal["local", "server", "baidu", "tx_cos"]
-type BackupMode = _t.Literal["increment", "compress"]
-type BackupUpdateType = _t.Literal["file", "dir", "del"]
+type BackupMode = _t.Literal["increment", "compress", "dedup"]
+type BackupUpdateType = _t.Literal["file", "dir", "del", "copy", "delta"]
+type HashAlgorithm = _t.Literal["md5", "blake2b", "xxhash"]
+type RestoreMode = _t.Literal["replace", "inplace"]
+type StagingMode = _t.Literal["list", "link", "copy", "stream"]
 type StrPath = _t.Union[str, _p.Path]
 
-BackupModeSet: _t.Set[str] = {"increment", "compress"}
+BackupModeSet: _t.Set[str] = {"increment", "compress", "dedup"}
+HashAlgorithmSet: _t.Set[str] = {"md5", "blake2b", "xxhash"}
 
 
 def __init() -> None:
@@ -1,16 +1,23 @@
 import pathlib as _p
+import typing as _t
 
 from pydantic import BaseModel
 
 import src
 from src.config import BackupConfig
-from src.const import BackupUpdateType
+from src.const import BackupUpdateType, HashAlgorithm
 
 
 class BackupRecord(BaseModel):
     uuid: str
     timestamp: float
     timestr: str
+    checkpoint: bool = False
+    """该备份是否上传了合并至此的完整备份状态 (increment模式)"""
+    merged: _t.List[str] = []
+    """合并至该备份的已删除备份的uuid (increment模式)"""
+    fingerprint: str = ""
+    """备份时本地目录的指纹, 与上次备份相同时跳过备份 (compress模式)"""
 
 
 class BackupUpdate(BaseModel):
@@ -21,14 +28,64 @@ class BackupUpdate(BaseModel):
     * file: 文件
     * dir: 文件夹
     * del: 移除
+    * copy: 内容与已备份的文件相同, 不再重复压缩, 见 `source`
+    * delta: 压缩包中保存与基准版本的差异, 见 `source`
     """
     path: _p.Path
     """相对路径"""
     md5: str
     """
-    * 文件: md5值
+    * 文件/复制/差异: 哈希值, 算法见 `algo`
     * 文件夹/移除: ""
     """
+    algo: HashAlgorithm = "md5"
+    """文件哈希算法, 旧版本备份清单中不存在此字段, 默认为 md5"""
+    source: str = ""
+    """
+    * 复制: 源文件在压缩包中的相对路径 (posix)
+    * 差异: 基准版本的哈希值
+    """
+    source_uuid: str = ""
+    """
+    * 复制: 包含源文件的备份uuid
+    * 差异: 提供基准版本的备份uuid, 基准版本为该备份清单中的同一路径
+    """
+    chain: int = 0
+    """差异: 恢复时需要依次应用的差异数量"""
+
+
+class DedupEntry(BaseModel):
+    type: BackupUpdateType
+    """
+    类型
+    ----
+    * file: 文件
+    * dir: 文件夹
+    """
+    path: _p.Path
+    """相对路径"""
+    size: int = 0
+    """文件大小"""
+    chunks: _t.List[str] = []
+    """按顺序组成文件的数据块哈希值"""
+
+
+class ArchiveBlock(BaseModel):
+    offset: int
+    """在合并后的分卷数据中的偏移 (字节)"""
+    size: int
+    """压缩后大小 (字节)"""
+
+
+class ArchiveIndex(BaseModel):
+    volume_size: int
+    """分卷大小 (字节)"""
+    volumes: _t.List[str]
+    """分卷文件名, 按顺序排列"""
+    blocks: _t.List[ArchiveBlock]
+    """压缩包中的数据块, 按顺序排列"""
+    files: _t.Dict[str, int]
+    """文件相对路径 (posix) -> 所在数据块序号, 空文件为 -1"""
 
 
 def find_backup(name: str) -> BackupConfig | None:
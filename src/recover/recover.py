@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from src.config import BackupConfig
 from src.const.exceptions import StopOperation
 from src.models import BackupRecord
@@ -15,11 +17,22 @@ class Recover(object):
         self.logger.success(f"{Style.GREEN("Recover")} [{Style.CYAN(config.name)}] 初始化成功")
         return self
 
-    async def apply(self, record: BackupRecord) -> None:
+    async def apply(
+        self, record: BackupRecord, patterns: Optional[List[str]] = None
+    ) -> None:
+        """恢复备份
+
+        Args:
+            record (BackupRecord): 备份记录
+            patterns (Optional[List[str]], optional): 仅恢复匹配的路径前缀或通配符
+        """
         assert isinstance(self, StrategyProtocol)
         with self.logger.catch():
             try:
-                await self.make_recovery(record)
+                if patterns:
+                    await self.make_partial_recovery(record, patterns)
+                else:
+                    await self.make_recovery(record)
                 self.logger.success(f"备份 [{Style.CYAN(record.uuid)}] 恢复完成!")
             except StopOperation as e:
                 # 中止恢复
@@ -26,3 +26,23 @@ async def cmd_recover(args: List[str]) -> None:
         return
 
     raise CommandExit(f"未找到 uuid 为 [{Style.CYAN(uuid)}] 的备份")
+
+
+@Console.register("restore", "从备份中恢复部分文件")
+async def cmd_restore(args: List[str]) -> None:
+    if len(args) < 3:
+        command = Console.styled_command("restore", "<name>", "<uuid>", "<pattern>...")
+        cmd_restore.logger.info(f"{command} - 恢复备份中匹配路径前缀或通配符的文件")
+        return
+
+    name, uuid, *patterns = args
+
+    if (config := find_backup(name)) is None:
+        raise CommandExit(f"未找到名为 [{Style.CYAN(name)}] 的备份项")
+
+    recover = await Recover.create(config)
+    if record := recover.get_record(uuid):
+        await recover.apply(record, patterns)
+        return
+
+    raise CommandExit(f"未找到 uuid 为 [{Style.CYAN(uuid)}] 的备份")
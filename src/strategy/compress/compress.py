@@ -1,46 +1,169 @@
+import time
+from hashlib import blake2b
 from pathlib import Path
-from typing import override
+from typing import Dict, List, Tuple, override
 
 from src.const.exceptions import StopRecovery, StopBackup
 from src.models import BackupRecord
-from src.utils import Style, compress_password, mkdir, pack_7zip, unpack_7zip
+from src.utils import (
+    ByteReader,
+    ByteWriter,
+    Hasher,
+    Style,
+    compress_password,
+    iter_7zip_multipart,
+    mkdir,
+    run_sync,
+    unpack_7zip,
+    walk_tree,
+)
 
+from ..estimate import BackupEstimate, archive_compressor, estimate_compressed
 from ..strategy import Strategy
 
 
 class CompressStrategy(Strategy):
     __strategy_name__: str = "Compress"
 
+    async def get_excluded(self) -> List[Path]:
+        """遍历本地目录, 获取被过滤规则排除的目录与文件"""
+        if not self.path_filter or not self.local.is_dir():
+            return []
+
+        def walk() -> List[Path]:
+            skipped: List[Path] = []
+            for _ in walk_tree(self.local, 0, self.path_filter, skipped=skipped):
+                pass
+            return sorted(skipped)
+
+        exclude = await run_sync(walk)()
+        self.logger.info(f"过滤规则排除 {Style.YELLOW(len(exclude))} 个项目")
+        return exclude
+
+    async def get_fingerprint(self) -> str:
+        """计算本地目录的指纹, 包括过滤后的每个项目及压缩参数
+
+        默认使用文件的大小与修改时间, `paranoid` 时使用文件内容的哈希值
+        """
+        root = self.local if self.local.is_dir() else self.local.parent
+
+        def walk() -> List[Tuple[str, Path, int, int]]:
+            if self.local.is_file():
+                st = self.local.stat()
+                return [("file", Path(self.local.name), st.st_size, st.st_mtime_ns)]
+
+            entries: List[Tuple[str, Path, int, int]] = []
+            for t, p, st in walk_tree(self.local, 0, self.path_filter):
+                if t == "file":
+                    st = st or (self.local / p).stat()
+                    entries.append((t, p, st.st_size, st.st_mtime_ns))
+                else:
+                    entries.append((t, p, 0, 0))
+            return sorted(entries)
+
+        entries = await run_sync(walk)()
+        digests: Dict[Path, str] = {}
+        if self.config.paranoid:
+            hasher = Hasher(self.config.hash_workers)
+            algo = self.config.hash_algo
+            digests = await hasher.run(
+                (p, root / p, algo, size) for t, p, size, _ in entries if t == "file"
+            )
+            self.logger.debug(f"计算本地目录指纹, 哈希计算: {hasher.stats}")
+
+        fingerprint = blake2b(digest_size=20)
+        fingerprint.update(" ".join(self.config.compression.switches()).encode())
+        for t, p, size, mtime in entries:
+            info = digests[p] if p in digests else f"{size} {mtime}"
+            fingerprint.update(f"\n{t} {p.as_posix()} {info}".encode())
+        return fingerprint.hexdigest()
+
     @override
     async def _make_backup(self) -> None:
         self.check_local()
 
+        # 本地目录与上次备份时相同时跳过备份
+        fingerprint = await self.get_fingerprint()
+        if self.record and self.record[-1].fingerprint == fingerprint:
+            self.logger.info("本次备份未更新文件...跳过备份")
+            return
+
         # 准备备份
         target = self.remote / self.uuid
         await self.client.mkdir(target)
         self.logger.info(f"开始压缩备份: {Style.PATH(self.local)}")
         self.logger.info(f"备份uuid: [{Style.CYAN(self.uuid)}]")
 
-        # 压缩后上传
-        password = compress_password(self.uuid)
-        archive = await pack_7zip(self.cache(f"{self.uuid}.7z"), self.local, password)
+        # 分卷压缩, 压缩的同时并行上传已完成的分卷
+        exclude = await self.get_excluded()
+        volumes = iter_7zip_multipart(
+            self.cache(self.uuid) / "backup.7z",
+            self.local,
+            volume_size=self.VOLUME_SIZE,
+            password=compress_password(self.uuid),
+            switches=self.config.compression.switches(),
+            exclude=exclude,
+        )
         self.logger.info(f"[{Style.CYAN(self.uuid)}] 正在上传...")
-        if err := await self.client.put_file(archive, target / "backup.7z"):
-            raise StopBackup(f"上传备份压缩包时出错: {err}") from err
+        try:
+            names = await self.upload_volumes(volumes)
+        finally:
+            await volumes.aclose()
+
+        mpcache = self.cache(self.uuid) / "mp.7685"
+        mpcache.write_bytes(ByteWriter().write(names).get())
+        self.logger.debug(f"上传分卷清单: {Style.PATH_DEBUG(mpcache)}")
+        if err := await self.client.put_file(mpcache, target / mpcache.name):
+            raise StopBackup("上传分卷清单失败") from err
 
         # 更新备份记录
-        await self.add_record()
+        await self.add_record(fingerprint=fingerprint)
         self.logger.success(f"[{Style.CYAN(self.uuid)}] 备份完成!")
 
+    @override
+    async def _make_estimate(self) -> BackupEstimate:
+        # 每次备份都压缩整个本地路径
+        estimate = BackupEstimate(full=True)
+        start = time.perf_counter()
+
+        def walk() -> List[Tuple[Path, int]]:
+            if self.local.is_file():
+                estimate.entries = 1
+                return [(self.local, self.local.stat().st_size)]
+
+            files: List[Tuple[Path, int]] = []
+            for t, p, st in walk_tree(self.local, 0, self.path_filter):
+                estimate.entries += 1
+                if t == "file":
+                    fp = self.local / p
+                    files.append((fp, (st or fp.stat()).st_size))
+            return files
+
+        files = await run_sync(walk)()
+        estimate.elapsed = time.perf_counter() - start
+        estimate.files = len(files)
+        estimate.size = sum(size for _, size in files)
+        compress = archive_compressor(self.config.compression)
+        estimate.compressed = await run_sync(estimate_compressed)(files, compress)
+        return estimate
+
     @override
     async def _make_recovery(self, record: BackupRecord) -> Path:
         cache = self.cache(record.uuid)
-        cache_fp = cache / "backup.7z"
+        temp = mkdir(cache / "temp")
         result = mkdir(cache / "result")
-        remote_fp = self.remote / record.uuid / "backup.7z"
 
-        if err := await self.client.get_file(cache_fp, remote_fp):
-            raise StopRecovery(f"[{Style.CYAN(record.uuid)}] 备份文件下载失败") from err
+        # 旧版本备份只有一个压缩包, 没有分卷清单
+        mpcache = cache / "mp.7685"
+        remote_fp = self.remote / record.uuid / mpcache.name
+        if await self.client.get_file(mpcache, remote_fp):
+            names = ["backup.7z"]
+        else:
+            names = sorted(ByteReader(mpcache.read_bytes()).read_list())
+        if not names:
+            raise StopRecovery(f"[{Style.CYAN(record.uuid)}] 备份文件分卷清单为空")
+
+        await self.download_volumes(record.uuid, names, temp)
         password = compress_password(record.uuid)
-        await unpack_7zip(cache_fp, result, password)
+        await unpack_7zip(temp / names[0], result, password)
         return result
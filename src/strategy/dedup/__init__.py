@@ -0,0 +1,3 @@
+from .dedup import DedupStrategy
+
+Strategy = DedupStrategy
@@ -0,0 +1,19 @@
+#include <stdint.h>
+
+// 与 chunker.py 中的 Python 实现逐字节一致, 返回第一个分块的长度
+uint64_t cut_point(const uint8_t *data, uint64_t n, uint64_t min,
+                   uint64_t normal, const uint64_t *gear, uint64_t mask_s,
+                   uint64_t mask_l) {
+  uint64_t fp = 0, i = min;
+  for (; i < normal; i++) {
+    fp = (fp << 1) + gear[data[i]];
+    if (!(fp & mask_s))
+      return i + 1;
+  }
+  for (; i < n; i++) {
+    fp = (fp << 1) + gear[data[i]];
+    if (!(fp & mask_l))
+      return i + 1;
+  }
+  return n;
+}
@@ -0,0 +1,126 @@
+import ctypes
+import sys
+from hashlib import blake2b, sha256
+from pathlib import Path
+from typing import Any, Iterator, List, Optional
+
+# FastCDC 分块参数: 最小/平均/最大分块大小
+CHUNK_MIN = 256 * 1024  # 256 KB
+CHUNK_AVG = 1024 * 1024  # 1 MB
+CHUNK_MAX = 4 * 1024 * 1024  # 4 MB
+READ_SIZE = 8 * 1024 * 1024  # 8 MB
+
+_M64 = (1 << 64) - 1
+
+
+def _make_gear() -> List[int]:
+    # 固定的伪随机表, 保证不同平台/版本的分块边界一致
+    return [
+        int.from_bytes(sha256(i.to_bytes(2, "little")).digest()[:8], "little")
+        for i in range(256)
+    ]
+
+
+def _make_mask(bits: int) -> int:
+    # gear hash 左移累加, 高位受最近 64 字节影响, 因此取高位作为判断条件
+    return ((1 << bits) - 1) << (64 - bits)
+
+
+GEAR = _make_gear()
+_BITS = CHUNK_AVG.bit_length() - 1
+# 归一化分块: 平均大小之前使用更严格的掩码, 之后使用更宽松的掩码
+MASK_S = _make_mask(_BITS + 2)
+MASK_L = _make_mask(_BITS - 2)
+
+
+def _load_native() -> Optional[Any]:
+    # 由 cdc.c 编译, 与 crypt 位于同一目录
+    lib_name = f"cdc.{"dll" if sys.platform == "win32" else "so"}"
+    try:
+        lib = ctypes.CDLL(str(Path.cwd() / "lib" / lib_name))
+    except OSError:
+        return None
+
+    func = lib.cut_point
+    func.argtypes = [
+        ctypes.c_void_p,
+        ctypes.c_uint64,
+        ctypes.c_uint64,
+        ctypes.c_uint64,
+        ctypes.POINTER(ctypes.c_uint64),
+        ctypes.c_uint64,
+        ctypes.c_uint64,
+    ]
+    func.restype = ctypes.c_uint64
+    return func
+
+
+_NATIVE = _load_native()
+_NATIVE_GEAR = (ctypes.c_uint64 * 256)(*GEAR)
+NATIVE_CDC = _NATIVE is not None
+"""是否已加载 C 实现的分块函数, 未加载时使用较慢的 Python 实现"""
+
+
+def _py_cut_point(data: memoryview, n: int, normal: int) -> int:
+    gear, fp, mask_s, mask_l = GEAR, 0, MASK_S, MASK_L
+    for i, b in enumerate(data[CHUNK_MIN:normal], CHUNK_MIN + 1):
+        fp = ((fp << 1) + gear[b]) & _M64
+        if not fp & mask_s:
+            return i
+    for i, b in enumerate(data[normal:n], normal + 1):
+        fp = ((fp << 1) + gear[b]) & _M64
+        if not fp & mask_l:
+            return i
+    return n
+
+
+def cut_point(data: bytes | bytearray | memoryview) -> int:
+    """计算 `data` 中第一个分块的长度"""
+    n = len(data)
+    if n <= CHUNK_MIN:
+        return n
+    n = min(n, CHUNK_MAX)
+    normal = min(n, CHUNK_AVG)
+
+    if _NATIVE is None:
+        return _py_cut_point(memoryview(data), n, normal)
+
+    with memoryview(data) as view, view[:n] as head:
+        # 可写的缓冲区直接传递指针, 只读的缓冲区需要复制
+        if head.readonly:
+            buffer = (ctypes.c_ubyte * n).from_buffer_copy(head)
+        else:
+            buffer = (ctypes.c_ubyte * n).from_buffer(head)
+        cut = _NATIVE(buffer, n, CHUNK_MIN, normal, _NATIVE_GEAR, MASK_S, MASK_L)
+        del buffer
+    return cut
+
+
+def iter_chunks(fp: Path) -> Iterator[bytes]:
+    """按内容定义的边界将文件切分为数据块
+
+    文件局部修改只影响附近的分块, 其余分块的边界和内容保持不变
+    """
+    # 以偏移量标记已切分的位置, 仅在读取新数据前丢弃已切分的部分
+    buffer, start = bytearray(), 0
+    with fp.open("rb") as file:
+        eof = False
+        while True:
+            if not eof and len(buffer) - start < CHUNK_MAX:
+                del buffer[:start]
+                start = 0
+                block = file.read(READ_SIZE)
+                eof = not block
+                buffer += block
+                continue
+            if start == len(buffer):
+                return
+            with memoryview(buffer) as view, view[start:] as rest:
+                cut = cut_point(rest)
+                chunk = bytes(rest[:cut])
+            start += cut
+            yield chunk
+
+
+def chunk_hash(data: bytes) -> str:
+    return blake2b(data, digest_size=20).hexdigest()
@@ -0,0 +1,492 @@
+import asyncio
+import shutil
+import time
+import zlib
+from collections import Counter
+from hashlib import blake2b
+from pathlib import Path
+from typing import Dict, List, Set, Tuple, override
+
+from src.const.exceptions import (
+    BackendError,
+    StopBackup,
+    StopOperation,
+    StopRecovery,
+)
+from src.models import BackupRecord, DedupEntry
+from src.utils import (
+    ByteReader,
+    ByteWriter,
+    StatCache,
+    Style,
+    json,
+    match_path,
+    mkdir,
+    run_sync,
+    walk_tree,
+)
+
+from ..estimate import BackupEstimate, estimate_compressed
+from ..strategy import Strategy
+from .chunker import NATIVE_CDC, chunk_hash, iter_chunks
+from .index import ChunkIndex
+
+
+def encode_chunk(data: bytes) -> bytes:
+    return ByteWriter().write_bytes(zlib.compress(data)).get()
+
+
+def decode_chunk(data: bytes) -> bytes:
+    return zlib.decompress(ByteReader(data).read_bytes())
+
+
+def compressed_size(fp: Path, data: bytes) -> int:
+    return len(zlib.compress(data))
+
+
+def chunks_digest(chunks: List[str]) -> str:
+    return blake2b("\n".join(chunks).encode(), digest_size=20).hexdigest()
+
+
+def hash_chunks(fp: Path) -> List[str]:
+    """按备份时相同的方式切分文件, 只计算数据块哈希值而不上传"""
+    return [chunk_hash(data) for data in iter_chunks(fp)]
+
+
+class DedupStrategy(Strategy):
+    """内容定义分块去重备份
+
+    文件按内容切分为数据块, 每个数据块以哈希值为名在远程只保存一份,
+    每次备份上传新增的数据块与一份完整的文件清单
+    """
+
+    __strategy_name__: str = "Dedup"
+    CHUNK_WINDOW: int = 8
+    CHUNK_ALGO: str = "cdc"
+
+    __index: ChunkIndex
+    __pruning: bool = False
+    __compacted: bool = False
+    __pending: Set[str]
+    __uploaded: List[str]
+    __tasks: List[asyncio.Task[None]]
+    __window: asyncio.Semaphore
+
+    def chunk_path(self, digest: str) -> Path:
+        return self.remote / "chunks" / digest[:2] / digest
+
+    @property
+    def manifest_cache(self) -> Path:
+        return self.STATE / "manifest.json"
+
+    async def get_manifest(self, uuid: str) -> List[DedupEntry]:
+        cache_fp = self.cache(uuid) / "manifest.7685"
+        remote_fp = self.remote / uuid / "manifest.7685"
+
+        if err := await self.client.get_file(cache_fp, remote_fp):
+            raise StopOperation(f"下载文件清单 {remote_fp} 失败") from err
+
+        def decode() -> List[DedupEntry]:
+            data = ByteReader(cache_fp.read_bytes()).read_list()
+            cache_fp.unlink()
+            return [DedupEntry.model_validate(i.model_dump()) for i in data]
+
+        return await run_sync(decode)()
+
+    async def get_last_manifest(self) -> Dict[Path, DedupEntry]:
+        """获取上一次备份的文件清单, 优先使用本地缓存"""
+        if not self.record:
+            return {}
+
+        uuid = self.record[-1].uuid
+        try:
+            data = json.loads(self.manifest_cache.read_text(encoding="utf-8"))
+            if data["uuid"] == uuid:
+                entries = [DedupEntry.model_validate(i) for i in data["entries"]]
+                return {e.path: e for e in entries}
+        except Exception:
+            pass
+
+        self.logger.debug(f"下载上次备份的文件清单: [{Style.CYAN(uuid)}]")
+        return {e.path: e for e in await self.get_manifest(uuid)}
+
+    def save_manifest(self, entries: List[DedupEntry]) -> None:
+        data = {
+            "uuid": self.uuid,
+            "entries": [e.model_dump(mode="json") for e in entries],
+        }
+        temp = self.manifest_cache.with_name("manifest.json.tmp")
+        temp.write_text(json.dumps(data), encoding="utf-8")
+        temp.replace(self.manifest_cache)
+
+    async def list_remote_chunks(self) -> List[str]:
+        """列出远程已存在的数据块"""
+        err, dirs = await self.client.list_dir(self.remote / "chunks")
+        if err:
+            # 远程尚无数据块
+            return []
+
+        async def list_chunks(name: str) -> List[str]:
+            err, files = await self.client.list_dir(self.remote / "chunks" / name)
+            if err:
+                raise StopOperation("列出远程数据块失败") from err
+            return [n for t, n in files if t == "f"]
+
+        res = await asyncio.gather(*[list_chunks(n) for t, n in dirs if t == "d"])
+        return [digest for names in res for digest in names]
+
+    async def rebuild_index(self) -> None:
+        """从远程数据块目录重建本地索引"""
+        self.logger.info("本地数据块索引为空, 正在从远程重建...")
+        self.__index.add(await self.list_remote_chunks())
+        self.logger.info(f"数据块索引重建完成, 共 {Style.YELLOW(len(self.__index))} 个")
+
+    async def collect_garbage(self) -> None:
+        """删除剩余备份均未引用的数据块"""
+        if not self.client.RMFILE_SUPPORTED:
+            self.logger.warning(
+                f"{Style.BLUE(type(self.client).__name__)} 不支持删除文件, "
+                "无法清理未引用的数据块"
+            )
+            return
+
+        referenced: Set[str] = set()
+        for record in self.record:
+            for e in await self.get_manifest(record.uuid):
+                referenced.update(e.chunks)
+        garbage = [d for d in await self.list_remote_chunks() if d not in referenced]
+        if not garbage:
+            return
+
+        # 先从索引中移除, 删除失败的数据块之后会被重新上传
+        index = ChunkIndex(self.STATE / "chunks.db")
+        try:
+            index.remove(garbage)
+        finally:
+            index.close()
+
+        self.logger.info(f"正在删除 {Style.YELLOW(len(garbage))} 个未引用的数据块...")
+        window = asyncio.Semaphore(self.CHUNK_WINDOW)
+
+        async def remove(digest: str) -> bool:
+            async with window:
+                try:
+                    await self.client.rmfile(self.chunk_path(digest))
+                    return True
+                except BackendError:
+                    return False
+
+        removed = sum(await asyncio.gather(*[remove(d) for d in garbage]))
+        if removed < len(garbage):
+            self.logger.warning(
+                f"{Style.YELLOW(len(garbage) - removed)} 个数据块删除失败, "
+                "将在之后清理时重试"
+            )
+        self.logger.success(f"已删除 {Style.YELLOW(removed)} 个未引用的数据块")
+
+    async def upload_chunk(self, digest: str, data: bytes) -> None:
+        cache_fp = self.cache("chunks") / digest
+        try:
+            await run_sync(cache_fp.write_bytes)(await run_sync(encode_chunk)(data))
+            remote_fp = self.chunk_path(digest)
+            await self.client.mkdir(remote_fp.parent)
+            if err := await self.client.put_file(cache_fp, remote_fp):
+                raise StopBackup(f"上传数据块 {digest} 失败") from err
+            self.__uploaded.append(digest)
+        finally:
+            cache_fp.unlink(missing_ok=True)
+            self.__window.release()
+
+    def check_uploads(self) -> None:
+        """移除已完成的上传任务, 有上传失败时立即抛出异常"""
+        tasks: List[asyncio.Task[None]] = []
+        for task in self.__tasks:
+            if not task.done():
+                tasks.append(task)
+            elif err := task.exception():
+                raise err
+        self.__tasks = tasks
+
+    async def store_file(self, fp: Path) -> List[str]:
+        """切分文件, 上传远程不存在的数据块
+
+        Returns:
+            `List[str]`: 按顺序组成文件的数据块哈希值
+        """
+        chunks: List[str] = []
+        it = iter_chunks(fp)
+        read = run_sync(next)
+
+        while (data := await read(it, None)) is not None:
+            digest = chunk_hash(data)
+            chunks.append(digest)
+            if digest in self.__pending or digest in self.__index:
+                continue
+
+            self.__pending.add(digest)
+            await self.__window.acquire()
+            self.check_uploads()
+            self.__tasks.append(asyncio.create_task(self.upload_chunk(digest, data)))
+
+        return chunks
+
+    async def get_entries(self, last: Dict[Path, DedupEntry]) -> List[DedupEntry]:
+        stat_cache = StatCache(self.STATE / "stat.json")
+        entries: List[DedupEntry] = []
+
+        # 在线程中遍历目录, 被过滤规则排除的项目不参与备份
+        it = walk_tree(self.local, 0, self.path_filter)
+        take = run_sync(next)
+        try:
+            while (item := await take(it, None)) is not None:
+                t, path, st = item
+                if t == "dir":
+                    entries.append(DedupEntry(type="dir", path=path))
+                    continue
+                if st is None:
+                    self.logger.warning(f"无法读取文件状态, 跳过: {Style.PATH(path)}")
+                    continue
+
+                # stat 未变化的文件沿用上次备份的数据块列表
+                prev = last.get(path)
+                digest = stat_cache.get(path, st, self.CHUNK_ALGO)
+                if (
+                    not self.config.paranoid
+                    and prev is not None
+                    and digest == chunks_digest(prev.chunks)
+                ):
+                    chunks = prev.chunks
+                else:
+                    try:
+                        chunks = await self.store_file(self.local / path)
+                    except OSError as err:
+                        self.logger.warning(f"读取文件 {Style.PATH(path)} 失败, 跳过: {err}")
+                        continue
+                stat_cache.set(path, st, chunks_digest(chunks), self.CHUNK_ALGO)
+                entries.append(
+                    DedupEntry(type="file", path=path, size=st.st_size, chunks=chunks)
+                )
+        finally:
+            await run_sync(it.close)()
+
+        stat_cache.retain(e.path for e in entries if e.type == "file")
+        await run_sync(stat_cache.save)()
+        return sorted(entries, key=lambda e: e.path)
+
+    @override
+    async def _make_backup(self) -> None:
+        self.check_local()
+
+        self.__index = ChunkIndex(self.STATE / "chunks.db")
+        self.__pending, self.__uploaded, self.__tasks = set(), [], []
+        self.__window = asyncio.Semaphore(self.CHUNK_WINDOW)
+        try:
+            if self.record and not len(self.__index):
+                await self.rebuild_index()
+
+            self.logger.info(f"开始去重备份: {Style.PATH(self.local)}")
+            if not NATIVE_CDC:
+                self.logger.warning("未找到 lib/cdc 动态库, 使用较慢的 Python 分块实现")
+            last = await self.get_last_manifest()
+            try:
+                entries = await self.get_entries(last)
+                await asyncio.gather(*self.__tasks)
+            finally:
+                for task in self.__tasks:
+                    task.cancel()
+                # 已上传的数据块即使本次备份失败也可被之后的备份复用
+                self.__index.add(self.__uploaded)
+
+            if self.record and entries == sorted(last.values(), key=lambda e: e.path):
+                self.logger.info("本次备份未更新文件...跳过备份")
+                return
+
+            self.logger.info(f"备份uuid: [{Style.CYAN(self.uuid)}]")
+            target = self.remote / self.uuid
+            await self.client.mkdir(target)
+
+            # 上传本次备份的文件清单
+            cache_fp = self.cache(self.uuid) / "manifest.7685"
+            cache_fp.write_bytes(ByteWriter().write(entries).get())
+            if err := await self.client.put_file(cache_fp, target / cache_fp.name):
+                raise StopBackup("上传文件清单失败") from err
+
+            await self.add_record()
+            await run_sync(self.save_manifest)(entries)
+        finally:
+            self.__index.close()
+
+        size = sum(e.size for e in entries)
+        self.logger.success(f"[{Style.CYAN(self.uuid)}] 备份完成!")
+        self.logger.success(
+            f"共 {Style.YELLOW(len(entries))} 个项目 ({size / 1024 / 1024:.1f} MB), "
+            f"新增数据块 {Style.YELLOW(len(self.__uploaded))} 个"
+        )
+
+    @override
+    async def _make_estimate(self) -> BackupEstimate:
+        estimate = BackupEstimate()
+        start = time.perf_counter()
+        last = await self.get_last_manifest()
+        stat_cache = StatCache(self.STATE / "stat.json")
+
+        # stat 未变化的文件不再切分, 其余文件按全部数据块都需要上传估算
+        def walk() -> List[Tuple[Path, int]]:
+            files: List[Tuple[Path, int]] = []
+            seen: Set[Path] = set()
+            for t, p, st in walk_tree(self.local, 0, self.path_filter):
+                estimate.entries += 1
+                seen.add(p)
+                prev = last.get(p)
+                if t == "dir":
+                    estimate.new += prev is None
+                    continue
+
+                if st is None:
+                    continue
+                digest = stat_cache.get(p, st, self.CHUNK_ALGO)
+                if (
+                    not self.config.paranoid
+                    and prev is not None
+                    and digest == chunks_digest(prev.chunks)
+                ):
+                    continue
+                if prev is None:
+                    estimate.new += 1
+                else:
+                    estimate.changed += 1
+                files.append((self.local / p, st.st_size))
+            estimate.deleted = sum(p not in seen for p in last)
+            return files
+
+        files = await run_sync(walk)()
+        estimate.elapsed = time.perf_counter() - start
+        estimate.files = len(files)
+        estimate.size = sum(size for _, size in files)
+        estimate.compressed = await run_sync(estimate_compressed)(
+            files, compressed_size
+        )
+        return estimate
+
+    async def restore_entries(
+        self, record: BackupRecord, entries: List[DedupEntry]
+    ) -> Path:
+        """下载文件清单中的文件, 组装为恢复结果目录"""
+        cache = self.cache(record.uuid)
+        chunk_cache = mkdir(cache / "chunks")
+        result = mkdir(cache / "result")
+
+        # 数据块在最后一次被引用后删除
+        refs = Counter(d for e in entries for d in e.chunks)
+        window = asyncio.Semaphore(self.CHUNK_WINDOW)
+
+        async def fetch(digest: str) -> None:
+            fp = chunk_cache / digest
+            if fp.exists():
+                return
+            async with window:
+                if err := await self.client.get_file(fp, self.chunk_path(digest)):
+                    raise StopRecovery(f"下载数据块 {digest} 失败") from err
+
+        def write(dst: Path, chunks: List[str]) -> None:
+            with dst.open("wb") as fout:
+                for digest in chunks:
+                    fp = chunk_cache / digest
+                    data = decode_chunk(fp.read_bytes())
+                    if chunk_hash(data) != digest:
+                        raise StopRecovery(f"数据块 {digest} 校验失败")
+                    fout.write(data)
+                    refs[digest] -= 1
+                    if not refs[digest]:
+                        fp.unlink()
+
+        for e in entries:
+            dst = result / e.path
+            if e.type == "dir":
+                mkdir(dst)
+                continue
+
+            mkdir(dst.parent)
+            await asyncio.gather(*[fetch(d) for d in set(e.chunks)])
+            await run_sync(write)(dst, e.chunks)
+
+        return result
+
+    @override
+    async def _make_recovery(self, record: BackupRecord) -> Path:
+        return await self.restore_entries(record, await self.get_manifest(record.uuid))
+
+    @override
+    async def _make_partial_recovery(
+        self, record: BackupRecord, patterns: List[str]
+    ) -> Path:
+        entries = await self.get_manifest(record.uuid)
+        entries = [e for e in entries if match_path(e.path, patterns)]
+        if not entries:
+            raise StopRecovery("备份中没有匹配的文件")
+
+        self.logger.info(f"匹配到 {Style.YELLOW(len(entries))} 个项目")
+        return await self.restore_entries(record, entries)
+
+    @override
+    async def _make_inplace_recovery(
+        self, record: BackupRecord
+    ) -> Tuple[Path, List[Path]]:
+        entries = await self.get_manifest(record.uuid)
+        stat_cache = StatCache(self.STATE / "stat.json")
+        # 被过滤规则排除的本地项目不在备份中, 保持原样
+        local = await run_sync(list)(walk_tree(self.local, 0, self.path_filter))
+        local_type = {p: t for t, p, _ in local}
+        local_stat = {p: st for _, p, st in local}
+
+        # 数据块列表一致的文件视为无需恢复, stat 未变化时直接使用缓存的哈希值
+        async def unchanged(e: DedupEntry) -> bool:
+            if local_type.get(e.path) != e.type:
+                return False
+            if e.type == "dir":
+                return True
+            if (st := local_stat[e.path]) is None or st.st_size != e.size:
+                return False
+            expect = chunks_digest(e.chunks)
+            if stat_cache.get(e.path, st, self.CHUNK_ALGO) == expect:
+                return True
+            try:
+                digest = chunks_digest(await run_sync(hash_chunks)(self.local / e.path))
+            except OSError:
+                return False
+            stat_cache.set(e.path, st, digest, self.CHUNK_ALGO)
+            return digest == expect
+
+        changed = [e for e in entries if not await unchanged(e)]
+        await run_sync(stat_cache.save)()
+        types = {e.path: e.type for e in entries}
+        extra = [p for p, t in local_type.items() if types.get(p) != t]
+        self.logger.info(
+            f"本地 {Style.YELLOW(len(entries) - len(changed))} 个项目无需恢复, "
+            f"需要恢复 {Style.YELLOW(len(changed))} 个项目, "
+            f"删除 {Style.YELLOW(len(extra))} 个项目"
+        )
+
+        return await self.restore_entries(record, changed), extra
+
+    @override
+    async def _make_compact(self, records: List[BackupRecord]) -> None:
+        await super()._make_compact(records)
+        # 清理需要读取全部文件清单, 删除过期备份时只在最后清理一次
+        if self.__pruning:
+            self.__compacted = True
+        else:
+            await self.collect_garbage()
+
+    @override
+    async def make_prune(self) -> None:
+        self.__pruning, self.__compacted = True, False
+        try:
+            await super().make_prune()
+        finally:
+            self.__pruning = False
+        if self.__compacted:
+            try:
+                await self.collect_garbage()
+            finally:
+                await run_sync(shutil.rmtree)(self.CACHE, True)
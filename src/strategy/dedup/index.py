@@ -0,0 +1,98 @@
+import sqlite3
+from pathlib import Path
+from typing import Iterable
+
+
+class BloomFilter(object):
+    """布隆过滤器, 快速判断数据块一定不存在
+
+    数据块哈希值本身分布均匀, 直接截取其中的片段作为位置
+    """
+
+    HASHES: int = 4
+
+    capacity: int
+    __bits: bytearray
+    __size: int
+
+    def __init__(self, capacity: int) -> None:
+        # 约 10 bit/元素, 误判率约 1%
+        self.capacity = max(capacity, 1024)
+        self.__size = self.capacity * 10
+        self.__bits = bytearray((self.__size + 7) // 8)
+
+    def _positions(self, digest: str) -> Iterable[int]:
+        for i in range(self.HASHES):
+            yield int(digest[i * 8 : i * 8 + 8], 16) % self.__size
+
+    def add(self, digest: str) -> None:
+        for pos in self._positions(digest):
+            self.__bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, digest: str) -> bool:
+        return all(
+            self.__bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(digest)
+        )
+
+
+class ChunkIndex(object):
+    """本地数据块索引, 记录远程已存在的数据块
+
+    布隆过滤器排除绝大部分新数据块, 仅在可能存在时查询 sqlite
+    """
+
+    __db: sqlite3.Connection
+    __bloom: BloomFilter
+    __count: int
+
+    def __init__(self, fp: Path) -> None:
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        self.__db = sqlite3.connect(fp)
+        self.__db.execute("CREATE TABLE IF NOT EXISTS chunks (hash TEXT PRIMARY KEY)")
+        self.__load_bloom()
+
+    def __load_bloom(self) -> None:
+        # 预留增长空间, 超出容量后重建
+        self.__count = self.__db.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+        self.__bloom = BloomFilter(self.__count * 2)
+        for (digest,) in self.__db.execute("SELECT hash FROM chunks"):
+            self.__bloom.add(digest)
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def __contains__(self, digest: str) -> bool:
+        if digest not in self.__bloom:
+            return False
+        cursor = self.__db.execute("SELECT 1 FROM chunks WHERE hash = ?", (digest,))
+        return cursor.fetchone() is not None
+
+    def add(self, digests: Iterable[str]) -> None:
+        digests = list(digests)
+        cursor = self.__db.executemany(
+            "INSERT OR IGNORE INTO chunks (hash) VALUES (?)",
+            ((d,) for d in digests),
+        )
+        self.__db.commit()
+        self.__count += cursor.rowcount
+        if self.__count > self.__bloom.capacity:
+            self.__load_bloom()
+            return
+        for d in digests:
+            self.__bloom.add(d)
+
+    def remove(self, digests: Iterable[str]) -> None:
+        self.__db.executemany(
+            "DELETE FROM chunks WHERE hash = ?", ((d,) for d in digests)
+        )
+        self.__db.commit()
+        # 布隆过滤器无法删除元素, 重新加载
+        self.__load_bloom()
+
+    def clear(self) -> None:
+        self.__db.execute("DELETE FROM chunks")
+        self.__db.commit()
+        self.__load_bloom()
+
+    def close(self) -> None:
+        self.__db.close()
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import lzma
+from bisect import bisect_right
+from dataclasses import dataclass, field
+from itertools import accumulate
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import loguru
+
+from src.config import CompressionConfig
+from src.utils import HashStats, Style, is_incompressible
+
+SAMPLE_FILES = 64
+SAMPLE_SIZE = 256 * 1024  # 256 KB
+
+# (文件路径, 采样数据) -> 压缩后大小
+type Compressor = Callable[[Path, bytes], int]
+
+
+def _mb(size: int) -> str:
+    return f"{size / 1024 / 1024:.1f} MB"
+
+
+@dataclass
+class BackupEstimate:
+    """预估备份的结果"""
+
+    new: int = field(default=0)
+    changed: int = field(default=0)
+    deleted: int = field(default=0)
+    full: bool = field(default=False)
+    """每次备份均为完整备份, 不与之前的备份比对"""
+    files: int = field(default=0)
+    """需要归档的文件数量"""
+    size: int = field(default=0)
+    """需要归档的文件大小 (字节)"""
+    compressed: int = field(default=0)
+    """采样估算的压缩后大小 (字节)"""
+    entries: int = field(default=0)
+    """遍历的项目数量"""
+    elapsed: float = field(default=0.0)
+    """遍历与比对耗时 (秒)"""
+    hash: Optional[HashStats] = field(default=None)
+
+    def report(self, logger: loguru.Logger) -> None:
+        if not self.full:
+            logger.info(
+                f"新增 {Style.YELLOW(self.new)} 个项目, "
+                f"修改 {Style.YELLOW(self.changed)} 个项目, "
+                f"删除 {Style.YELLOW(self.deleted)} 个项目"
+            )
+        logger.info(
+            f"需要归档 {Style.YELLOW(self.files)} 个文件, 共 {_mb(self.size)}, "
+            f"预计压缩后 {Style.YELLOW(_mb(self.compressed))}"
+        )
+        speed = self.entries / self.elapsed if self.elapsed else 0.0
+        logger.info(
+            f"遍历比对 {Style.YELLOW(self.entries)} 个项目, "
+            f"耗时 {self.elapsed:.2f}s ({speed:.1f} 项目/s)"
+        )
+        if self.hash is not None:
+            logger.info(f"哈希计算: {self.hash}")
+
+
+def archive_compressor(config: CompressionConfig) -> Compressor:
+    """以 lzma 近似 7z 的压缩效果, 仅存储的文件按原始大小计算"""
+    extensions = {e.lower().lstrip(".") for e in config.store_extensions}
+
+    def compress(fp: Path, data: bytes) -> int:
+        if config.level <= 0 or is_incompressible(
+            fp, extensions, config.entropy_threshold
+        ):
+            return len(data)
+        return len(lzma.compress(data, preset=min(config.level, 9)))
+
+    return compress
+
+
+def _read_sample(fp: Path, size: int) -> bytes:
+    # 与信息熵采样相同, 从文件中部读取
+    with fp.open("rb") as f:
+        f.seek(max(size - SAMPLE_SIZE, 0) // 2)
+        return f.read(SAMPLE_SIZE)
+
+
+def estimate_compressed(
+    files: Sequence[Tuple[Path, int]], compress: Compressor
+) -> int:
+    """按文件大小加权抽样压缩, 估算全部文件压缩后的总大小
+
+    在累计大小上等间距取 `SAMPLE_FILES` 个点, 较大的文件被抽中的概率更高,
+    抽中文件的压缩率平均值即为按字节加权的压缩率
+
+    Args:
+        files (Sequence[Tuple[Path, int]]): (文件路径, 文件大小)
+        compress (Compressor): 返回采样数据压缩后的大小
+
+    Returns:
+        `int`: 估算的压缩后总大小 (字节)
+    """
+    total = sum(size for _, size in files)
+    if not total:
+        return 0
+
+    cumulative = list(accumulate(size for _, size in files))
+    count = min(SAMPLE_FILES, len(files))
+    ratios: List[float] = []
+    for k in range(count):
+        fp, size = files[bisect_right(cumulative, (k + 0.5) * total / count)]
+        try:
+            sample = _read_sample(fp, size)
+            if sample:
+                ratios.append(compress(fp, sample) / len(sample))
+        except OSError:
+            continue
+
+    ratio = sum(ratios) / len(ratios) if ratios else 1.0
+    return int(total * ratio)
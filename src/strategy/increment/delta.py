@@ -0,0 +1,183 @@
+import struct
+from dataclasses import dataclass, field
+from hashlib import blake2b
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Self, Tuple
+
+from src.utils import json, new_hash
+
+SIGNATURE_MAGIC = b"7685SIG1"
+DELTA_MAGIC = b"7685DLT1"
+DIGEST_SIZE = 16
+LITERAL_FLUSH = 4 * 1024 * 1024  # 4 MB
+
+DELTA_HEADER = struct.Struct("<IQ")
+"""(块大小, 目标文件大小)"""
+COPY_OP = struct.Struct("<II")
+"""`C` 之后: (起始块序号, 块数量), 从基准版本复制连续的块"""
+LITERAL_OP = struct.Struct("<I")
+"""`L` 之后: (数据长度), 之后为新数据"""
+
+
+def block_digest(data: bytes) -> bytes:
+    return blake2b(data, digest_size=DIGEST_SIZE).digest()
+
+
+@dataclass
+class Signature:
+    """文件的分块签名, 记录每个对齐块的哈希值"""
+
+    md5: str
+    """文件内容的哈希值, 算法见 `algo`"""
+    algo: str
+    block_size: int
+    blocks: List[bytes] = field(default_factory=list)
+
+    def dump(self, fp: Path) -> None:
+        header = {"md5": self.md5, "algo": self.algo, "block_size": self.block_size}
+        fp.parent.mkdir(parents=True, exist_ok=True)
+        with fp.open("wb") as f:
+            f.write(SIGNATURE_MAGIC)
+            f.write(json.dumps(header).encode() + b"\n")
+            f.write(b"".join(self.blocks))
+
+    @classmethod
+    def load(cls, fp: Path) -> Optional[Self]:
+        """读取签名, 不存在或格式错误时返回 `None`"""
+        try:
+            data = fp.read_bytes()
+            if not data.startswith(SIGNATURE_MAGIC):
+                return None
+            header, _, body = data[len(SIGNATURE_MAGIC) :].partition(b"\n")
+            info = json.loads(header)
+            blocks = [
+                body[i : i + DIGEST_SIZE] for i in range(0, len(body), DIGEST_SIZE)
+            ]
+            return cls(info["md5"], info["algo"], info["block_size"], blocks)
+        except (OSError, ValueError, KeyError):
+            return None
+
+
+def make_signature(fp: Path, algo: str, block_size: int) -> Signature:
+    """读取文件, 计算哈希值与分块签名"""
+    hasher = new_hash(algo)
+    blocks: List[bytes] = []
+    with fp.open("rb") as f:
+        while data := f.read(block_size):
+            hasher.update(data)
+            blocks.append(block_digest(data))
+    return Signature(hasher.hexdigest(), algo, block_size, blocks)
+
+
+class _DeltaWriter(object):
+    """合并连续的复制与新数据, 写入差异文件"""
+
+    size: int
+    __file: BinaryIO
+    __copy: Optional[Tuple[int, int]]
+    __literal: bytearray
+
+    def __init__(self, file: BinaryIO) -> None:
+        self.size = 0
+        self.__file = file
+        self.__copy = None
+        self.__literal = bytearray()
+
+    def write(self, data: bytes) -> None:
+        self.__file.write(data)
+        self.size += len(data)
+
+    def copy(self, index: int) -> None:
+        self.__flush_literal()
+        if self.__copy and sum(self.__copy) == index:
+            self.__copy = (self.__copy[0], self.__copy[1] + 1)
+        else:
+            self.__flush_copy()
+            self.__copy = (index, 1)
+
+    def literal(self, data: bytes) -> None:
+        self.__flush_copy()
+        self.__literal += data
+        if len(self.__literal) >= LITERAL_FLUSH:
+            self.__flush_literal()
+
+    def close(self) -> None:
+        self.__flush_copy()
+        self.__flush_literal()
+
+    def __flush_copy(self) -> None:
+        if self.__copy:
+            self.write(b"C" + COPY_OP.pack(*self.__copy))
+            self.__copy = None
+
+    def __flush_literal(self) -> None:
+        if self.__literal:
+            self.write(b"L" + LITERAL_OP.pack(len(self.__literal)))
+            self.write(self.__literal)
+            self.__literal = bytearray()
+
+
+def make_delta(fp: Path, base: Signature, out: Path) -> Tuple[Signature, int]:
+    """根据基准版本的签名生成差异文件
+
+    以块为单位对齐比较, 与基准版本中任一块相同的块记录为复制, 其余块记录为新数据.
+    追加写入的日志与按页修改的数据库文件大部分块保持对齐
+
+    Args:
+        fp (Path): 当前版本的文件
+        base (Signature): 基准版本的签名
+        out (Path): 差异文件路径
+
+    Returns:
+        `Tuple[Signature, int]`: (当前版本的签名, 差异文件大小)
+    """
+    lookup: Dict[bytes, int] = {}
+    for index, digest in enumerate(base.blocks):
+        lookup.setdefault(digest, index)
+
+    hasher = new_hash(base.algo)
+    blocks: List[bytes] = []
+    with fp.open("rb") as f, out.open("wb") as fout:
+        writer = _DeltaWriter(fout)
+        writer.write(DELTA_MAGIC)
+        writer.write(DELTA_HEADER.pack(base.block_size, 0))
+        size = 0
+        while data := f.read(base.block_size):
+            size += len(data)
+            hasher.update(data)
+            digest = block_digest(data)
+            blocks.append(digest)
+            if (index := lookup.get(digest)) is not None:
+                writer.copy(index)
+            else:
+                writer.literal(data)
+        writer.close()
+        # 文件大小以实际读取的数据为准
+        fout.seek(len(DELTA_MAGIC))
+        fout.write(DELTA_HEADER.pack(base.block_size, size))
+
+    signature = Signature(hasher.hexdigest(), base.algo, base.block_size, blocks)
+    return signature, writer.size
+
+
+def apply_delta(base: Path, delta: Path, out: Path) -> None:
+    """将差异文件应用于基准版本, 生成当前版本"""
+    with base.open("rb") as fbase, delta.open("rb") as fdelta, out.open("wb") as fout:
+        if fdelta.read(len(DELTA_MAGIC)) != DELTA_MAGIC:
+            raise ValueError("差异文件格式错误")
+        block_size, size = DELTA_HEADER.unpack(fdelta.read(DELTA_HEADER.size))
+
+        while op := fdelta.read(1):
+            if op == b"C":
+                index, count = COPY_OP.unpack(fdelta.read(COPY_OP.size))
+                fbase.seek(index * block_size)
+                for _ in range(count):
+                    fout.write(fbase.read(block_size))
+            elif op == b"L":
+                (length,) = LITERAL_OP.unpack(fdelta.read(LITERAL_OP.size))
+                fout.write(fdelta.read(length))
+            else:
+                raise ValueError("差异文件格式错误")
+
+        if fout.tell() != size:
+            raise ValueError("差异文件与基准版本不匹配")
@@ -1,86 +1,279 @@
 import asyncio
+import os
 import shutil
+import time
+from collections import deque
+from hashlib import md5
 from pathlib import Path
-from typing import Dict, List, Tuple, override
+from typing import (
+    AsyncIterator,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    override,
+)
 
-from src.const import BackupUpdateType
-from src.const.exceptions import StopBackup, StopRecovery
-from src.models import BackupRecord, BackupUpdate
+from src.const import BackupUpdateType, HashAlgorithm
+from src.const.exceptions import StopBackup, StopOperation, StopRecovery
+from src.models import ArchiveIndex, BackupRecord, BackupUpdate
 from src.utils import (
     ByteReader,
     ByteWriter,
+    Hasher,
+    HashJob,
+    StatCache,
     Style,
     compress_password,
-    get_md5,
+    get_hash,
+    get_journal,
     get_uuid,
+    is_incompressible,
+    iter_7zip_multipart,
+    link_file,
+    match_path,
     mkdir,
-    pack_7zip_multipart,
+    placeholder_volume,
     run_sync,
     unpack_7zip,
+    walk_tree,
 )
 
+from ..estimate import BackupEstimate, archive_compressor, estimate_compressed
 from ..strategy import Strategy
+from .delta import Signature, apply_delta, make_delta, make_signature
+from .state import (
+    REF_DIR,
+    StateCache,
+    UpdateState,
+    apply_updates,
+    dump_state,
+    entry_type,
+    load_state,
+    remap_state,
+)
+from .volume import build_index, required_volumes
+
+type LocalFile = Tuple[Path, HashAlgorithm, Optional[os.stat_result]]
+"""(相对路径, 哈希算法, stat 结果)"""
 
 
 class IncrementStrategy(Strategy):
     __strategy_name__: str = "Increment"
+    MANIFEST_WINDOW: int = 8
+    RECOVERY_WINDOW: int = 3
+    DELTA_RATIO: float = 0.5
+
+    def get_journal_list(
+        self, state: UpdateState, changes: Set[Path]
+    ) -> Tuple[List[Tuple[BackupUpdateType, Path]], Set[Path]]:
+        """根据文件变化记录获取本地文件列表, 只访问发生变化的路径
 
-    def get_local_list(self) -> List[Tuple[BackupUpdateType, Path]]:
-        """获取本地文件列表
+        未变化的项目沿用备份状态, 变化的目录完整遍历
 
         Returns:
-            `List[Tuple[BackupUpdateType, Path]]`: 列表元素为元组: ("file"或"dir", 相对路径)
+            `Tuple[List[Tuple[BackupUpdateType, Path]], Set[Path]]`:
+                (本地文件列表, 需要重新计算哈希值的文件)
         """
-        res: List[Tuple[BackupUpdateType, Path]] = []
 
-        for p, dirs, files in self.local.walk():
-            relp = p.relative_to(self.local)
-            res.extend(("dir", relp / i) for i in dirs)
-            res.extend(("file", relp / i) for i in files)
+        def changed(p: Path) -> bool:
+            return p in changes or any(parent in changes for parent in p.parents)
+
+        def excluded(p: Path, is_dir: bool, size: int = 0) -> bool:
+            if not self.path_filter:
+                return False
+            return self.path_filter.skip_path(p, is_dir, size)
+
+        # 过滤规则修改后, 被排除的已备份项目记录为删除
+        res: Dict[Path, BackupUpdateType] = {}
+        for p, (_, upd) in state.items():
+            t = entry_type(upd)
+            if not changed(p) and not excluded(p, t == "dir"):
+                res[p] = t
 
-        return sorted(res)
+        checked: Set[Path] = set()
+        for p in changes:
+            # 父目录同样发生变化时由父目录处理
+            if any(parent in changes for parent in p.parents):
+                continue
 
-    async def get_local_md5(self, fp_list: List[Path]) -> Dict[Path, str]:
-        call = run_sync(get_md5)
+            fp = self.local / p
+            if fp.is_dir() and not fp.is_symlink():
+                if excluded(p, True):
+                    continue
+                res[p] = "dir"
+                for t, sub, _ in walk_tree(self.local, 0, self.path_filter, p):
+                    res[sub] = t
+                    if t == "file":
+                        checked.add(sub)
+            elif fp.exists():
+                if excluded(p, False, fp.stat().st_size):
+                    continue
+                res[p] = "file"
+                checked.add(p)
 
-        async def _run(p: Path) -> Tuple[Path, str]:
-            return p, await call(self.local / p)
+        return sorted((t, p) for p, t in res.items()), checked
 
-        return dict(await asyncio.gather(*[_run(p) for p in fp_list]))
+    async def get_local_md5(
+        self,
+        fp_list: Iterable[LocalFile],
+        hasher: Hasher,
+        retain: Optional[List[Path]] = None,
+    ) -> Dict[Path, str]:
+        """计算本地文件的哈希值
+
+        Args:
+            fp_list (Iterable[LocalFile]): 元素为元组: (相对路径, 哈希算法, stat 结果).
+                stat 结果为 `None` 时重新获取; 可以是遍历中的生成器, 边遍历边计算
+            hasher (Hasher): 哈希计算引擎
+            retain (Optional[List[Path]], optional): 文件状态缓存中保留的文件,
+                默认为 `fp_list` 中的文件
+
+        Returns:
+            `Dict[Path, str]`: 相对路径 -> 哈希值
+        """
+        stat_cache = StatCache(self.STATE / "stat.json")
+        result: Dict[Path, str] = {}
+        pending: Dict[Path, Tuple[HashAlgorithm, os.stat_result]] = {}
+        seen: List[Path] = []
+
+        # stat 未变化的文件直接使用缓存的哈希值
+        def check_stat() -> Iterator[HashJob]:
+            for p, algo, st in fp_list:
+                st = st or (self.local / p).stat()
+                seen.append(p)
+                if not self.config.paranoid and (
+                    digest := stat_cache.get(p, st, algo)
+                ):
+                    result[p] = digest
+                else:
+                    pending[p] = (algo, st)
+                    yield (p, self.local / p, algo, st.st_size)
+
+        hashed = await hasher.run(check_stat())
+        self.logger.debug(
+            f"文件状态缓存命中 {Style.YELLOW(len(result))}/{Style.YELLOW(len(seen))}"
+        )
+        for p, (algo, st) in pending.items():
+            stat_cache.set(p, st, hashed[p], algo)
+        result.update(hashed)
+
+        stat_cache.retain(retain if retain is not None else seen)
+        await run_sync(stat_cache.save)()
+        return result
 
     async def get_update_info(self, uuid: str) -> List[BackupUpdate]:
-        cache_fp = self.CACHE / "update.7685"
+        cache_fp = self.cache(uuid) / "update.7685"
         remote_fp = self.remote / uuid / "update.7685"
 
         # 下载备份修改记录
         if err := await self.client.get_file(cache_fp, remote_fp):
             raise StopBackup(f"下载备份清单 {remote_fp} 失败") from err
 
-        data = ByteReader(cache_fp.read_bytes()).read_list()
-        cache_fp.unlink()
-        return data
+        def decode() -> List[BackupUpdate]:
+            data = ByteReader(cache_fp.read_bytes()).read_list()
+            cache_fp.unlink()
+            # 补全旧版本备份清单中缺少的字段
+            return [BackupUpdate.model_validate(i.model_dump()) for i in data]
 
-    async def get_update_list(self) -> List[BackupUpdate]:
-        remote: Dict[Path, BackupUpdate] = {}
+        return await run_sync(decode)()
 
-        # 按序遍历历史备份
-        for rec in self.record:
-            name = f"{Style.CYAN(self.config.name)} [{Style.CYAN(rec.uuid)}]"
-            self.logger.debug(f"下载 {name} 的备份清单")
+    async def iter_update_info(
+        self, records: List[BackupRecord]
+    ) -> AsyncIterator[Tuple[BackupRecord, List[BackupUpdate]]]:
+        """并发下载备份清单, 按备份记录的顺序依次返回
 
-            # 读取备份修改记录
-            upds = await self.get_update_info(rec.uuid)
-            for upd in upds:
-                if upd.type != "del":
-                    remote[upd.path] = upd
-                elif upd.path in remote:
-                    del remote[upd.path]
+        同一时间最多下载 `MANIFEST_WINDOW` 个备份清单
+        """
+        queue: Deque[Tuple[BackupRecord, asyncio.Task[List[BackupUpdate]]]] = deque()
+
+        try:
+            for rec in records:
+                task = asyncio.create_task(self.get_update_info(rec.uuid))
+                queue.append((rec, task))
+                if len(queue) >= self.MANIFEST_WINDOW:
+                    rec, task = queue.popleft()
+                    yield rec, await task
 
-        # 获取本地文件列表
-        local_list = self.get_local_list()
+            while queue:
+                rec, task = queue.popleft()
+                yield rec, await task
+        finally:
+            for _, task in queue:
+                task.cancel()
 
-        # 计算文件md5值
-        md5_cache = await self.get_local_md5([p for t, p in local_list if t == "file"])
+    async def get_update_list(
+        self, state: UpdateState, estimate: Optional[BackupEstimate] = None
+    ) -> List[BackupUpdate]:
+        """比对本地文件与备份状态, 获取本次备份的修改记录
+
+        Args:
+            state (UpdateState): 当前的备份状态
+            estimate (Optional[BackupEstimate], optional): 预估备份时记录统计信息.
+                预估时完整遍历本地目录, 不取出文件变化记录, 也不暂存文件
+        """
+        remote = {path: upd for path, (_, upd) in state.items()}
+
+        # 已备份的文件沿用备份清单中记录的算法, 以便与远程哈希值比对
+        def algo(p: Path) -> HashAlgorithm:
+            return remote[p].algo if p in remote else self.config.hash_algo
+
+        # 7z 列表文件每行一个路径, 文件名包含换行符的文件无法压缩, 跳过
+        unlisted: Set[Path] = set()
+
+        def listable(t: BackupUpdateType, p: Path) -> bool:
+            if t == "file" and any(c in str(p) for c in "\n\r"):
+                unlisted.add(p)
+                return False
+            return True
+
+        # 获取本地文件列表, 有文件变化记录时只检查变化的路径
+        local_list: List[Tuple[BackupUpdateType, Path]] = []
+        retain: Optional[List[Path]] = None
+        changes = get_journal(self.config.name).drain() if estimate is None else None
+        if changes is None:
+            # 遍历的同时计算哈希值, 复用遍历得到的 stat 结果
+            def iter_files() -> Iterator[LocalFile]:
+                for t, p, st in walk_tree(self.local, path_filter=self.path_filter):
+                    if not listable(t, p):
+                        continue
+                    local_list.append((t, p))
+                    if t == "file":
+                        yield p, algo(p), st
+
+            files: Iterable[LocalFile] = iter_files()
+        else:
+            self.logger.debug(f"根据文件变化记录检查 {Style.YELLOW(len(changes))} 个路径")
+            local_list, checked = await run_sync(self.get_journal_list)(state, changes)
+            local_list = [(t, p) for t, p in local_list if listable(t, p)]
+            files = [(p, algo(p), None) for p in checked if p not in unlisted]
+            retain = [p for t, p in local_list if t == "file"]
+
+        # 计算文件哈希值, 未检查的文件沿用远程哈希值
+        # stream 模式在计算哈希值的同时暂存新增的文件, 之后直接压缩暂存的文件
+        # 已备份的文件 stat 变化时内容不一定变化, 比对后只补充复制内容变化的文件
+        stream = self.config.staging == "stream" and estimate is None
+        hasher = Hasher(
+            self.config.hash_workers,
+            self.stage if stream else None,
+            lambda p: p not in remote,
+        )
+        md5_cache = await self.get_local_md5(files, hasher, retain)
+        md5_cache.update(
+            (p, remote[p].md5)
+            for t, p in local_list
+            if t == "file" and p not in md5_cache
+        )
+        local_list.sort()
+        for p in sorted(unlisted):
+            self.logger.warning(f"文件名包含换行符, 无法写入 7z 列表文件, 跳过: {str(p)!r}")
+        if estimate is not None:
+            estimate.entries, estimate.hash = len(local_list), hasher.stats
 
         # 对比本地待备份文件
         res: List[Tuple[BackupUpdateType, Path]] = []
@@ -95,62 +288,279 @@ class IncrementStrategy(Strategy):
                 del remote[p]
 
         res.extend(("del", v.path) for v in remote.values())
-        return [BackupUpdate(type=t, path=p, md5=md5_cache.get(p, "")) for t, p in res]
+        self.logger.info(f"文件比对完成, 哈希计算: {hasher.stats}")
+
+        # 内容与已备份的文件 (包括本次删除的文件) 相同时记录为复制, 不再重复压缩
+        # 复制项目直接引用压缩包中的源文件
+        sources: Dict[Tuple[str, str], Tuple[str, str]] = {}
+        aliases = self.get_aliases()
+        # 差异项目在压缩包中不是完整文件, 不作为源文件
+        for uuid, upd in state.values():
+            if upd.type in ("file", "copy"):
+                src_uuid, src_path = self.locate(uuid, upd, aliases)
+                sources.setdefault((upd.algo, upd.md5), (src_uuid, src_path.as_posix()))
+
+        update: List[BackupUpdate] = []
+        for t, p in res:
+            upd = BackupUpdate(
+                type=t,
+                path=p,
+                md5=md5_cache.get(p, ""),
+                algo=algo(p) if t == "file" else self.config.hash_algo,
+            )
+            if t == "file" and (src := sources.get((upd.algo, upd.md5))):
+                upd.type = "copy"
+                upd.source_uuid, upd.source = src
+            update.append(upd)
+
+        if copied := sum(upd.type == "copy" for upd in update):
+            self.logger.info(
+                f"{Style.YELLOW(copied)} 个文件与已备份的文件内容相同, 无需重新上传"
+            )
+        return update
+
+    async def cache_update(
+        self, update: List[BackupUpdate]
+    ) -> Tuple[Path, List[Path]]:
+        """准备待压缩的文件
+
+        `list` 模式直接压缩本地文件, 其余模式将文件暂存至缓存目录
+
+        Returns:
+            `Tuple[Path, List[Path]]`: (压缩根目录, 待压缩文件的相对路径)
+        """
+        files = [upd.path for upd in update if upd.type == "file"]
+        if self.config.staging == "list":
+            return self.local, files
+        if self.config.staging == "stream":
+            await run_sync(self.prune_stage)(files)
+            return self.stage, files
 
-    async def cache_update(self, update: List[BackupUpdate]) -> Path:
         cache = self.cache(get_uuid())
-        copyfile = run_sync(shutil.copyfile)
+        stage = run_sync(
+            link_file if self.config.staging == "link" else shutil.copyfile
+        )
+        for p in files:
+            mkdir((cache / p).parent)
+            await stage(self.local / p, cache / p)
+
+        return cache, files
+
+    @property
+    def stage(self) -> Path:
+        return self.cache("stage")
+
+    @property
+    def delta_stage(self) -> Path:
+        return self.cache("delta")
+
+    def signature_path(self, path: Path) -> Path:
+        return self.STATE / "signature" / md5(path.as_posix().encode()).hexdigest()
+
+    def make_deltas(
+        self, state: UpdateState, update: List[BackupUpdate]
+    ) -> Tuple[Dict[Path, Signature], List[Path]]:
+        """较大的修改文件只备份与上次备份版本的差异, 修改记录改为差异项目
+
+        上次备份版本的分块签名保存在本地, 签名缺失, 与上次备份版本不一致,
+        或差异链过长时备份完整文件, 并生成新的签名供下次备份使用
 
+        Returns:
+            `Tuple[Dict[Path, Signature], List[Path]]`: (本次备份版本的签名, 差异文件)
+        """
+        config = self.config.delta
+        if config.min_size <= 0:
+            return {}, []
+
+        block_size = config.block_size * 1024
+        signatures: Dict[Path, Signature] = {}
+        deltas: List[Path] = []
         for upd in update:
-            if upd.type == "dir":
-                mkdir(cache / upd.path)
-            elif upd.type == "file":
-                mkdir(cache / upd.path.parent)
-                await copyfile(self.local / upd.path, cache / upd.path)
+            if upd.type != "file":
+                continue
+            # stream 模式下读取已暂存的文件
+            fp = self.local / upd.path
+            if self.config.staging == "stream" and (self.stage / upd.path).is_file():
+                fp = self.stage / upd.path
+            size = fp.stat().st_size
+            if size < config.min_size * 1024 * 1024:
+                continue
 
-        return cache
+            base_uuid, base = state.get(upd.path, ("", None))
+            sig = Signature.load(self.signature_path(upd.path))
+            if (
+                base is None
+                or entry_type(base) != "file"
+                or base.chain >= config.max_chain
+                or sig is None
+                or (sig.md5, sig.algo, sig.block_size)
+                != (base.md5, upd.algo, block_size)
+            ):
+                signatures[upd.path] = make_signature(fp, upd.algo, block_size)
+                continue
 
-    async def compress_and_upload(self, cache: Path):
-        target = self.remote / self.uuid
-        await self.client.mkdir(target)
-        password = compress_password(self.uuid)
-        archive_dir = self.cache("archive")
-
-        self.logger.debug("开始压缩待备份文件...")
-        archives = await pack_7zip_multipart(
-            archive_dir / "7685.7z",
-            cache,
-            volume_size=100,
-            password=password,
-        )
-        self.logger.debug("待备份文件分卷压缩完成")
+            out = mkdir((self.delta_stage / upd.path).parent) / upd.path.name
+            signatures[upd.path], delta_size = make_delta(fp, sig, out)
+            # 差异过大时备份完整文件
+            if delta_size >= size * self.DELTA_RATIO:
+                out.unlink()
+                continue
 
-        self.logger.debug(
-            f"本地备份文件分卷压缩包目录: {Style.PATH_DEBUG(archive_dir)}"
+            upd.type = "delta"
+            upd.md5 = signatures[upd.path].md5
+            upd.source, upd.source_uuid = base.md5, base_uuid
+            upd.chain = base.chain + 1
+            deltas.append(upd.path)
+
+        if deltas:
+            self.logger.info(f"{Style.YELLOW(len(deltas))} 个文件仅备份与上次备份的差异")
+        return signatures, deltas
+
+    def save_signatures(
+        self, signatures: Dict[Path, Signature], update: List[BackupUpdate]
+    ) -> None:
+        for p, sig in signatures.items():
+            sig.dump(self.signature_path(p))
+        for upd in update:
+            if upd.type == "del":
+                self.signature_path(upd.path).unlink(missing_ok=True)
+
+    def prune_stage(self, files: List[Path]) -> None:
+        """整理计算哈希值时暂存的文件
+
+        删除内容未修改的文件; 未在计算哈希值时暂存的修改文件 (已备份的文件,
+        状态缓存命中但与远程不一致的文件) 补充复制
+        """
+        stage = self.stage
+        wanted = set(files)
+        for t, p, _ in walk_tree(stage):
+            if t == "file" and p not in wanted:
+                (stage / p).unlink()
+
+        for p in files:
+            if not (stage / p).is_file():
+                mkdir((stage / p).parent)
+                shutil.copyfile(self.local / p, stage / p)
+
+    def split_stored(
+        self, root: Path, files: List[Path]
+    ) -> Tuple[List[Path], List[Path]]:
+        """将已压缩的文件 (图片, 视频, 压缩包等) 分离出来, 仅存储不再压缩
+
+        Returns:
+            `Tuple[List[Path], List[Path]]`: (需要压缩的文件, 仅存储的文件)
+        """
+        compression = self.config.compression
+        if compression.level <= 0:
+            return files, []
+
+        extensions = {e.lower().lstrip(".") for e in compression.store_extensions}
+        packed: List[Path] = []
+        stored: List[Path] = []
+        for p in files:
+            try:
+                incompressible = is_incompressible(
+                    root / p, extensions, compression.entropy_threshold
+                )
+            except OSError:
+                incompressible = False
+            (stored if incompressible else packed).append(p)
+        return packed, stored
+
+    async def pack_and_upload(
+        self, name: str, root: Path, files: List[Path], switches: List[str]
+    ) -> Tuple[List[str], Optional[ArchiveIndex]]:
+        """分卷压缩并上传, 压缩的同时上传已完成的分卷
+
+        Returns:
+            `Tuple[List[str], Optional[ArchiveIndex]]`: (分卷文件名, 分卷索引)
+        """
+        listing: List[Dict[str, str]] = []
+        volumes = iter_7zip_multipart(
+            self.cache("archive") / name,
+            root,
+            volume_size=self.VOLUME_SIZE,
+            password=compress_password(self.uuid),
+            files=files,
+            listing=listing,
+            switches=switches,
         )
-        self.logger.info(f"[{Style.CYAN(self.uuid)}] 正在上传...")
+        try:
+            names = await self.upload_volumes(volumes)
+        finally:
+            await volumes.aclose()
 
-        async def upload(archive: Path) -> None:
-            if err := await self.client.put_file(archive, target / archive.name):
-                raise StopBackup(
-                    f"上传分卷压缩包 {Style.PATH(archive.name)} 失败"
-                ) from err
+        if not listing:
+            self.logger.warning(
+                f"读取分卷压缩包 {Style.PATH(name)} 的内容失败, "
+                "部分恢复时将下载全部分卷"
+            )
+        return names, build_index(listing, names, self.VOLUME_SIZE * 1024 * 1024)
 
-        await asyncio.gather(*[upload(i) for i in archives])
+    async def compress_and_upload(
+        self, root: Path, files: List[Path], deltas: Sequence[Path] = ()
+    ) -> None:
+        target = self.remote / self.uuid
+        await self.client.mkdir(target)
 
-        mpcache = cache / "mp.7685"
-        mpcache.write_bytes(ByteWriter().write([i.name for i in archives]).get())
+        # 已压缩的文件打包为单独的仅存储压缩包, 避免浪费时间重复压缩
+        # 差异文件位于单独的暂存目录, 同样打包为单独的压缩包
+        packed, stored = await run_sync(self.split_stored)(root, files)
+        switches = self.config.compression.switches()
+        streams = [
+            ("7685.7z", root, packed, switches),
+            ("7685.store.7z", root, stored, ["-mx0"]),
+            ("7685.delta.7z", self.delta_stage, list(deltas), switches),
+        ]
+        names: List[str] = []
+        indexes: List[ArchiveIndex] = []
+
+        if files or deltas:
+            self.logger.debug(
+                f"开始压缩待备份文件, 其中 {Style.YELLOW(len(stored))} 个文件仅存储"
+            )
+            self.logger.info(f"[{Style.CYAN(self.uuid)}] 正在上传...")
+        for name, src, paths, args in streams:
+            if not paths:
+                continue
+            volumes, index = await self.pack_and_upload(name, src, paths, args)
+            names.extend(volumes)
+            if index is not None:
+                indexes.append(index)
+        if files or deltas:
+            self.logger.debug("待备份文件分卷压缩上传完成")
+
+        mpcache = self.cache(self.uuid) / "mp.7685"
+        mpcache.write_bytes(ByteWriter().write(sorted(names)).get())
         self.logger.debug(f"上传分卷清单: {Style.PATH_DEBUG(mpcache)}")
         if err := await self.client.put_file(mpcache, target / mpcache.name):
             raise StopBackup("上传分卷清单失败") from err
 
+        # 上传分卷索引, 恢复部分文件时只需下载对应的分卷
+        # 索引缺失不影响恢复, 上传失败时仅记录警告
+        if indexes:
+            idx_cache = self.cache(self.uuid) / "index.7685"
+            idx_cache.write_bytes(ByteWriter().write(indexes).get())
+            self.logger.debug(f"上传分卷索引: {Style.PATH_DEBUG(idx_cache)}")
+            if err := await self.client.put_file(idx_cache, target / idx_cache.name):
+                self.logger.warning(f"上传分卷索引失败: {Style.RED(err)}")
+
     @override
     async def _make_backup(self) -> None:
+        try:
+            await self.increment_backup()
+        except BaseException:
+            # 已取出的文件变化记录未能备份, 下次备份时完整遍历
+            get_journal(self.config.name).invalidate()
+            raise
+
+    async def increment_backup(self) -> None:
         self.check_local()
 
         # 获取本次需要备份的文件
         self.logger.info("正在比对本地待备份文件...")
-        update = await self.get_update_list()
+        state = await self.get_updates(self.record)
+        update = await self.get_update_list(state)
         if not update:
             self.logger.info("本次备份未更新文件...跳过备份")
             return
@@ -160,90 +570,610 @@ class IncrementStrategy(Strategy):
         self.logger.info(f"开始增量备份: {Style.PATH(self.local)}")
         self.logger.info(f"备份uuid: [{Style.CYAN(self.uuid)}]")
 
-        # 复制文件到缓存目录
-        cache = await self.cache_update(update)
+        # 较大的修改文件只备份差异, 准备待压缩的文件
+        signatures, deltas = await run_sync(self.make_deltas)(state, update)
+        root, files = await self.cache_update(update)
 
         # 压缩文件并上传
-        await self.compress_and_upload(cache)
+        await self.compress_and_upload(root, files, deltas)
 
         # 生成本次备份清单
-        upd_cache = cache / "update.7685"
+        upd_cache = self.cache(self.uuid) / "update.7685"
         upd_cache.write_bytes(ByteWriter().write(update).get())
         if err := await self.client.put_file(upd_cache, target / upd_cache.name):
             raise StopBackup(f"上传备份清单时出现错误: {err}") from err
 
+        # 合并本次备份, 按需上传备份状态检查点
+        apply_updates(state, self.uuid, update)
+        checkpoint = self.need_checkpoint() and await self.put_checkpoint(state)
+
         # 更新备份记录
-        await self.add_record()
+        await self.add_record(checkpoint=checkpoint)
+        await run_sync(self.save_signatures)(signatures, update)
+
+        # 更新本地备份状态缓存
+        uuids = [rec.uuid for rec in self.record]
+        await run_sync(self.state_cache.save)(uuids, state)
+
         self.logger.success(f"[{Style.CYAN(self.uuid)}] 备份完成!")
         self.logger.success(f"本次备份更新 {Style.YELLOW(len(update))} 个项目")
 
-    async def get_updates(
-        self, records: List[BackupRecord]
-    ) -> Dict[Path, Tuple[str, BackupUpdate]]:
-        updates: Dict[Path, Tuple[str, BackupUpdate]] = {}
-        for rec in records:
-            self.logger.debug(f"加载备份 [{Style.CYAN(rec.uuid)}]")
+    @override
+    async def _make_estimate(self) -> BackupEstimate:
+        estimate = BackupEstimate()
+        start = time.perf_counter()
+        state = await self.get_updates(self.record)
+        update = await self.get_update_list(state, estimate)
+        estimate.elapsed = time.perf_counter() - start
+
+        # 差异备份的文件按完整文件估算
+        files: List[Tuple[Path, int]] = []
+        for upd in update:
+            if upd.type == "del":
+                estimate.deleted += 1
+            elif upd.path in state:
+                estimate.changed += 1
+            else:
+                estimate.new += 1
+            if upd.type == "file":
+                fp = self.local / upd.path
+                files.append((fp, fp.stat().st_size))
+
+        estimate.files = len(files)
+        estimate.size = sum(size for _, size in files)
+        compress = archive_compressor(self.config.compression)
+        estimate.compressed = await run_sync(estimate_compressed)(files, compress)
+        return estimate
+
+    @property
+    def state_cache(self) -> StateCache:
+        return StateCache(self.STATE / "remote.json")
+
+    async def get_checkpoint(self, uuid: str) -> UpdateState:
+        cache_fp = self.cache(uuid) / "checkpoint.7685"
+        remote_fp = self.remote / uuid / "checkpoint.7685"
+
+        # 下载备份状态检查点
+        if err := await self.client.get_file(cache_fp, remote_fp):
+            raise StopOperation(f"下载备份状态检查点 {remote_fp} 失败") from err
+
+        data = ByteReader(cache_fp.read_bytes()).read_list()
+        cache_fp.unlink()
+        return load_state(data)
+
+    async def put_checkpoint(
+        self, state: UpdateState, uuid: Optional[str] = None
+    ) -> bool:
+        uuid = uuid or self.uuid
+        cache_fp = self.cache(uuid) / "checkpoint.7685"
+        remote_fp = self.remote / uuid / "checkpoint.7685"
+
+        cache_fp.write_bytes(ByteWriter().write(dump_state(state)).get())
+        self.logger.debug(f"上传备份状态检查点: {Style.PATH_DEBUG(remote_fp)}")
+        err = await self.client.put_file(cache_fp, remote_fp)
+        cache_fp.unlink()
+        if err:
+            self.logger.warning(f"上传备份状态检查点失败: {Style.RED(err)}")
+        return err is None
+
+    def need_checkpoint(self) -> bool:
+        """距上一个检查点的备份数 (含本次备份) 是否达到设定值"""
+        if self.config.checkpoint_interval <= 0:
+            return False
+
+        count = 1
+        for rec in reversed(self.record):
+            if rec.checkpoint:
+                break
+            count += 1
+        return count >= self.config.checkpoint_interval
+
+    async def get_updates(self, records: List[BackupRecord]) -> UpdateState:
+        """获取合并指定备份记录后的备份状态
 
-            # 遍历备份清单
-            for upd in await self.get_update_info(rec.uuid):
-                updates[upd.path] = (rec.uuid, upd)
+        优先使用本地缓存的备份状态, 其次使用最近的备份状态检查点,
+        只下载其后新增的备份清单
 
+        Args:
+            records (List[BackupRecord]): 按时间排序的备份记录, 需为 `self.record` 的前缀
+
+        Returns:
+            `UpdateState`: 相对路径 -> (备份uuid, 备份清单项)
+        """
+        uuids = [rec.uuid for rec in records]
+        count, state = await run_sync(self.state_cache.load)(uuids)
+        if count:
+            self.logger.debug(
+                f"使用本地备份状态缓存, 已合并 {Style.YELLOW(count)} 条备份记录"
+            )
+        elif records:
+            self.logger.debug("本地备份状态缓存不存在或已失效, 正在从远程重建...")
+
+        # 从本地缓存之后最近的检查点开始合并
+        for idx in range(len(records) - 1, count - 1, -1):
+            if records[idx].checkpoint:
+                uuid = records[idx].uuid
+                self.logger.debug(f"加载备份状态检查点 [{Style.CYAN(uuid)}]")
+                count, state = idx + 1, await self.get_checkpoint(uuid)
+                break
+
+        async for rec, upds in self.iter_update_info(records[count:]):
+            apply_updates(state, rec.uuid, upds)
             self.logger.debug(f"备份 [{Style.CYAN(rec.uuid)}] 加载完成")
 
-        # 移除类型为del(删除)的记录
-        return {
-            key: (uuid, upd)
-            for key, (uuid, upd) in updates.items()
-            if upd.type != "del"
-        }
+        # 仅缓存最新的备份状态
+        if count < len(records) and uuids == [rec.uuid for rec in self.record]:
+            await run_sync(self.state_cache.save)(uuids, state)
 
-    @override
-    async def _make_recovery(self, record: BackupRecord) -> Path:
-        records = [rec for rec in self.record if rec.timestamp <= record.timestamp]
-        cache = self.cache(record.uuid)
+        return state
 
-        # 获取需要更新的文件清单
-        updates = await self.get_updates(records)
+    async def get_range_updates(
+        self, start: int, end: int
+    ) -> Tuple[UpdateState, UpdateState]:
+        """获取 `self.record[start : end + 1]` 之前与之后的备份状态
+
+        与 `get_updates` 相同, 优先使用本地缓存与 `start` 之前最近的检查点,
+        之后的备份清单只下载一次
+
+        Returns:
+            `Tuple[UpdateState, UpdateState]`: (范围之前的备份状态, 范围之后的备份状态)
+        """
+        records = self.record[: end + 1]
+        uuids = [rec.uuid for rec in records[:start]]
+        count, state = await run_sync(self.state_cache.load)(uuids)
+        for idx in range(start - 1, count - 1, -1):
+            if records[idx].checkpoint:
+                uuid = records[idx].uuid
+                self.logger.debug(f"加载备份状态检查点 [{Style.CYAN(uuid)}]")
+                count, state = idx + 1, await self.get_checkpoint(uuid)
+                break
+
+        before: UpdateState = {}
+        async for rec, upds in self.iter_update_info(records[count:]):
+            if rec.uuid == records[start].uuid:
+                before = dict(state)
+            apply_updates(state, rec.uuid, upds)
+        return before, state
+
+    async def get_archive_indexes(self, uuid: str) -> List[ArchiveIndex]:
+        """下载分卷索引, 不存在时返回空列表"""
+        cache_fp = self.cache(uuid) / "index.7685"
+        remote_fp = self.remote / uuid / "index.7685"
+
+        if await self.client.get_file(cache_fp, remote_fp):
+            return []
+
+        def decode() -> List[ArchiveIndex]:
+            try:
+                data = ByteReader(cache_fp.read_bytes()).read()
+                # 早期的分卷索引只包含一个压缩包
+                items = data if isinstance(data, list) else [data]
+                return [ArchiveIndex.model_validate(i.model_dump()) for i in items]
+            except Exception:
+                return []
+            finally:
+                cache_fp.unlink(missing_ok=True)
+
+        return await run_sync(decode)()
+
+    async def fetch_archive(self, uuid: str, files: List[Path]) -> Path:
+        """下载一次备份的分卷压缩包, 解压其中的指定文件
+
+        Args:
+            uuid (str): 备份uuid
+            files (List[Path]): 需要解压的文件相对路径
+
+        Returns:
+            `Path`: 解压目录
+        """
+        cache = self.cache(uuid)
+        target = mkdir(cache / "extract")
+        temp = mkdir(cache / "temp")
+        remote = self.remote / uuid
 
-        # 下载恢复备份需要的压缩包并解压
         mpcache = cache / "mp.7685"
-        for uuid in {i[0] for i in updates.values()}:
-            temp = mkdir(cache / "temp")
-            remote = self.remote / uuid
-            self.logger.debug(f"下载备份文件分卷清单: [{Style.CYAN(uuid)}]")
-            if err := await self.client.get_file(mpcache, remote / mpcache.name):
-                raise StopRecovery(
-                    f"[{Style.CYAN(uuid)}] 备份文件分卷清单下载失败"
-                ) from err
-
-            archive_name = ByteReader(mpcache.read_bytes()).read_list()
-            for name in archive_name:
-                if err := await self.client.get_file(temp / name, remote / name):
-                    raise StopRecovery(
-                        f"[{Style.CYAN(uuid)}] 备份压缩包 {Style.PATH(name)} 下载失败"
-                    ) from err
-
-            self.logger.debug(f"解压备份文件: [{Style.CYAN(uuid)}]")
-            password = compress_password(uuid)
-            archive_head = temp / archive_name[0]
-            await unpack_7zip(archive_head, mkdir(cache / uuid), password)
-            shutil.rmtree(temp)
-
-        # 从每个压缩包中提取需要的文件
-        result = mkdir(cache / "result")
-        for uuid, upd in updates.values():
-            src = cache / uuid / upd.path
-            dst = result / upd.path
-
-            match upd.type:
-                case "file":
+        self.logger.debug(f"下载备份文件分卷清单: [{Style.CYAN(uuid)}]")
+        if err := await self.client.get_file(mpcache, remote / mpcache.name):
+            raise StopRecovery(f"[{Style.CYAN(uuid)}] 备份文件分卷清单下载失败") from err
+
+        # 一次备份可能包含多个分卷压缩包, 按压缩包名称分组
+        archives: Dict[str, List[str]] = {}
+        for name in sorted(ByteReader(mpcache.read_bytes()).read_list()):
+            archives.setdefault(name.rpartition(".")[0], []).append(name)
+        if not archives:
+            return target
+
+        # 根据分卷索引跳过不包含所需文件的压缩包和分卷, 以稀疏文件占位
+        # 旧版本备份没有分卷索引, 下载全部分卷
+        indexes = await self.get_archive_indexes(uuid)
+        downloads: List[str] = []
+        # (第一个分卷, 需要解压的文件, 以稀疏文件占位的分卷)
+        extracts: List[Tuple[Path, List[Path], List[str]]] = []
+        for volumes in archives.values():
+            index = next((i for i in indexes if i.volumes == volumes), None)
+            if index is None:
+                downloads.extend(volumes)
+                extracts.append((temp / volumes[0], files, []))
+                continue
+
+            paths = [p for p in files if p.as_posix() in index.files]
+            if not paths:
+                continue
+            needed = required_volumes(index, paths)
+            skipped = [n for i, n in enumerate(volumes) if i not in needed]
+            for name in skipped:
+                placeholder_volume(temp / name, index.volume_size)
+            self.logger.debug(
+                f"[{Style.CYAN(uuid)}] 需要下载 {Style.YELLOW(len(needed))}"
+                f"/{Style.YELLOW(len(volumes))} 个分卷"
+            )
+            downloads.extend(n for i, n in enumerate(volumes) if i in needed)
+            extracts.append((temp / volumes[0], paths, skipped))
+
+        await self.download_volumes(uuid, downloads, temp)
+
+        self.logger.debug(f"解压备份文件: [{Style.CYAN(uuid)}]")
+        password = compress_password(uuid)
+        for archive_head, paths, skipped in extracts:
+            try:
+                await unpack_7zip(archive_head, target, password, paths)
+            except RuntimeError:
+                if not skipped:
+                    raise
+                # 分卷索引与压缩包的实际布局不一致时, 下载全部分卷后重试一次
+                self.logger.warning(
+                    f"[{Style.CYAN(uuid)}] 按分卷索引解压失败, 下载全部分卷后重试"
+                )
+                for p in paths:
+                    (target / p).unlink(missing_ok=True)
+                for name in skipped:
+                    (temp / name).unlink(missing_ok=True)
+                await self.download_volumes(uuid, skipped, temp)
+                await unpack_7zip(archive_head, target, password, paths)
+        shutil.rmtree(temp)
+        return target
+
+    async def restore_updates(self, updates: UpdateState, result: Path) -> Path:
+        """下载备份状态中的文件, 组装至恢复结果目录
+
+        Args:
+            updates (UpdateState): 需要恢复的项目
+            result (Path): 恢复结果目录
+
+        Returns:
+            `Path`: 恢复结果目录
+        """
+        # 每次备份只需解压仍在备份状态中的文件
+        # 复制项目从源文件所在的备份中解压, 同一源文件可能对应多个路径
+        # 差异项目解压基准版本与之后的各个差异至临时目录, 全部解压后依次应用
+        aliases = self.get_aliases()
+        work = result.with_name(f"{result.name}.delta")
+        files: Dict[str, Dict[Path, List[Path]]] = {}
+        chains: Dict[Path, int] = {}
+        manifests: Dict[str, Dict[Path, BackupUpdate]] = {}
+
+        def add(uuid: str, upd: BackupUpdate, dst: Path) -> None:
+            uuid, member = self.locate(uuid, upd, aliases)
+            files.setdefault(uuid, {}).setdefault(member, []).append(dst)
+
+        for p, (uuid, upd) in updates.items():
+            if upd.type == "delta":
+                chain = await self.get_delta_chain(uuid, upd, aliases, manifests)
+                for i, (u, link) in enumerate(chain):
+                    add(u, link, work / str(i) / p)
+                chains[p] = len(chain)
+            elif entry_type(upd) == "file":
+                add(uuid, upd, result / p)
+
+        mkdir(result)
+        for p, (_, upd) in updates.items():
+            if upd.type == "dir":
+                mkdir(result / p)
+
+        def collect(extracted: Path, members: Dict[Path, List[Path]]) -> None:
+            for member, paths in members.items():
+                for i, dst in enumerate(paths, 1):
                     mkdir(dst.parent)
                     if dst.exists():
                         dst.unlink(True)
-                    src.rename(dst)
-                case "dir":
-                    mkdir(dst)
-                case "del":
-                    pass
+                    if i < len(paths):
+                        shutil.copyfile(extracted / member, dst)
+                    else:
+                        (extracted / member).rename(dst)
+            shutil.rmtree(extracted)
+
+        # 同时处理多个备份, 一个备份解压时其他备份的分卷仍在下载
+        # 每个备份解压完成后立即移出文件并删除分卷与解压目录
+        window = asyncio.Semaphore(self.RECOVERY_WINDOW)
+
+        async def restore(uuid: str, members: Dict[Path, List[Path]]) -> None:
+            async with window:
+                extracted = await self.fetch_archive(uuid, list(members))
+                await run_sync(collect)(extracted, members)
+            self.logger.debug(f"备份 [{Style.CYAN(uuid)}] 恢复完成")
+
+        tasks = [asyncio.create_task(restore(u, p)) for u, p in files.items()]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        if chains:
+            self.logger.debug(f"应用 {Style.YELLOW(len(chains))} 个文件的差异")
+            rebuild = run_sync(self.rebuild_delta)
+            for p, length in chains.items():
+                await rebuild(p, updates[p][1], length, work, result)
+            await run_sync(shutil.rmtree)(work, True)
 
         return result
+
+    async def get_delta_chain(
+        self,
+        uuid: str,
+        upd: BackupUpdate,
+        aliases: Dict[str, str],
+        manifests: Dict[str, Dict[Path, BackupUpdate]],
+    ) -> List[Tuple[str, BackupUpdate]]:
+        """获取差异项目的差异链
+
+        差异项目的基准版本为 `source_uuid` 备份清单中的同一路径,
+        依次向前查找直到完整文件或复制项目
+
+        Args:
+            uuid (str): 提供该项目的备份uuid
+            upd (BackupUpdate): 差异项目
+            aliases (Dict[str, str]): `get_aliases` 的结果
+            manifests (Dict[str, Dict[Path, BackupUpdate]]): 已下载的备份清单
+
+        Returns:
+            `List[Tuple[str, BackupUpdate]]`: 从基准版本开始的 (备份uuid, 项目)
+        """
+        chain = [(uuid, upd)]
+        while upd.type == "delta":
+            if upd.source_uuid not in aliases:
+                raise StopRecovery(
+                    f"{Style.PATH(upd.path)} 引用的备份 "
+                    f"[{Style.CYAN(upd.source_uuid)}] 不存在"
+                )
+            # 基准版本所在的备份可能已被合并
+            uuid = aliases[upd.source_uuid]
+            if uuid not in manifests:
+                info = await self.get_update_info(uuid)
+                manifests[uuid] = {u.path: u for u in info}
+            base = manifests[uuid].get(upd.path)
+            if base is None or entry_type(base) != "file" or base.md5 != upd.source:
+                raise StopRecovery(f"{Style.PATH(upd.path)} 的差异基准版本不存在")
+            chain.append((uuid, base))
+            upd = base
+        return chain[::-1]
+
+    def rebuild_delta(
+        self, path: Path, upd: BackupUpdate, length: int, work: Path, result: Path
+    ) -> None:
+        """依次应用差异链中的差异, 校验后移动至恢复结果目录"""
+        current = work / "0" / path
+        for i in range(1, length):
+            out = mkdir((work / "out" / str(i) / path).parent) / path.name
+            try:
+                apply_delta(current, work / str(i) / path, out)
+            except ValueError as err:
+                raise StopRecovery(f"{Style.PATH(path)} 应用差异失败: {err}") from err
+            current.unlink()
+            current = out
+
+        if get_hash(current, upd.algo) != upd.md5:
+            raise StopRecovery(f"{Style.PATH(path)} 应用差异后哈希值不一致")
+        dst = result / path
+        mkdir(dst.parent)
+        if dst.exists():
+            dst.unlink(True)
+        current.rename(dst)
+
+    def get_aliases(self) -> Dict[str, str]:
+        """备份uuid -> 当前包含该备份内容的备份uuid, 包括已被合并的备份"""
+        aliases: Dict[str, str] = {}
+        for rec in self.record:
+            aliases.update((uuid, rec.uuid) for uuid in rec.merged)
+        aliases.update((rec.uuid, rec.uuid) for rec in self.record)
+        return aliases
+
+    def locate(
+        self,
+        uuid: str,
+        upd: BackupUpdate,
+        aliases: Optional[Dict[str, str]] = None,
+    ) -> Tuple[str, Path]:
+        """获取文件在压缩包中的位置
+
+        Args:
+            uuid (str): 提供该项目的备份uuid
+            upd (BackupUpdate): 文件或复制项目
+            aliases (Optional[Dict[str, str]], optional): `get_aliases` 的结果
+
+        Returns:
+            `Tuple[str, Path]`: (压缩包所在的备份uuid, 压缩包中的相对路径)
+        """
+        if upd.type != "copy":
+            return uuid, upd.path
+
+        aliases = aliases if aliases is not None else self.get_aliases()
+        if upd.source_uuid not in aliases:
+            raise StopOperation(
+                f"{Style.PATH(upd.path)} 引用的备份 [{Style.CYAN(upd.source_uuid)}] 不存在"
+            )
+        # 源备份已被合并时, 源文件以哈希值为名保存
+        if aliases[upd.source_uuid] != upd.source_uuid:
+            return aliases[upd.source_uuid], REF_DIR / upd.md5
+        return upd.source_uuid, Path(upd.source)
+
+    def get_records_until(self, record: BackupRecord) -> List[BackupRecord]:
+        return [rec for rec in self.record if rec.timestamp <= record.timestamp]
+
+    @override
+    async def _make_recovery(self, record: BackupRecord) -> Path:
+        # 获取需要更新的文件清单
+        updates = await self.get_updates(self.get_records_until(record))
+        return await self.restore_updates(updates, self.cache(record.uuid) / "result")
+
+    @override
+    async def _make_partial_recovery(
+        self, record: BackupRecord, patterns: List[str]
+    ) -> Path:
+        updates = await self.get_updates(self.get_records_until(record))
+        updates = {p: v for p, v in updates.items() if match_path(p, patterns)}
+        if not updates:
+            raise StopRecovery("备份中没有匹配的文件")
+
+        self.logger.info(f"匹配到 {Style.YELLOW(len(updates))} 个项目")
+        return await self.restore_updates(updates, self.cache(record.uuid) / "result")
+
+    @override
+    async def _make_inplace_recovery(
+        self, record: BackupRecord
+    ) -> Tuple[Path, List[Path]]:
+        updates = await self.get_updates(self.get_records_until(record))
+        # 被过滤规则排除的本地项目不在备份中, 保持原样
+        local = await run_sync(list)(walk_tree(self.local, 0, self.path_filter))
+        local_list = sorted((t, p) for t, p, _ in local)
+        local_type = {p: t for t, p in local_list}
+        local_stat = {p: st for _, p, st in local}
+
+        # 计算本地文件的哈希值, 优先使用文件状态缓存
+        fp_list = [
+            (p, upd.algo, local_stat[p])
+            for p, (_, upd) in updates.items()
+            if entry_type(upd) == "file" and local_type.get(p) == "file"
+        ]
+        hasher = Hasher(self.config.hash_workers)
+        md5_cache = await self.get_local_md5(fp_list, hasher)
+
+        # 仅恢复缺失或内容不一致的项目, 删除备份中不存在的项目
+        changed = {
+            p: (uuid, upd)
+            for p, (uuid, upd) in updates.items()
+            if local_type.get(p) != entry_type(upd)
+            or (entry_type(upd) == "file" and md5_cache[p] != upd.md5)
+        }
+        extra = [
+            p
+            for t, p in local_list
+            if p not in updates or entry_type(updates[p][1]) != t
+        ]
+        self.logger.info(
+            f"本地 {Style.YELLOW(len(updates) - len(changed))} 个项目无需恢复, "
+            f"需要恢复 {Style.YELLOW(len(changed))} 个项目, "
+            f"删除 {Style.YELLOW(len(extra))} 个项目"
+        )
+
+        result = self.cache(record.uuid) / "result"
+        return await self.restore_updates(changed, result), extra
+
+    @override
+    async def _make_compact(self, records: List[BackupRecord]) -> None:
+        uuids = [rec.uuid for rec in self.record]
+        start, end = uuids.index(records[0].uuid), uuids.index(records[-1].uuid)
+        merged = {rec.uuid for rec in records}
+        # 合并后的备份同时代替之前被合并至范围内备份的备份
+        aliases = merged.union(*(rec.merged for rec in records))
+        later = self.record[end + 1 :]
+
+        # 合并范围前后的备份状态, 最新的备份状态通常可直接读取本地缓存
+        before, after = await self.get_range_updates(start, end)
+        latest = await self.get_updates(self.record) if later else after
+
+        # 范围内的净变化: 仍然存在的最新版本, 以及范围内被删除的项目
+        # 源文件同在范围内的复制项目与差异项目改为普通文件
+        def convert(upd: BackupUpdate) -> BackupUpdate:
+            if upd.type == "delta" or (
+                upd.type == "copy" and upd.source_uuid in aliases
+            ):
+                return BackupUpdate(
+                    type="file", path=upd.path, md5=upd.md5, algo=upd.algo
+                )
+            return upd
+
+        provided = {p: v for p, v in after.items() if v[0] in merged}
+        update = [convert(upd) for _, upd in provided.values()]
+        update.extend(
+            BackupUpdate(type="del", path=p, md5="") for p in before if p not in after
+        )
+        update.sort(key=lambda upd: upd.path)
+        converted = {upd.path: upd for upd in update if upd.type != "del"}
+        self.logger.info(
+            f"合并后的备份uuid: [{Style.CYAN(self.uuid)}], "
+            f"包含 {Style.YELLOW(len(update))} 个项目"
+        )
+
+        # 之后的备份中引用了范围内文件的复制项目, 源文件以哈希值为名保存
+        refs: UpdateState = {}
+        async for _, upds in self.iter_update_info(later):
+            for upd in upds:
+                if upd.type == "copy" and upd.source_uuid in aliases:
+                    refs[REF_DIR / upd.md5] = ("", upd)
+        if refs:
+            self.logger.info(
+                f"保留 {Style.YELLOW(len(refs))} 个被之后的备份引用的源文件"
+            )
+
+        # 生成合并后的备份
+        target = self.remote / self.uuid
+        try:
+            stage = self.cache(self.uuid) / "stage"
+            physical = {
+                p: v for p, v in provided.items() if converted[p].type == "file"
+            }
+            result = await self.restore_updates({**physical, **refs}, stage)
+            files = [*physical, *refs]
+            await self.compress_and_upload(result, files)
+            await run_sync(shutil.rmtree)(result, True)
+
+            upd_cache = self.cache(self.uuid) / "update.7685"
+            upd_cache.write_bytes(ByteWriter().write(update).get())
+            if err := await self.client.put_file(upd_cache, target / upd_cache.name):
+                raise StopOperation(f"上传备份清单时出现错误: {err}") from err
+
+            checkpoint = records[-1].checkpoint and await self.put_checkpoint(
+                remap_state(after, merged, self.uuid, converted)
+            )
+        except Exception:
+            await self.client.rmdir(target)
+            raise
+
+        # 之后的检查点中引用了被合并的备份, 改为引用合并后的备份
+        # 无法更新的检查点不再使用
+        for rec in later:
+            if rec.checkpoint:
+                try:
+                    state = await self.get_checkpoint(rec.uuid)
+                except StopOperation:
+                    state = None
+                if state is None or not await self.put_checkpoint(
+                    remap_state(state, merged, self.uuid, converted), rec.uuid
+                ):
+                    rec.checkpoint = False
+
+        # 更新备份记录, 删除被合并的备份
+        self.record = [
+            *self.record[:start],
+            BackupRecord(
+                uuid=self.uuid,
+                timestamp=records[-1].timestamp,
+                timestr=records[-1].timestr,
+                checkpoint=checkpoint,
+                merged=sorted(aliases),
+            ),
+            *later,
+        ]
+        await self.save_record()
+        for uuid in merged:
+            await self.client.rmdir(self.remote / uuid)
+
+        # 更新本地备份状态缓存
+        await run_sync(self.state_cache.save)(
+            [rec.uuid for rec in self.record],
+            remap_state(latest, merged, self.uuid, converted),
+        )
+        self.logger.success(
+            f"已合并 {Style.YELLOW(len(records))} 个备份至 [{Style.CYAN(self.uuid)}]"
+        )
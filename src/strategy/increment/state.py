@@ -0,0 +1,119 @@
+from hashlib import md5
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.const import BackupUpdateType
+from src.models import BackupUpdate
+from src.utils import json
+
+type UpdateState = Dict[Path, Tuple[str, BackupUpdate]]
+"""相对路径 -> (提供该文件的备份uuid, 备份清单项)"""
+
+REF_DIR = Path(".7685-ref")
+"""被合并的备份中仍被复制项目引用的源文件, 以哈希值为名保存在合并后备份的该目录下"""
+
+
+def entry_type(upd: BackupUpdate) -> BackupUpdateType:
+    """备份清单项在本地对应的类型, 复制与差异项目为普通文件"""
+    return "file" if upd.type in ("copy", "delta") else upd.type
+
+
+def apply_updates(
+    state: UpdateState, uuid: str, updates: Iterable[BackupUpdate]
+) -> UpdateState:
+    """将一次备份的修改记录合并到备份状态中"""
+    for upd in updates:
+        if upd.type != "del":
+            state[upd.path] = (uuid, upd)
+        elif upd.path in state:
+            del state[upd.path]
+    return state
+
+
+def remap_state(
+    state: UpdateState,
+    uuids: Set[str],
+    new: str,
+    updates: Optional[Dict[Path, BackupUpdate]] = None,
+) -> UpdateState:
+    """将备份状态中由 `uuids` 提供的项目改为由 `new` 提供
+
+    指定 `updates` 时, 这些项目的备份清单项替换为 `updates` 中的对应项
+    """
+    updates = updates or {}
+    return {
+        path: (new, updates.get(path, upd)) if uuid in uuids else (uuid, upd)
+        for path, (uuid, upd) in state.items()
+    }
+
+
+def dump_state(state: UpdateState) -> List[List[Any]]:
+    """将备份状态转换为可序列化的列表"""
+    return [
+        [uuid, upd.model_dump(mode="json", exclude_defaults=True)]
+        for uuid, upd in state.values()
+    ]
+
+
+def load_state(data: List[List[Any]]) -> UpdateState:
+    state: UpdateState = {}
+    for uuid, upd in data:
+        upd = BackupUpdate.model_validate(upd)
+        state[upd.path] = (uuid, upd)
+    return state
+
+
+def chain_hash(uuids: List[str]) -> str:
+    return md5("\n".join(uuids).encode()).hexdigest()
+
+
+class StateCache(object):
+    """本地物化的远程备份状态
+
+    记录合并至某条备份记录为止的备份状态, 以及该记录之前的备份记录链的哈希值
+
+    备份记录链未被改写时, 只需合并之后新增的备份清单即可得到最新状态
+    """
+
+    __fp: Path
+
+    def __init__(self, fp: Path) -> None:
+        self.__fp = fp
+
+    def load(self, uuids: List[str]) -> Tuple[int, UpdateState]:
+        """读取本地备份状态
+
+        Args:
+            uuids (List[str]): 按时间排序的备份记录uuid
+
+        Returns:
+            `Tuple[int, UpdateState]`: (已合并的备份记录数量, 备份状态)
+                缓存不存在或与备份记录不一致时返回 `(0, {})`
+        """
+        if not self.__fp.is_file():
+            return 0, {}
+
+        try:
+            data = json.loads(self.__fp.read_text(encoding="utf-8"))
+            count = uuids.index(data["uuid"]) + 1
+            if chain_hash(uuids[:count]) != data["chain"]:
+                return 0, {}
+            state = load_state(data["state"])
+        except Exception:
+            return 0, {}
+
+        return count, state
+
+    def save(self, uuids: List[str], state: UpdateState) -> None:
+        if not uuids:
+            return
+
+        data = {
+            "uuid": uuids[-1],
+            "chain": chain_hash(uuids),
+            "state": dump_state(state),
+        }
+        self.__fp.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.__fp.with_name(f"{self.__fp.name}.tmp")
+        temp.write_text(json.dumps(data), encoding="utf-8")
+        temp.replace(self.__fp)
@@ -0,0 +1,81 @@
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from src.models import ArchiveBlock, ArchiveIndex
+
+SIGNATURE_HEADER_SIZE = 32
+"""7z 压缩包起始文件头大小, 数据块紧随其后"""
+
+
+def build_index(
+    items: List[Dict[str, str]], volumes: List[str], volume_size: int
+) -> Optional[ArchiveIndex]:
+    """根据 `list_7zip` 的结果生成分卷索引
+
+    Args:
+        items (List[Dict[str, str]]): 压缩包内容
+        volumes (List[str]): 分卷文件名, 按顺序排列
+        volume_size (int): 分卷大小 (字节)
+
+    Returns:
+        `Optional[ArchiveIndex]`: 分卷索引, 压缩包内容不完整时返回 `None`
+    """
+    sizes: Dict[int, int] = {}
+    files: Dict[str, int] = {}
+
+    for item in items:
+        if item.get("Folder") == "+" or item.get("Attributes", "").startswith("D"):
+            continue
+        path = Path(item["Path"]).as_posix()
+        if not item.get("Block"):
+            files[path] = -1
+            continue
+
+        block = int(item["Block"])
+        files[path] = block
+        # 每个数据块的大小记录在其中的第一个文件上
+        if packed := item.get("Packed Size"):
+            sizes[block] = int(packed)
+
+    if not files or set(sizes) != set(range(len(sizes))):
+        return None
+    if any(b >= len(sizes) for b in files.values()):
+        return None
+
+    blocks: List[ArchiveBlock] = []
+    offset = SIGNATURE_HEADER_SIZE
+    for i in range(len(sizes)):
+        blocks.append(ArchiveBlock(offset=offset, size=sizes[i]))
+        offset += sizes[i]
+
+    return ArchiveIndex(
+        volume_size=volume_size, volumes=volumes, blocks=blocks, files=files
+    )
+
+
+def required_volumes(index: ArchiveIndex, files: Iterable[Path]) -> Set[int]:
+    """解压指定文件需要的分卷序号 (从 0 开始)
+
+    第一个分卷包含起始文件头, 数据块之后直至末尾为压缩包文件头, 总是需要下载
+
+    索引中缺少任一文件时返回全部分卷
+    """
+    count = len(index.volumes)
+    size = index.volume_size
+    paths = [p.as_posix() for p in files]
+    if any(p not in index.files for p in paths):
+        return set(range(count))
+    blocks = {index.files[p] for p in paths} - {-1}
+
+    data_end = (
+        index.blocks[-1].offset + index.blocks[-1].size
+        if index.blocks
+        else SIGNATURE_HEADER_SIZE
+    )
+    result = {0, *range(min(data_end // size, count - 1), count)}
+    for i in blocks:
+        block = index.blocks[i]
+        if block.size:
+            last = (block.offset + block.size - 1) // size
+            result.update(range(block.offset // size, min(last, count - 1) + 1))
+    return result
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Protocol, runtime_checkable
+from typing import List, Protocol, runtime_checkable
 
 import loguru
 
@@ -13,4 +13,16 @@ class StrategyProtocol(Protocol):
 
     async def make_backup(self) -> None: ...
 
+    async def make_estimate(self) -> None: ...
+
     async def make_recovery(self, record: BackupRecord) -> None: ...
+
+    async def make_partial_recovery(
+        self, record: BackupRecord, patterns: List[str]
+    ) -> None: ...
+
+    async def make_compact(self, start: str, end: str) -> None: ...
+
+    async def compact_history(self) -> None: ...
+
+    async def make_prune(self) -> None: ...
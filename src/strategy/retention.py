@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Set
+
+from src.config import RetentionConfig
+from src.models import BackupRecord
+
+
+def _keep_buckets(
+    records: List[BackupRecord],
+    count: int,
+    bucket: Callable[[datetime], str],
+) -> Set[str]:
+    """在最近的 `count` 个时间段中, 各保留该时间段内最新的备份"""
+    kept: Dict[str, str] = {}
+    for rec in reversed(records):
+        key = bucket(datetime.fromtimestamp(rec.timestamp))
+        if key not in kept:
+            if len(kept) >= count:
+                break
+            kept[key] = rec.uuid
+    return set(kept.values())
+
+
+def select_retained(
+    records: List[BackupRecord],
+    config: RetentionConfig,
+    now: datetime | None = None,
+) -> Set[str]:
+    """根据保留规则选出需要保留的备份
+
+    Args:
+        records (List[BackupRecord]): 按时间排序的备份记录
+        config (RetentionConfig): 保留规则
+        now (datetime | None, optional): 当前时间
+
+    Returns:
+        `Set[str]`: 需要保留的备份uuid, 最新的备份始终保留
+    """
+    if not records or not config.enabled:
+        return {rec.uuid for rec in records}
+
+    now = now or datetime.now()
+    kept: Set[str] = set()
+    if config.keep_last > 0:
+        kept.update(rec.uuid for rec in records[-config.keep_last :])
+    if config.hourly > 0:
+        kept |= _keep_buckets(records, config.hourly, lambda t: t.strftime("%Y%m%d%H"))
+    if config.daily > 0:
+        kept |= _keep_buckets(records, config.daily, lambda t: t.strftime("%Y%m%d"))
+    if config.weekly > 0:
+        kept |= _keep_buckets(
+            records, config.weekly, lambda t: "%d%02d" % t.isocalendar()[:2]
+        )
+
+    # 只设置了最长保留时间时, 保留期限内的所有备份
+    if not (config.keep_last or config.hourly or config.daily or config.weekly):
+        kept = {rec.uuid for rec in records}
+    if config.max_age > 0:
+        expire = (now - timedelta(days=config.max_age)).timestamp()
+        kept = {
+            rec.uuid for rec in records if rec.uuid in kept and rec.timestamp >= expire
+        }
+
+    kept.add(records[-1].uuid)
+    return kept
+
+
+def prune_ranges(records: List[BackupRecord], kept: Set[str]) -> List[List[str]]:
+    """将待删除的备份与其后第一个保留的备份分为一组, 用于合并
+
+    Returns:
+        `List[List[str]]`: 每组为连续的备份uuid, 最后一个为保留的备份
+    """
+    ranges: List[List[str]] = []
+    pending: List[str] = []
+    for rec in records:
+        pending.append(rec.uuid)
+        if rec.uuid in kept:
+            if len(pending) > 1:
+                ranges.append(pending)
+            pending = []
+    return ranges
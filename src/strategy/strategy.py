@@ -1,21 +1,49 @@
 from __future__ import annotations
 
+import asyncio
 import contextlib
 import shutil
 from abc import ABCMeta, abstractmethod
 from datetime import datetime
 from pathlib import Path
-from typing import List, Optional, Self, override
+from typing import (
+    Any,
+    AsyncIterator,
+    Iterable,
+    List,
+    Optional,
+    Self,
+    Tuple,
+    override,
+)
 
 import loguru
 
 from src.backend import Backend, get_backend
 from src.config import BackupConfig
 from src.const import PATH
-from src.const.exceptions import RestartBackup, StopBackup, StopOperation
+from src.const.exceptions import (
+    RestartBackup,
+    StopBackup,
+    StopOperation,
+    StopRecovery,
+)
 from src.log import get_logger
 from src.models import BackupRecord
-from src.utils import ByteReader, ByteWriter, Style, get_uuid, mkdir, run_sync
+from src.utils import (
+    HASH_INSTALL_HINT,
+    ByteReader,
+    ByteWriter,
+    PathFilter,
+    Style,
+    get_uuid,
+    hash_supported,
+    mkdir,
+    run_sync,
+)
+
+from .estimate import BackupEstimate
+from .retention import prune_ranges, select_retained
 
 
 class AbstractStrategy(metaclass=ABCMeta):
@@ -30,12 +58,40 @@ class AbstractStrategy(metaclass=ABCMeta):
     @abstractmethod
     async def _make_recovery(self, record: BackupRecord) -> Path: ...
 
+    @abstractmethod
+    async def _make_partial_recovery(
+        self, record: BackupRecord, patterns: List[str]
+    ) -> Path: ...
+
+    @abstractmethod
+    async def _make_estimate(self) -> BackupEstimate: ...
+
     @abstractmethod
     async def make_backup(self) -> None: ...
 
+    @abstractmethod
+    async def make_estimate(self) -> None: ...
+
     @abstractmethod
     async def make_recovery(self, record: BackupRecord) -> None: ...
 
+    @abstractmethod
+    async def make_partial_recovery(
+        self, record: BackupRecord, patterns: List[str]
+    ) -> None: ...
+
+    @abstractmethod
+    async def _make_compact(self, records: List[BackupRecord]) -> None: ...
+
+    @abstractmethod
+    async def make_compact(self, start: str, end: str) -> None: ...
+
+    @abstractmethod
+    async def compact_history(self) -> None: ...
+
+    @abstractmethod
+    async def make_prune(self) -> None: ...
+
     @abstractmethod
     async def prepare(self, *, miss_ok: bool = False) -> None: ...
 
@@ -45,17 +101,22 @@ class AbstractStrategy(metaclass=ABCMeta):
 
 class Strategy(AbstractStrategy):
     __strategy_name__: str = "Strategy"
+    UPLOAD_WINDOW: int = 4
+    DOWNLOAD_WINDOW: int = 4
+    VOLUME_SIZE: int = 100
     __prepared: bool
     __cache: Path
     uuid: str
     client: Backend
     config: BackupConfig
+    path_filter: PathFilter
     record: List[BackupRecord]
 
     @classmethod
     async def init(cls, config: BackupConfig) -> Self:
         self = cls.__new__(cls)
         self.config = config
+        self.path_filter = config.filters.compile()
         self.client = await get_backend().create()
         self.__cache = PATH.CACHE / get_uuid().split("-")[0]
         self.__prepared = False
@@ -75,6 +136,10 @@ class Strategy(AbstractStrategy):
     def remote(self) -> Path:
         return self.config.remote
 
+    @property
+    def STATE(self) -> Path:
+        return mkdir(PATH.STATE / self.remote)
+
     def cache(self, uuid: str) -> Path:
         return mkdir(self.CACHE / uuid)
 
@@ -92,17 +157,19 @@ class Strategy(AbstractStrategy):
 
         data = cache_fp.read_bytes()
         cache_fp.unlink()
-        self.record = ByteReader(data).read_list()
 
-    async def add_record(self) -> None:
+        # 补全旧版本备份记录中缺少的字段
+        self.record = [
+            BackupRecord.model_validate(i.model_dump())
+            for i in ByteReader(data).read_list()
+        ]
+
+    async def add_record(self, **extra: Any) -> None:
         """创建一个新备份
 
         Args:
-            uuid (str): 本次备份的uuid
+            **extra (Any): 备份记录的其他字段
         """
-        remote_fp = self.remote / "backup.7685"
-        cache_fp = self.CACHE / "backup.7685"
-
         # 添加本次备份uuid
         now = datetime.now()
         self.record.append(
@@ -110,8 +177,16 @@ class Strategy(AbstractStrategy):
                 uuid=self.uuid,
                 timestamp=now.timestamp(),
                 timestr=now.strftime("%Y-%m-%d %H:%M:%S"),
+                **extra,
             )
         )
+        await self.save_record()
+
+    async def save_record(self) -> None:
+        """上传备份记录"""
+        remote_fp = self.remote / "backup.7685"
+        cache_fp = self.CACHE / "backup.7685"
+
         self.record.sort(key=lambda x: x.timestamp)
         cache_fp.write_bytes(ByteWriter().write(self.record).get())
 
@@ -120,13 +195,89 @@ class Strategy(AbstractStrategy):
             raise StopBackup("上传备份记录失败") from err
         cache_fp.unlink()
 
+    async def upload_volumes(self, volumes: AsyncIterator[Path]) -> List[str]:
+        """上传本次备份的分卷压缩包, 压缩的同时上传已完成的分卷
+
+        每个分卷单独上传, 失败时由 `put_file` 重试该分卷
+
+        Args:
+            volumes (AsyncIterator[Path]): 逐个返回已完成的分卷, 见 `iter_7zip_multipart`
+
+        Returns:
+            `List[str]`: 分卷文件名
+        """
+        target = self.remote / self.uuid
+        upload_window = asyncio.Semaphore(self.UPLOAD_WINDOW)
+        tasks: List[asyncio.Task[None]] = []
+        names: List[str] = []
+
+        async def upload(archive: Path) -> None:
+            async with upload_window:
+                if err := await self.client.put_file(archive, target / archive.name):
+                    raise StopBackup(
+                        f"上传分卷压缩包 {Style.PATH(archive.name)} 失败"
+                    ) from err
+            # 上传完成后立即删除分卷, 释放磁盘空间
+            with contextlib.suppress(OSError):
+                archive.unlink()
+
+        try:
+            async for archive in volumes:
+                self.logger.debug(f"分卷压缩完成: {Style.PATH_DEBUG(archive)}")
+                names.append(archive.name)
+                tasks.append(asyncio.create_task(upload(archive)))
+                # 上传失败时不再等待压缩完成
+                for task in tasks:
+                    if task.done() and task.exception():
+                        await task
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        return sorted(names)
+
+    async def download_volumes(
+        self, uuid: str, names: Iterable[str], target: Path
+    ) -> None:
+        """并行下载备份中的分卷压缩包至 `target` 目录
+
+        Args:
+            uuid (str): 备份uuid
+            names (Iterable[str]): 分卷文件名
+            target (Path): 下载目录
+        """
+        remote = self.remote / uuid
+        download_window = asyncio.Semaphore(self.DOWNLOAD_WINDOW)
+
+        async def download(name: str) -> None:
+            async with download_window:
+                if err := await self.client.get_file(target / name, remote / name):
+                    raise StopRecovery(
+                        f"[{Style.CYAN(uuid)}] 备份压缩包 {Style.PATH(name)} 下载失败"
+                    ) from err
+
+        tasks = [asyncio.create_task(download(name)) for name in names]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
     def check_local(self) -> None:
         # 本地待备份路径错误
         if not self.local.exists():
             raise StopBackup(f"目标路径 {Style.PATH(self.local)} 不存在")
 
-        if self.config.mode == "increment" and self.local.is_file():
-            raise StopBackup("increment模式的路径不能是单个文件, 请使用compress模式")
+        if self.config.mode in ("increment", "dedup") and self.local.is_file():
+            raise StopBackup(
+                f"{self.config.mode}模式的路径不能是单个文件, 请使用compress模式"
+            )
+
+        if not hash_supported(self.config.hash_algo):
+            raise StopBackup(
+                f"哈希算法 {self.config.hash_algo} 不可用, 请先执行 {HASH_INSTALL_HINT}"
+            )
 
     def get_uuid(self) -> str:
         uuid = get_uuid()
@@ -163,6 +314,76 @@ class Strategy(AbstractStrategy):
         mkdir(self.local.parent)
         await run_sync(shutil.move)(result, self.local)
 
+    async def _merge_result(self, result: Path) -> None:
+        """将恢复结果目录中的文件移动至本地路径, 覆盖同名文件"""
+
+        # 移除与备份中类型不同的本地项目, 符号链接一律替换
+        def remove_conflict(dst: Path, is_dir: bool) -> None:
+            if dst.is_symlink():
+                dst.unlink()
+            elif dst.is_dir() and not is_dir:
+                shutil.rmtree(dst)
+            elif dst.exists() and is_dir and not dst.is_dir():
+                dst.unlink()
+
+        for p, dirs, files in result.walk():
+            relp = p.relative_to(result)
+            for name in dirs:
+                dst = self.local / relp / name
+                await run_sync(remove_conflict)(dst, True)
+                mkdir(dst)
+            for name in files:
+                dst = self.local / relp / name
+                self.logger.debug(f"恢复文件: {Style.PATH_DEBUG(dst)}")
+                await run_sync(remove_conflict)(dst, False)
+                mkdir(dst.parent)
+                await run_sync(shutil.move)(p / name, dst)
+
+    async def _finish_partial_recovery(self, result: Path) -> None:
+        self.logger.info("备份下载完成，正在替换匹配的文件...")
+        await self._merge_result(result)
+
+    async def _finish_inplace_recovery(self, result: Path, extra: List[Path]) -> None:
+        self.logger.info("备份下载完成，正在原地更新当前文件...")
+
+        def remove() -> None:
+            for p in sorted(extra, reverse=True):
+                fp = self.local / p
+                self.logger.debug(f"删除: {Style.PATH_DEBUG(fp)}")
+                if fp.is_dir() and not fp.is_symlink():
+                    shutil.rmtree(fp, ignore_errors=True)
+                else:
+                    fp.unlink(missing_ok=True)
+
+        await run_sync(remove)()
+        await self._merge_result(result)
+
+    async def _make_inplace_recovery(
+        self, record: BackupRecord
+    ) -> Optional[Tuple[Path, List[Path]]]:
+        """原地恢复: 仅下载与本地不一致的文件
+
+        Returns:
+            `Optional[Tuple[Path, List[Path]]]`: (恢复结果目录, 需要删除的本地相对路径),
+                不支持原地恢复时返回 `None`
+        """
+        return None
+
+    @override
+    async def _make_partial_recovery(
+        self, record: BackupRecord, patterns: List[str]
+    ) -> Path:
+        raise StopRecovery(f"{self.config.mode}模式不支持部分恢复")
+
+    @override
+    async def _make_compact(self, records: List[BackupRecord]) -> None:
+        # 每个备份都是完整备份时, 只需保留范围内的最后一个备份
+        removed = {rec.uuid for rec in records[:-1]}
+        self.record = [rec for rec in self.record if rec.uuid not in removed]
+        await self.save_record()
+        for uuid in removed:
+            await self.client.rmdir(self.remote / uuid)
+
     @override
     async def make_backup(self) -> None:
         await self.prepare(miss_ok=True)
@@ -174,11 +395,108 @@ class Strategy(AbstractStrategy):
             await self.cleanup(uuid)
             raise err
 
+    @override
+    async def make_estimate(self) -> None:
+        """预估备份: 遍历并比对本地文件, 报告需要备份的内容
+
+        不复制, 压缩或上传任何文件
+        """
+        await self.prepare(miss_ok=True)
+        try:
+            self.check_local()
+            self.logger.info(f"开始预估备份: {Style.PATH(self.local)}")
+            estimate = await self._make_estimate()
+            estimate.report(self.logger)
+        finally:
+            await self.cleanup()
+
     @override
     async def make_recovery(self, record: BackupRecord) -> None:
         await self.prepare(miss_ok=False)
         try:
+            if self.config.restore_mode == "inplace" and self.local.is_dir():
+                if inplace := await self._make_inplace_recovery(record):
+                    await self._finish_inplace_recovery(*inplace)
+                    return
+                self.logger.warning(
+                    f"{self.config.mode}模式不支持原地恢复, 将替换当前文件"
+                )
+
             result = await self._make_recovery(record)
             await self._finish_recovery(result)
         finally:
             await self.cleanup()
+
+    @override
+    async def make_compact(self, start: str, end: str) -> None:
+        """将 `start` 至 `end` 的连续备份合并为一个备份
+
+        Args:
+            start (str): 合并范围内第一个备份的uuid
+            end (str): 合并范围内最后一个备份的uuid
+        """
+        await self.prepare(miss_ok=False)
+        uuids = [rec.uuid for rec in self.record]
+        for uuid in (start, end):
+            if uuid not in uuids:
+                raise StopOperation(f"未找到 uuid 为 [{Style.CYAN(uuid)}] 的备份")
+        i, j = uuids.index(start), uuids.index(end)
+        if i >= j:
+            raise StopOperation("合并范围至少需要包含两个备份")
+
+        self.uuid = self.get_uuid()
+        self.logger.info(
+            f"开始合并 {Style.YELLOW(j - i + 1)} 个备份: "
+            f"[{Style.CYAN(start)}] - [{Style.CYAN(end)}]"
+        )
+        try:
+            await self._make_compact(self.record[i : j + 1])
+        except Exception as err:
+            uuid = err.uuid if isinstance(err, StopOperation) else None
+            await self.cleanup(uuid)
+            raise err
+        # 合并成功时只清理缓存, 删除过期备份时仍需继续使用 client
+        await run_sync(shutil.rmtree)(self.CACHE, True)
+
+    @override
+    async def compact_history(self) -> None:
+        """备份数量超过 `compact_after` 时, 将最早的备份合并为一个"""
+        keep = self.config.compact_after
+        if keep <= 0 or len(self.record) <= keep:
+            return
+
+        start, end = self.record[0], self.record[len(self.record) - keep]
+        await self.make_compact(start.uuid, end.uuid)
+
+    @override
+    async def make_prune(self) -> None:
+        """按保留规则删除过期的备份
+
+        被删除的备份合并至其后第一个保留的备份, 保证之后的备份仍可恢复
+        """
+        await self.prepare(miss_ok=False)
+        try:
+            kept = select_retained(self.record, self.config.retention)
+            ranges = prune_ranges(self.record, kept)
+            if not ranges:
+                self.logger.debug("没有需要删除的备份")
+                return
+
+            pruned = sum(len(r) - 1 for r in ranges)
+            self.logger.info(f"根据保留规则删除 {Style.YELLOW(pruned)} 个备份...")
+            for uuids in ranges:
+                await self.make_compact(uuids[0], uuids[-1])
+            self.logger.success(f"已删除 {Style.YELLOW(pruned)} 个过期备份")
+        finally:
+            await run_sync(shutil.rmtree)(self.CACHE, True)
+
+    @override
+    async def make_partial_recovery(
+        self, record: BackupRecord, patterns: List[str]
+    ) -> None:
+        await self.prepare(miss_ok=False)
+        try:
+            result = await self._make_partial_recovery(record, patterns)
+            await self._finish_partial_recovery(result)
+        finally:
+            await self.cleanup()
@@ -2,13 +2,31 @@ from . import json_path
 from .ansi_html import AnsiToHtml as AnsiToHtml
 from .archives import *
 from .byterw import *
+from .hasher import Hasher as Hasher
+from .hasher import HashJob as HashJob
+from .hasher import HashStats as HashStats
 from .log_style import Style as Style
+from .path_filter import PathFilter as PathFilter
+from .stat_cache import StatCache as StatCache
 from .utils import clean_pycache as clean_pycache
 from .utils import compress_password as compress_password
 from .utils import get_frame as get_frame
+from .utils import get_hash as get_hash
 from .utils import get_md5 as get_md5
 from .utils import get_uuid as get_uuid
+from .utils import HASH_INSTALL_HINT as HASH_INSTALL_HINT
+from .utils import hash_supported as hash_supported
+from .utils import is_incompressible as is_incompressible
+from .utils import link_file as link_file
+from .utils import match_path as match_path
 from .utils import mkdir as mkdir
+from .utils import new_hash as new_hash
 from .utils import run_sync as run_sync
+from .walker import WalkEntry as WalkEntry
+from .walker import walk_tree as walk_tree
+from .watcher import WATCH_SUPPORTED as WATCH_SUPPORTED
+from .watcher import Journal as Journal
+from .watcher import Watcher as Watcher
+from .watcher import get_journal as get_journal
 
 json = json_path
@@ -1,3 +1,6 @@
+from .archives import iter_7zip_multipart as iter_7zip_multipart
+from .archives import list_7zip as list_7zip
 from .archives import pack_7zip as pack_7zip
 from .archives import pack_7zip_multipart as pack_7zip_multipart
+from .archives import placeholder_volume as placeholder_volume
 from .archives import unpack_7zip as unpack_7zip
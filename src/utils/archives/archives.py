@@ -1,7 +1,9 @@
+import asyncio
 import os
+import shutil
 from subprocess import Popen, PIPE
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
 import platform
 
 from ..utils import run_sync
@@ -33,57 +35,343 @@ def _init_7zip_linux() -> str:
     return exe_path
 
 
-def _execute_7z(args: List[str]) -> Tuple[bool, str]:
-    args.insert(0, EXE_PATH)
-    p = Popen(args, stdin=PIPE, stdout=PIPE, stderr=PIPE)
+def _run_7z(
+    args: List[str], cwd: Optional[Path] = None, encoding: Optional[str] = None
+) -> Tuple[int, str, str]:
+    encoding = encoding or ("gbk" if WINDOWS else "utf-8")
+    p = Popen([EXE_PATH, *args], stdin=PIPE, stdout=PIPE, stderr=PIPE, cwd=cwd)
     output, err = p.communicate()
-    return "Everything is Ok" in (
-        output.decode("gbk" if WINDOWS else "utf-8")
-    ) and p.returncode == 0, (err.decode("gbk" if WINDOWS else "utf-8"))
+    return p.returncode, output.decode(encoding), err.decode(encoding)
+
+
+def _literal_exclude(exclude: List[Path]) -> List[Path]:
+    # 排除列表需与通配符 `*` 共用, 无法使用 `-spd` 关闭通配符匹配.
+    # 含有通配符或换行符的路径不写入排除列表, 宁可多压缩也不误排除其他文件
+    return [p for p in exclude if not any(c in str(p) for c in "*?\n\r")]
+
+
+def _execute_7z(args: List[str], cwd: Optional[Path] = None) -> Tuple[bool, str]:
+    code, output, err = _run_7z(args, cwd)
+    return "Everything is Ok" in output and code == 0, err
+
+
+def _write_listfile(fp: Path, files: List[Path]) -> Path:
+    # 列表文件每行一个路径, 文件名中的换行符无法表示
+    for p in files:
+        if "\n" in str(p) or "\r" in str(p):
+            raise RuntimeError(f"文件名包含换行符, 无法写入列表文件: {str(p)!r}")
+    fp.write_text("".join(f"{p}\n" for p in files), encoding="utf-8")
+    return fp
 
 
 @run_sync
-def pack_7zip(archive: Path, root: Path, password: Optional[str] = None) -> Path:
-    args = ["a", "-t7z", "-r", str(archive), f"{root}/*"]
+def pack_7zip(
+    archive: Path,
+    root: Path,
+    password: Optional[str] = None,
+    switches: Sequence[str] = (),
+    exclude: Optional[List[Path]] = None,
+) -> Path:
+    """压缩目录
+
+    Args:
+        archive (Path): 压缩包路径
+        root (Path): 待压缩的目录或文件
+        password (Optional[str], optional): 压缩包密码
+        switches (Sequence[str], optional): 额外的 7z 参数, 如压缩等级 `-mx9`
+        exclude (Optional[List[Path]], optional): 排除的路径, 相对于目录 `root`.
+            通过列表文件以 `-x` 参数传递给 7z, 排除的目录不压缩其中的文件
+    """
+    cwd = None
+    args = ["a", "-t7z", "-r", *switches]
+    listfile = archive.absolute().with_name(f"{archive.name}.txt")
+    if exclude:
+        # 排除列表中的路径相对于工作目录, 不递归匹配
+        _write_listfile(listfile, _literal_exclude(exclude))
+        args.extend(["-scsUTF-8", f"-xr-@{listfile}", str(archive.absolute()), "*"])
+        cwd = root
+    else:
+        args.extend([str(archive), f"{root}/*"])
     if password:
-        args.insert(4, f"-p{password}")
+        args.insert(3, f"-p{password}")
 
-    success, err = _execute_7z(args)
+    success, err = _execute_7z(args, cwd=cwd)
+    listfile.unlink(missing_ok=True)
     if success:
         return archive
     raise RuntimeError(f"压缩文件错误: {err}")
 
 
 @run_sync
-def unpack_7zip(archive: Path, target: Path, password: Optional[str] = None) -> Path:
+def unpack_7zip(
+    archive: Path,
+    target: Path,
+    password: Optional[str] = None,
+    files: Optional[List[Path]] = None,
+) -> Path:
+    """解压文件
+
+    Args:
+        archive (Path): 压缩包路径, 分卷压缩包为第一个分卷
+        target (Path): 解压目标目录
+        password (Optional[str], optional): 压缩包密码
+        files (Optional[List[Path]], optional): 仅解压压缩包中的指定文件
+    """
+    listfile = archive.with_name(f"{archive.name}.txt")
     args = ["x", str(archive), f"-o{target}"]
     if password:
         args.insert(2, f"-p{password}")
+    if files is not None:
+        # `-spd`: 列表文件中的路径不作为通配符匹配
+        _write_listfile(listfile, files)
+        args.extend(["-scsUTF-8", "-spd", f"@{listfile}"])
 
     success, err = _execute_7z(args)
+    listfile.unlink(missing_ok=True)
     if success:
         return archive
     raise RuntimeError(f"解压文件错误: {err}")
 
 
+def _multipart_args(
+    archive: Path,
+    root: Path,
+    volume_size: int,
+    password: Optional[str],
+    files: Optional[List[Path]],
+    switches: Sequence[str],
+    exclude: Optional[List[Path]] = None,
+) -> Tuple[List[str], Optional[Path], Path]:
+    listfile = archive.with_name(f"{archive.name}.txt")
+    cwd = None
+    if files is None and exclude:
+        # 同 `pack_7zip`, 排除列表中的路径相对于工作目录
+        _write_listfile(listfile, _literal_exclude(exclude))
+        args = ["a", "-t7z", "-r", f"-v{volume_size}m", *switches, "-scsUTF-8"]
+        args.extend([f"-xr-@{listfile}", str(archive), "*"])
+        cwd = root
+    elif files is None:
+        args = ["a", "-t7z", "-r", f"-v{volume_size}m", *switches, str(archive)]
+        args.append(f"{root}/*")
+    else:
+        _write_listfile(listfile, files)
+        args = ["a", "-t7z", "-scsUTF-8", "-spd", f"-v{volume_size}m", *switches]
+        args.extend([str(archive), f"@{listfile}"])
+        cwd = root
+    if password:
+        args.insert(3, f"-p{password}")
+
+    return args, cwd, listfile
+
+
+def _volume(archive: Path, index: int) -> Path:
+    return archive.with_name(f"{archive.name}.{index:03d}")
+
+
+def placeholder_volume(fp: Path, size: int) -> Path:
+    """创建指定大小的稀疏文件, 代替不需要读取的分卷"""
+    with fp.open("wb") as f:
+        f.truncate(size)
+    return fp
+
+
+def _list_7zip(archive: Path, password: Optional[str] = None) -> List[Dict[str, str]]:
+    args = ["l", "-slt", "-sccUTF-8", str(archive)]
+    if password:
+        args.insert(3, f"-p{password}")
+
+    code, output, err = _run_7z(args, encoding="utf-8")
+    if code != 0:
+        raise RuntimeError(f"读取压缩包错误: {err}")
+    return _parse_listing(output)
+
+
+def _parse_listing(output: str) -> List[Dict[str, str]]:
+    """解析 `7z l -slt` 的输出"""
+    # 项目属性位于分隔线之后, 每个项目之间以空行分隔
+    _, _, body = output.replace("\r\n", "\n").rpartition("\n----------\n")
+    items: List[Dict[str, str]] = []
+    for block in body.split("\n\n"):
+        item = dict(
+            line.split(" = ", 1) for line in block.splitlines() if " = " in line
+        )
+        if "Path" in item:
+            items.append(item)
+    return items
+
+
+def _listing_dir(archive: Path) -> Path:
+    return archive.with_name(f"{archive.name}.list")
+
+
+def _keep_volume(archive: Path, volume: Path) -> None:
+    """保留最近返回的分卷, 其余分卷返回后可能随时被删除
+
+    文件末尾的压缩包头可能从倒数第二个分卷开始, 读取内容时需要该分卷的真实数据
+    """
+    temp = _listing_dir(archive)
+    temp.mkdir(exist_ok=True)
+    for fp in temp.iterdir():
+        fp.unlink()
+    try:
+        os.link(volume, temp / volume.name)
+    except OSError:
+        shutil.copyfile(volume, temp / volume.name)
+
+
+def _list_volumes(
+    archive: Path, count: int, volume_size: int, password: Optional[str]
+) -> List[Dict[str, str]]:
+    """读取正在上传的分卷压缩包的内容
+
+    已返回的分卷可能随时被删除, 将分卷硬链接至单独的目录后读取,
+    已删除的分卷以稀疏文件代替. 读取失败时返回空列表
+    """
+    temp = _listing_dir(archive)
+    temp.mkdir(exist_ok=True)
+    try:
+        for index in range(1, count + 1):
+            target = _volume(temp / archive.name, index)
+            # 由 `_keep_volume` 保留的分卷
+            if target.exists():
+                continue
+            try:
+                os.link(_volume(archive, index), target)
+            except OSError:
+                placeholder_volume(target, volume_size)
+        return _list_7zip(_volume(temp / archive.name, 1), password)
+    except (OSError, RuntimeError):
+        return []
+    finally:
+        shutil.rmtree(temp, ignore_errors=True)
+
+
+@run_sync
+def list_7zip(archive: Path, password: Optional[str] = None) -> List[Dict[str, str]]:
+    """列出压缩包内容
+
+    Args:
+        archive (Path): 压缩包路径, 分卷压缩包为第一个分卷
+        password (Optional[str], optional): 压缩包密码
+
+    Returns:
+        `List[Dict[str, str]]`: 每个项目的属性, 如 `Path`, `Size`, `Packed Size`, `Block`
+    """
+    return _list_7zip(archive, password)
+
+
 @run_sync
 def pack_7zip_multipart(
-    archive: Path, root: Path, volume_size: int, password: Optional[str] = None
+    archive: Path,
+    root: Path,
+    volume_size: int,
+    password: Optional[str] = None,
+    files: Optional[List[Path]] = None,
+    switches: Sequence[str] = (),
+    exclude: Optional[List[Path]] = None,
 ) -> List[Path]:
-    args = ["a", "-t7z", "-r", f"-v{volume_size}m", str(archive), f"{root}/*"]
-    if password:
-        args.insert(5, f"-p{password}")
+    """分卷压缩
 
-    success, err = _execute_7z(args)
+    Args:
+        archive (Path): 压缩包路径, 分卷文件名为 `{archive.name}.001` 等
+        root (Path): 待压缩的根目录
+        volume_size (int): 分卷大小 (MB)
+        password (Optional[str], optional): 压缩包密码
+        files (Optional[List[Path]], optional): 相对于 `root` 的文件列表.
+            指定时通过列表文件传递给 7z, 直接读取 `root` 下的文件, 不递归子目录
+        switches (Sequence[str], optional): 额外的 7z 参数, 如压缩等级 `-mx9`
+        exclude (Optional[List[Path]], optional): 未指定 `files` 时排除的路径,
+            相对于目录 `root`, 同 `pack_7zip`
+
+    Returns:
+        `List[Path]`: 分卷文件路径
+    """
+    archive = archive.absolute()
+    args, cwd, listfile = _multipart_args(
+        archive, root, volume_size, password, files, switches, exclude
+    )
+    success, err = _execute_7z(args, cwd=cwd)
+    listfile.unlink(missing_ok=True)
     if success:
-        return [
+        return sorted(
             p
             for p in archive.parent.iterdir()
             if p.is_file()
             and p.name.startswith(archive.name)
             and p.name.split(".")[-1].isdigit()
-        ]
+        )
     raise RuntimeError(f"压缩文件错误: {err}")
 
 
+async def iter_7zip_multipart(
+    archive: Path,
+    root: Path,
+    volume_size: int,
+    password: Optional[str] = None,
+    files: Optional[List[Path]] = None,
+    interval: float = 0.5,
+    listing: Optional[List[Dict[str, str]]] = None,
+    switches: Sequence[str] = (),
+    exclude: Optional[List[Path]] = None,
+) -> AsyncIterator[Path]:
+    """分卷压缩, 在 7z 运行期间逐个返回已写入完成的分卷
+
+    7z 按顺序写入分卷, 下一个分卷出现时前一个分卷即已完成;
+    第一个分卷的文件头在压缩结束时才会被改写, 因此最后返回
+
+    其余参数同 `pack_7zip_multipart`
+
+    Args:
+        listing (Optional[List[Dict[str, str]]], optional): 指定时在压缩完成后
+            读取压缩包内容 (同 `list_7zip`) 写入该列表, 读取失败时保持为空
+
+    Yields:
+        `Path`: 已完成的分卷文件路径
+    """
+    archive = archive.absolute()
+    args, cwd, listfile = _multipart_args(
+        archive, root, volume_size, password, files, switches, exclude
+    )
+    p = Popen([EXE_PATH, *args], stdin=PIPE, stdout=PIPE, stderr=PIPE, cwd=cwd)
+    task = asyncio.create_task(run_sync(p.communicate)())
+    full_size = volume_size * 1024 * 1024
+    index = 2
+
+    try:
+        while not task.done():
+            await asyncio.wait({task}, timeout=interval)
+            while (
+                _volume(archive, index + 1).exists()
+                and _volume(archive, index).stat().st_size == full_size
+            ):
+                if listing is not None:
+                    await run_sync(_keep_volume)(archive, _volume(archive, index))
+                yield _volume(archive, index)
+                index += 1
+
+        output, err = task.result()
+        encoding = "gbk" if WINDOWS else "utf-8"
+        if "Everything is Ok" not in output.decode(encoding) or p.returncode != 0:
+            raise RuntimeError(f"压缩文件错误: {err.decode(encoding)}")
+
+        if listing is not None:
+            count = index
+            while _volume(archive, count + 1).exists():
+                count += 1
+            listing.extend(
+                await run_sync(_list_volumes)(archive, count, full_size, password)
+            )
+
+        while _volume(archive, index).exists():
+            yield _volume(archive, index)
+            index += 1
+        yield _volume(archive, 1)
+    finally:
+        if p.poll() is None:
+            p.kill()
+            await task
+        listfile.unlink(missing_ok=True)
+        shutil.rmtree(_listing_dir(archive), ignore_errors=True)
+
+
 EXE_PATH = _init_7zip_windows() if WINDOWS else _init_7zip_linux()
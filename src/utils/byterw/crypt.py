@@ -34,12 +34,11 @@ class CLib:
         self.lib_free.restype = None
 
     def _process(self, f: bool, charset: str, data: bytes | bytearray) -> bytes:
-        d = (ctypes.c_ubyte * len(data))(*data)
+        # 整块复制输入与输出, 不逐字节转换为 Python 整数
+        d = (ctypes.c_ubyte * len(data)).from_buffer_copy(data)
         call = self.lib_encrypt if f else self.lib_decrypt
         ptr = call(charset.encode("utf-8"), d, len(data))
-        result = bytes(
-            ctypes.cast(ptr, ctypes.POINTER(ctypes.c_ubyte * len(data))).contents
-        )
+        result = ctypes.string_at(ptr, len(data))
         self.lib_free(ptr)
         return result
 
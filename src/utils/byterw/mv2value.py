@@ -1,9 +1,10 @@
+import functools
 from base64 import b64decode
 from datetime import datetime
 from pathlib import Path
 from typing import Callable, Dict, Tuple, Type, List, Set, Any
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel
 
 from .common import VT, ValidType
 
@@ -98,6 +99,14 @@ def mv2datetime(m: memoryview) -> Tuple[datetime, memoryview]:
     return datetime.fromtimestamp(timestamp), m
 
 
+@functools.cache
+def _make_model(
+    model_name: str, fields: Tuple[Tuple[str, Type[ValidType] | None], ...]
+) -> Type[BaseModel]:
+    # 相同结构的模型复用同一个类, 避免为每个对象重复构建 pydantic 模型
+    return type(model_name, (BaseModel,), {"__annotations__": dict(fields)})
+
+
 def mv2model(m: memoryview) -> Tuple[BaseModel, memoryview]:
     length, m = mv2int(m)
     model_name, m = mv2str(m)
@@ -111,8 +120,7 @@ def mv2model(m: memoryview) -> Tuple[BaseModel, memoryview]:
         fields[field] = __VT2T[vt]
         parsed[field] = value
 
-    attrs = {k: Field(default=parsed[k]) for k in fields} | {"__annotations__": fields}
-    Model = type(model_name, (BaseModel,), attrs)
+    Model = _make_model(model_name, tuple(fields.items()))
     return Model.model_validate(parsed), m
 
 
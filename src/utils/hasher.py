@@ -0,0 +1,144 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .utils import get_hash, run_sync
+
+# (键, 文件路径, 哈希算法, 文件大小)
+type HashJob = Tuple[Path, Path, str, int]
+
+SMALL_FILE_SIZE = 1024 * 1024  # 1 MB
+BATCH_SIZE = 16 * 1024 * 1024  # 16 MB
+BATCH_COUNT = 256
+
+
+def _hash_batch(
+    batch: List[HashJob],
+    tee: Optional[Path],
+    tee_filter: Optional[Callable[[Path], bool]],
+) -> List[Tuple[Path, str]]:
+    if tee is None:
+        return [(key, get_hash(fp, algo)) for key, fp, algo, _ in batch]
+
+    res: List[Tuple[Path, str]] = []
+    for key, fp, algo, _ in batch:
+        if tee_filter is not None and not tee_filter(key):
+            res.append((key, get_hash(fp, algo)))
+            continue
+        dst = tee / key
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        res.append((key, get_hash(fp, algo, dst)))
+    return res
+
+
+def _make_batches(jobs: Iterable[HashJob]) -> Iterator[List[HashJob]]:
+    """小文件合并为一个批次提交, 大文件单独提交"""
+    batch: List[HashJob] = []
+    batch_size = 0
+
+    for job in jobs:
+        size = job[3]
+        if size >= SMALL_FILE_SIZE:
+            yield [job]
+            continue
+
+        batch.append(job)
+        batch_size += size
+        if batch_size >= BATCH_SIZE or len(batch) >= BATCH_COUNT:
+            yield batch
+            batch, batch_size = [], 0
+
+    if batch:
+        yield batch
+
+
+@dataclass
+class HashStats:
+    files: int = field(default=0)
+    bytes: int = field(default=0)
+    elapsed: float = field(default=0.0)
+
+    @property
+    def files_per_sec(self) -> float:
+        return self.files / self.elapsed if self.elapsed else 0.0
+
+    @property
+    def mb_per_sec(self) -> float:
+        return self.bytes / 1024 / 1024 / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.files} 个文件, {self.bytes / 1024 / 1024:.1f} MB, "
+            f"耗时 {self.elapsed:.2f}s "
+            f"({self.files_per_sec:.1f} 文件/s, {self.mb_per_sec:.1f} MB/s)"
+        )
+
+
+class Hasher(object):
+    """有界并发的文件哈希计算引擎
+
+    使用独立的线程池计算哈希值, `hashlib` 在处理大块数据时会释放 GIL,
+    因此多个线程可以并行读取和计算
+
+    同一时间最多只有 `workers * 2` 个批次处于等待状态
+
+    `jobs` 可以是边遍历边产生任务的生成器, 在线程中逐批取出, 不阻塞事件循环
+
+    指定 `tee` 时, 计算哈希值的同时将文件复制到该目录下, 以任务的键为相对路径;
+    指定 `tee_filter` 时只复制键满足条件的文件
+    """
+
+    workers: int
+    stats: HashStats
+    tee: Optional[Path]
+    tee_filter: Optional[Callable[[Path], bool]]
+
+    def __init__(
+        self,
+        workers: int = 0,
+        tee: Optional[Path] = None,
+        tee_filter: Optional[Callable[[Path], bool]] = None,
+    ) -> None:
+        self.workers = workers if workers > 0 else min(8, os.cpu_count() or 1)
+        self.stats = HashStats()
+        self.tee = tee
+        self.tee_filter = tee_filter
+
+    async def run(self, jobs: Iterable[HashJob]) -> Dict[Path, str]:
+        loop = asyncio.get_running_loop()
+        window = asyncio.Semaphore(self.workers * 2)
+        tasks: List[asyncio.Task[None]] = []
+        result: Dict[Path, str] = {}
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(self.workers, "hasher") as executor:
+
+            async def submit(batch: List[HashJob]) -> None:
+                try:
+                    result.update(
+                        await loop.run_in_executor(
+                            executor, _hash_batch, batch, self.tee, self.tee_filter
+                        )
+                    )
+                    self.stats.files += len(batch)
+                    self.stats.bytes += sum(job[3] for job in batch)
+                finally:
+                    window.release()
+
+            batches = _make_batches(jobs)
+            take = run_sync(next)
+            try:
+                while (batch := await take(batches, None)) is not None:
+                    await window.acquire()
+                    tasks.append(asyncio.create_task(submit(batch)))
+                await asyncio.gather(*tasks)
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        self.stats.elapsed += time.perf_counter() - start
+        return result
@@ -0,0 +1,131 @@
+import re
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+# (正则表达式, 仅匹配目录, 取反)
+type FilterRule = Tuple[re.Pattern[str], bool, bool]
+
+
+def _translate_part(part: str) -> str:
+    res: List[str] = []
+    i = 0
+    while i < len(part):
+        c = part[i]
+        i += 1
+        if c == "*":
+            res.append("[^/]*")
+        elif c == "?":
+            res.append("[^/]")
+        elif c == "[" and (end := part.find("]", i + 1)) != -1:
+            chars = part[i:end]
+            if chars.startswith("!"):
+                chars = f"^{chars[1:]}"
+            res.append(f"[{chars}]")
+            i = end + 1
+        else:
+            res.append(re.escape(c))
+    return "".join(res)
+
+
+def compile_rule(pattern: str) -> Optional[FilterRule]:
+    """将 gitignore 风格的规则转换为正则表达式
+
+    * `!` 开头表示取反, 重新包含之前被排除的路径
+    * `/` 结尾的规则只匹配目录
+    * 包含 `/` 的规则相对于根目录, 否则匹配任意层级的名称
+    * `*` 与 `?` 不匹配 `/`, `**` 匹配任意层级目录
+
+    Returns:
+        `Optional[FilterRule]`: 空行与 `#` 开头的注释返回 `None`
+    """
+    pattern = pattern.strip().replace("\\", "/")
+    if not pattern or pattern.startswith("#"):
+        return None
+
+    negate = pattern.startswith("!")
+    pattern = pattern.removeprefix("!")
+    dir_only = pattern.endswith("/")
+    pattern = pattern.rstrip("/")
+    anchored = "/" in pattern
+    pattern = pattern.lstrip("/")
+    if not pattern:
+        return None
+
+    parts = pattern.split("/")
+    regex = "" if anchored else "(?:.*/)?"
+    for idx, part in enumerate(parts):
+        last = idx == len(parts) - 1
+        if part == "**":
+            regex += ".*" if last else "(?:.*/)?"
+        else:
+            regex += _translate_part(part) + ("" if last else "/")
+
+    return re.compile(regex), dir_only, negate
+
+
+def _match(rules: List[FilterRule], path: str, is_dir: bool) -> Optional[bool]:
+    """按顺序匹配规则, 以最后一条匹配的规则为准, 均不匹配时返回 `None`"""
+    res = None
+    for regex, dir_only, negate in rules:
+        if dir_only and not is_dir:
+            continue
+        if regex.fullmatch(path):
+            res = not negate
+    return res
+
+
+class PathFilter(object):
+    """备份项的文件过滤规则
+
+    规则在创建时编译一次, 遍历目录时逐项判断. 被排除的目录不再进入,
+    其中的路径无法被取反规则重新包含
+    """
+
+    max_size: int
+    __exclude: List[FilterRule]
+    __include: List[FilterRule]
+
+    def __init__(
+        self,
+        exclude: Iterable[str] = (),
+        include: Iterable[str] = (),
+        max_size: int = 0,
+    ) -> None:
+        """
+        Args:
+            exclude (Iterable[str], optional): 排除的路径
+            include (Iterable[str], optional): 仅包含匹配的文件, 为空时包含所有文件
+            max_size (int, optional): 排除大于该值的文件 (字节), 0 表示不限制
+        """
+        self.max_size = max_size
+        self.__exclude = [r for p in exclude if (r := compile_rule(p))]
+        self.__include = [r for p in include if (r := compile_rule(p))]
+
+    def __bool__(self) -> bool:
+        return bool(self.__exclude or self.__include or self.max_size)
+
+    def skip_dir(self, path: Path) -> bool:
+        """是否排除目录, 调用方保证其上级目录均未被排除"""
+        return bool(_match(self.__exclude, path.as_posix(), True))
+
+    def skip_file(self, path: Path, size: int = 0) -> bool:
+        """是否排除文件, 调用方保证其上级目录均未被排除"""
+        if self.max_size and size > self.max_size:
+            return True
+        if _match(self.__exclude, path.as_posix(), False):
+            return True
+        if not self.__include:
+            return False
+
+        # 文件本身或所在的目录匹配包含规则时包含
+        if _match(self.__include, path.as_posix(), False):
+            return False
+        return not any(
+            _match(self.__include, p.as_posix(), True) for p in path.parents[:-1]
+        )
+
+    def skip_path(self, path: Path, is_dir: bool, size: int = 0) -> bool:
+        """是否排除路径, 同时检查上级目录"""
+        if any(self.skip_dir(p) for p in reversed(path.parents[:-1])):
+            return True
+        return self.skip_dir(path) if is_dir else self.skip_file(path, size)
@@ -0,0 +1,64 @@
+import os
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from . import json_path as json
+
+# 在文件系统时间戳精度内被修改的文件无法通过 stat 判断是否变化 (racily clean)
+# 这类文件不写入缓存, 下次运行时重新计算
+RACY_NS = 2 * 1000 * 1000 * 1000
+
+
+class StatCache(object):
+    """本地文件状态缓存
+
+    以相对路径为键, 记录文件的 (size, mtime_ns, inode, dev) 与对应算法的哈希值
+
+    stat 未发生变化的文件可直接复用缓存的哈希值, 无需重新读取文件
+    """
+
+    __fp: Path
+    __data: Dict[str, List[int | str]]
+    __started: int
+
+    def __init__(self, fp: Path) -> None:
+        self.__fp = fp
+        self.__data = {}
+        self.__started = time.time_ns()
+
+        if fp.is_file():
+            try:
+                self.__data = json.loads(fp.read_text(encoding="utf-8"))
+            except Exception:
+                # 缓存损坏时丢弃, 不影响备份
+                self.__data = {}
+
+    @staticmethod
+    def _stat_key(st: os.stat_result) -> List[int]:
+        return [st.st_size, st.st_mtime_ns, st.st_ino, st.st_dev]
+
+    def get(self, path: Path, st: os.stat_result, algo: str = "md5") -> Optional[str]:
+        entry = self.__data.get(path.as_posix())
+        if entry is not None and entry[:5] == [*self._stat_key(st), algo]:
+            return str(entry[5])
+
+    def set(
+        self, path: Path, st: os.stat_result, digest: str, algo: str = "md5"
+    ) -> None:
+        key = path.as_posix()
+        if st.st_mtime_ns >= self.__started - RACY_NS:
+            self.__data.pop(key, None)
+            return
+        self.__data[key] = [*self._stat_key(st), algo, digest]
+
+    def retain(self, paths: Iterable[Path]) -> None:
+        """仅保留指定路径的缓存记录, 移除已不存在的文件"""
+        keys = {p.as_posix() for p in paths}
+        self.__data = {k: v for k, v in self.__data.items() if k in keys}
+
+    def save(self) -> None:
+        self.__fp.parent.mkdir(parents=True, exist_ok=True)
+        temp = self.__fp.with_name(f"{self.__fp.name}.tmp")
+        temp.write_text(json.dumps(self.__data), encoding="utf-8")
+        temp.replace(self.__fp)
@@ -1,20 +1,158 @@
 import asyncio
+import contextlib
+import fnmatch
+import math
+import os
 import shutil
 import sys
+from collections import Counter
 from contextvars import copy_context
 from functools import partial, wraps
-from hashlib import md5
+from hashlib import blake2b, md5
 from pathlib import Path
 from sys import exc_info
 from types import FrameType
-from typing import Callable, Coroutine, cast
+from typing import Any, Callable, Collection, Coroutine, List, Optional, cast
 from uuid import uuid4
 
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
 
-def get_md5(path: Path) -> str:
+HASH_CHUNK_SIZE = 1024 * 1024  # 1 MB
+HASH_INSTALL_HINT = "pip install xxhash 或 poetry install --no-root -E xxhash"
+
+
+def hash_supported(algo: str) -> bool:
+    """检查哈希算法在当前环境中是否可用"""
+    return algo != "xxhash" or xxhash is not None
+
+
+def new_hash(algo: str = "md5") -> Any:
+    match algo:
+        case "md5":
+            return md5()
+        case "blake2b":
+            return blake2b()
+        case "xxhash":
+            if xxhash is None:
+                raise ValueError(f"xxhash 未安装, 请先执行 {HASH_INSTALL_HINT}")
+            return xxhash.xxh3_128()
+    raise ValueError(f"不支持的哈希算法: {algo}")
+
+
+def get_hash(path: Path, algo: str = "md5", copy_to: Optional[Path] = None) -> str:
+    """以固定大小的缓冲区分块读取文件并计算哈希值
+
+    参数:
+        path (Path): 文件路径
+        algo (str, optional): 哈希算法. 默认为 md5
+        copy_to (Optional[Path], optional): 同时将读取的数据写入该文件,
+            复制与哈希计算使用同一份数据, 只读取一次源文件
+    """
     if not path.is_file():
         raise ValueError("path must be a file")
-    return md5(path.read_bytes()).hexdigest()
+
+    hasher = new_hash(algo)
+    buffer = bytearray(HASH_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with contextlib.ExitStack() as stack:
+        f = stack.enter_context(path.open("rb", buffering=0))
+        out = stack.enter_context(copy_to.open("wb")) if copy_to else None
+        while size := f.readinto(buffer):
+            hasher.update(view[:size])
+            if out is not None:
+                out.write(view[:size])
+    return hasher.hexdigest()
+
+
+def get_md5(path: Path) -> str:
+    return get_hash(path, "md5")
+
+
+def _reflink(src: Path, dst: Path) -> bool:
+    if sys.platform != "linux":
+        return False
+
+    import fcntl
+
+    FICLONE = 0x40049409
+    with src.open("rb") as fin, dst.open("wb") as fout:
+        try:
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+            return True
+        except OSError:
+            return False
+
+
+def link_file(src: Path, dst: Path) -> None:
+    """以尽可能低的开销将 `src` 暂存至 `dst`
+
+    依次尝试: 写时复制 (reflink) -> 硬链接 -> 复制文件
+    """
+    dst.unlink(missing_ok=True)
+    if _reflink(src, dst):
+        return
+
+    dst.unlink(missing_ok=True)
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def match_path(path: Path, patterns: List[str]) -> bool:
+    """判断相对路径是否匹配任一路径前缀或通配符
+
+    参数:
+        path (Path): 相对路径
+        patterns (List[str]): 路径前缀 (如 `config/`) 或通配符 (如 `*.json`)
+    """
+    posix = path.as_posix()
+    for pattern in patterns:
+        prefix = pattern.replace("\\", "/").strip("/")
+        if posix == prefix or posix.startswith(f"{prefix}/"):
+            return True
+        if fnmatch.fnmatchcase(posix, pattern):
+            return True
+        if "/" not in pattern and fnmatch.fnmatchcase(path.name, pattern):
+            return True
+    return False
+
+
+ENTROPY_SAMPLE_SIZE = 64 * 1024  # 64 KB
+
+
+def is_incompressible(
+    path: Path, extensions: Collection[str], threshold: float = 0
+) -> bool:
+    """判断文件是否已经过压缩, 无需再次压缩
+
+    参数:
+        path (Path): 文件路径
+        extensions (Collection[str]): 已压缩文件的扩展名 (小写, 不含 `.`)
+        threshold (float): 采样数据的信息熵 (比特/字节) 阈值, 0 表示不采样.
+            小于采样大小的文件不采样
+    """
+    if path.suffix.lower().lstrip(".") in extensions:
+        return True
+    if threshold <= 0:
+        return False
+
+    size = path.stat().st_size
+    if size < ENTROPY_SAMPLE_SIZE:
+        return False
+
+    # 从文件中部采样, 避开文件头等低熵数据
+    with path.open("rb") as f:
+        f.seek((size - ENTROPY_SAMPLE_SIZE) // 2)
+        sample = f.read(ENTROPY_SAMPLE_SIZE)
+
+    total = len(sample)
+    counts = Counter(sample).values()
+    entropy = -sum(c / total * math.log2(c / total) for c in counts)
+    return entropy >= threshold
 
 
 def get_uuid() -> str:
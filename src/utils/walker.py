@@ -0,0 +1,102 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Iterator, List, Literal, Optional, Set, Tuple
+
+from .path_filter import PathFilter
+
+# (类型, 相对路径, 文件的 stat 结果, 目录为 None)
+type WalkEntry = Tuple[Literal["file", "dir"], Path, Optional[os.stat_result]]
+
+
+def _scan(
+    path: Path,
+    relp: Path,
+    path_filter: Optional[PathFilter],
+    skipped: Optional[List[Path]],
+) -> Tuple[List[WalkEntry], List[Path]]:
+    entries: List[WalkEntry] = []
+    subdirs: List[Path] = []
+
+    try:
+        it = os.scandir(path)
+    except OSError:
+        # 与 Path.walk 一致, 忽略无法读取的目录
+        return entries, subdirs
+
+    with it:
+        for entry in it:
+            p = relp / entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                is_dir = False
+
+            if is_dir:
+                # 被排除的目录不再进入
+                if path_filter and path_filter.skip_dir(p):
+                    if skipped is not None:
+                        skipped.append(p)
+                    continue
+                entries.append(("dir", p, None))
+                subdirs.append(p)
+                continue
+
+            # 复用 scandir 的结果, 之后无需再次 stat
+            try:
+                st = entry.stat()
+            except OSError:
+                st = None
+            if path_filter and path_filter.skip_file(p, st.st_size if st else 0):
+                if skipped is not None:
+                    skipped.append(p)
+                continue
+            entries.append(("file", p, st))
+
+    return entries, subdirs
+
+
+def walk_tree(
+    root: Path,
+    workers: int = 0,
+    path_filter: Optional[PathFilter] = None,
+    start: Path = Path(),
+    skipped: Optional[List[Path]] = None,
+) -> Iterator[WalkEntry]:
+    """使用线程池并行遍历目录
+
+    各子目录分发至线程池中读取, 每读取完一个目录即返回其中的项目,
+    调用方可以在遍历结束前开始处理. 返回顺序不固定
+
+    不跟随符号链接, 指向目录的符号链接视为文件
+
+    Args:
+        root (Path): 遍历的根目录
+        workers (int, optional): 线程数, 0 表示自动
+        path_filter (Optional[PathFilter], optional): 过滤规则, 排除的目录不再进入
+        start (Path, optional): 开始遍历的子目录, 相对于 `root`, 不包含其本身
+        skipped (Optional[List[Path]], optional): 记录被排除的目录与文件
+
+    Yields:
+        `WalkEntry`: (类型, 相对路径, 文件的 stat 结果).
+            无法 stat 的文件 (如失效的符号链接) 的 stat 结果为 `None`
+    """
+    workers = workers if workers > 0 else min(8, (os.cpu_count() or 1) * 2)
+
+    with ThreadPoolExecutor(workers, "walker") as executor:
+        pending: Set[Future[Tuple[List[WalkEntry], List[Path]]]] = {
+            executor.submit(_scan, root / start, start, path_filter, skipped)
+        }
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    entries, subdirs = future.result()
+                    pending.update(
+                        executor.submit(_scan, root / p, p, path_filter, skipped)
+                        for p in subdirs
+                    )
+                    yield from entries
+        finally:
+            for future in pending:
+                future.cancel()
@@ -0,0 +1,253 @@
+import asyncio
+import ctypes
+import ctypes.util
+import os
+import platform
+import struct
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Set, Tuple
+
+from .path_filter import PathFilter
+from .utils import run_sync
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+MAX_CHANGES = 100000
+"""变化记录超过该数量时不如直接完整遍历"""
+
+WATCH_SUPPORTED = platform.system() == "Linux"
+
+
+class Journal(object):
+    """本地文件变化记录
+
+    记录自上次取出以来发生变化的相对路径; 监视未建立或事件丢失时记录失效,
+    此时需要完整遍历本地目录
+    """
+
+    watching: bool
+    __changes: Set[Path]
+    __valid: bool
+
+    def __init__(self) -> None:
+        self.watching = False
+        self.__changes = set()
+        self.__valid = False
+
+    def add(self, path: Path) -> None:
+        if not self.__valid:
+            return
+        self.__changes.add(path)
+        if len(self.__changes) > MAX_CHANGES:
+            self.invalidate()
+
+    def invalidate(self) -> None:
+        self.__changes.clear()
+        self.__valid = False
+
+    def drain(self) -> Optional[Set[Path]]:
+        """取出并清空变化记录
+
+        Returns:
+            `Optional[Set[Path]]`: 变化的相对路径, 未在监视或记录失效时返回 `None`.
+                取出后记录重新生效, 之后的变化在下次取出时返回
+        """
+        if not self.watching:
+            return None
+
+        changes = self.__changes if self.__valid else None
+        self.__changes = set()
+        self.__valid = True
+        return changes
+
+
+class _Inotify(object):
+    __libc = None
+
+    def __init__(self) -> None:
+        if _Inotify.__libc is None:
+            _Inotify.__libc = ctypes.CDLL(
+                ctypes.util.find_library("c") or "libc.so.6", use_errno=True
+            )
+        self.fd = self.__call("inotify_init1", IN_NONBLOCK | IN_CLOEXEC)
+
+    def __call(self, name: str, *args: object) -> int:
+        res = getattr(self.__libc, name)(*args)
+        if res < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        return res
+
+    def add_watch(self, path: Path, mask: int) -> int:
+        return self.__call("inotify_add_watch", self.fd, os.fsencode(path), mask)
+
+    def rm_watch(self, wd: int) -> None:
+        self.__libc.inotify_rm_watch(self.fd, wd)  # type: ignore[union-attr]
+
+    def read(self) -> Iterator[Tuple[int, int, str]]:
+        """读取事件, 返回 (wd, mask, name)"""
+        try:
+            data = os.read(self.fd, READ_SIZE)
+        except BlockingIOError:
+            return
+
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            yield wd, mask, os.fsdecode(name)
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class Watcher(object):
+    """使用 inotify 监视本地目录, 将变化的路径写入 `Journal`
+
+    新建或移入的目录会递归添加监视; 事件队列溢出或无法添加监视时记录失效
+
+    被过滤规则排除的目录不添加监视, 避免占用 inotify 监视数量上限
+    """
+
+    root: Path
+    journal: Journal
+    path_filter: Optional[PathFilter]
+    __inotify: Optional[_Inotify]
+    __wds: Dict[int, Path]
+
+    def __init__(
+        self, root: Path, journal: Journal, path_filter: Optional[PathFilter] = None
+    ) -> None:
+        self.root = root
+        self.journal = journal
+        self.path_filter = path_filter
+        self.__inotify = None
+        self.__wds = {}
+
+    async def start(self) -> None:
+        inotify = self.__inotify = _Inotify()
+        self.journal.invalidate()
+        # 初次遍历整个目录树耗时较长, 在线程中添加监视, 期间的事件暂存于队列中
+        try:
+            await run_sync(self.__watch_tree)(Path())
+        except OSError:
+            # 超出监视数量上限等, 之后只能完整遍历
+            if self.__inotify is inotify:
+                self.stop()
+            raise
+        if self.__inotify is not inotify:
+            # 遍历期间已停止监视
+            return
+        asyncio.get_running_loop().add_reader(inotify.fd, self.__on_events)
+        self.journal.watching = True
+
+    def stop(self) -> None:
+        if self.__inotify is None:
+            return
+        asyncio.get_running_loop().remove_reader(self.__inotify.fd)
+        self.__inotify.close()
+        self.__inotify = None
+        self.__wds.clear()
+        self.journal.watching = False
+        self.journal.invalidate()
+
+    def __excluded(self, relp: Path) -> bool:
+        return self.path_filter is not None and self.path_filter.skip_dir(relp)
+
+    def __watch_tree(self, relp: Path) -> None:
+        assert self.__inotify is not None
+        # 新建或移入的目录本身可能被排除
+        pf = self.path_filter
+        if relp.parts and pf is not None and pf.skip_path(relp, True):
+            return
+        for p, dirs, _ in (self.root / relp).walk():
+            try:
+                wd = self.__inotify.add_watch(p, WATCH_MASK)
+            except FileNotFoundError:
+                continue
+            rel = self.__wds[wd] = p.relative_to(self.root)
+            dirs[:] = [
+                d
+                for d in dirs
+                if not (p / d).is_symlink() and not self.__excluded(rel / d)
+            ]
+
+    def __unwatch_tree(self, relp: Path) -> None:
+        assert self.__inotify is not None
+        for wd, p in list(self.__wds.items()):
+            if p == relp or relp in p.parents:
+                self.__inotify.rm_watch(wd)
+                del self.__wds[wd]
+
+    def __on_events(self) -> None:
+        if self.__inotify is None:
+            return
+
+        for wd, mask, name in self.__inotify.read():
+            if mask & IN_Q_OVERFLOW:
+                self.journal.invalidate()
+                continue
+            if mask & IN_IGNORED:
+                self.__wds.pop(wd, None)
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF) and self.__wds.get(wd) == Path():
+                # 监视的根目录被删除或移动
+                self.journal.invalidate()
+                continue
+            if (parent := self.__wds.get(wd)) is None or not name:
+                continue
+
+            relp = parent / name
+            self.journal.add(relp)
+            if not mask & IN_ISDIR:
+                continue
+            # 移动目录后原有监视的路径失效, 重新添加
+            if mask & IN_MOVED_FROM:
+                self.__unwatch_tree(relp)
+            elif mask & (IN_CREATE | IN_MOVED_TO):
+                try:
+                    self.__watch_tree(relp)
+                except OSError:
+                    # 超出监视数量上限等, 之后只能完整遍历
+                    self.stop()
+                    return
+
+
+__journals: Dict[str, Journal] = {}
+
+
+def get_journal(name: str) -> Journal:
+    """获取备份项的文件变化记录"""
+    if name not in __journals:
+        __journals[name] = Journal()
+    return __journals[name]
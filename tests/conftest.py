@@ -0,0 +1,23 @@
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+WORKDIR = Path(tempfile.mkdtemp(prefix="file-backup-test-"))
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    # 导入 src 时会在工作目录下创建 data/ 与 logs/, 并从 lib/ 加载动态库
+    if (ROOT / "lib").is_dir():
+        shutil.copytree(ROOT / "lib", WORKDIR / "lib", dirs_exist_ok=True)
+    os.chdir(WORKDIR)
+    sys.path.insert(0, str(ROOT))
+
+
+def pytest_sessionfinish(session: pytest.Session, exitstatus: int) -> None:
+    os.chdir(ROOT)
+    shutil.rmtree(WORKDIR, ignore_errors=True)
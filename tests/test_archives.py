@@ -0,0 +1,47 @@
+import asyncio
+import os
+from pathlib import Path
+from typing import Dict, List
+
+import pytest
+
+from src.utils.archives import iter_7zip_multipart, unpack_7zip
+
+MB = 1024 * 1024
+
+
+async def pack(archive: Path, root: Path) -> List[Path]:
+    return [
+        volume
+        async for volume in iter_7zip_multipart(
+            archive, root, 1, interval=0.05, switches=["-mx0"]
+        )
+    ]
+
+
+@pytest.fixture
+def data(tmp_path: Path) -> Dict[str, bytes]:
+    root = tmp_path / "src"
+    (root / "d").mkdir(parents=True)
+    data = {"a": os.urandom(MB * 2), "d/b": os.urandom(MB), "c": b"c"}
+    for name, content in data.items():
+        (root / name).write_bytes(content)
+    return data
+
+
+def test_multipart_volumes(tmp_path: Path, data: Dict[str, bytes]) -> None:
+    archive = tmp_path / "out" / "archive.7z"
+    archive.parent.mkdir()
+    volumes = asyncio.run(pack(archive, tmp_path / "src"))
+
+    # 第一个分卷的文件头最后写入, 因此最后返回, 其余按顺序返回
+    names = [v.name for v in volumes]
+    assert len(names) >= 4
+    assert names[-1] == "archive.7z.001"
+    assert names[:-1] == sorted(names[:-1])
+    assert sorted(names) == sorted(p.name for p in archive.parent.iterdir())
+
+    target = tmp_path / "result"
+    asyncio.run(unpack_7zip(volumes[-1], target))
+    for name, content in data.items():
+        assert (target / name).read_bytes() == content
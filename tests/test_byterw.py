@@ -0,0 +1,64 @@
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from pydantic import BaseModel
+
+from src.models import BackupUpdate
+from src.utils import ByteReader, ByteWriter
+from src.utils.byterw.crypt import decrypt, encrypt
+
+
+@pytest.mark.parametrize("size", [0, 1, 3, 255, 4096, 100_003])
+def test_crypt_roundtrip(size: int) -> None:
+    data = bytes(range(256)) * (size // 256) + bytes(range(size % 256))
+    assert decrypt(encrypt(data)) == data
+    assert decrypt(encrypt(data, key="uuid"), key="uuid") == data
+
+
+def test_values_roundtrip() -> None:
+    value = {
+        "int": -(2**40),
+        "float": 1.5,
+        "bool": True,
+        "str": "文件",
+        "bytes": b"\x00\xff",
+        "list": [1, "a", None],
+        "set": {1, 2},
+        "time": datetime(2024, 6, 15, 12, 0),
+        "path": Path("a/b"),
+    }
+    data = ByteWriter().write(value).get()
+    assert ByteReader(data).read() == value
+
+
+def test_models_roundtrip() -> None:
+    updates = [
+        BackupUpdate(type="file", path=Path(f"d/{i}"), md5=str(i)) for i in range(50)
+    ]
+    updates.append(
+        BackupUpdate(
+            type="copy", path=Path("c"), md5="1", source="d/1", source_uuid="u1"
+        )
+    )
+    data = ByteWriter().write(updates).get()
+    decoded = ByteReader(data).read_list()
+
+    # 相同结构的模型解码为同一个类, 字段值互不影响
+    assert len({type(m) for m in decoded}) == 1
+    assert [BackupUpdate.model_validate(m.model_dump()) for m in decoded] == updates
+
+
+def test_same_name_different_fields() -> None:
+    class A(BaseModel):
+        x: int
+
+    class B(BaseModel):
+        x: str
+        y: int
+
+    B.__name__ = "A"
+    data = ByteWriter().write([A(x=1), B(x="s", y=2)]).get()
+    a, b = ByteReader(data).read_list()
+    assert a.model_dump() == {"x": 1}
+    assert b.model_dump() == {"x": "s", "y": 2}
@@ -0,0 +1,80 @@
+import random
+import time
+from pathlib import Path
+
+import pytest
+
+from src.strategy.dedup import chunker
+from src.strategy.dedup.chunker import (
+    CHUNK_MAX,
+    CHUNK_MIN,
+    NATIVE_CDC,
+    chunk_hash,
+    cut_point,
+    iter_chunks,
+)
+
+native = pytest.mark.skipif(not NATIVE_CDC, reason="lib/cdc 未编译")
+
+
+def random_bytes(size: int, seed: int = 7685) -> bytes:
+    return random.Random(seed).randbytes(size)
+
+
+def test_chunks_reassemble(tmp_path: Path) -> None:
+    data = random_bytes(6 * 1024 * 1024 + 12345)
+    fp = tmp_path / "data.bin"
+    fp.write_bytes(data)
+
+    chunks = list(iter_chunks(fp))
+    assert b"".join(chunks) == data
+    assert all(len(c) <= CHUNK_MAX for c in chunks)
+    assert all(len(c) >= CHUNK_MIN for c in chunks[:-1])
+
+
+def test_small_and_empty_file(tmp_path: Path) -> None:
+    fp = tmp_path / "small.bin"
+    fp.write_bytes(b"")
+    assert list(iter_chunks(fp)) == []
+
+    fp.write_bytes(b"backup")
+    assert list(iter_chunks(fp)) == [b"backup"]
+
+
+def test_local_edit_keeps_other_chunks(tmp_path: Path) -> None:
+    data = random_bytes(8 * 1024 * 1024)
+    middle = len(data) // 2
+    old, new = tmp_path / "old.bin", tmp_path / "new.bin"
+    old.write_bytes(data)
+    new.write_bytes(data[:middle] + b"inserted" + data[middle:])
+
+    before = {chunk_hash(c) for c in iter_chunks(old)}
+    after = [chunk_hash(c) for c in iter_chunks(new)]
+    # 插入位置之外的分块不受影响
+    assert sum(h not in before for h in after) <= 2
+
+
+@native
+def test_native_matches_python(monkeypatch: pytest.MonkeyPatch) -> None:
+    data = random_bytes(CHUNK_MAX + CHUNK_MIN)
+    offsets = [0, 1, 4096, CHUNK_MIN, CHUNK_MAX // 2]
+    expected = [cut_point(bytearray(data[i:])) for i in offsets]
+    assert expected == [cut_point(data[i:]) for i in offsets]
+
+    monkeypatch.setattr(chunker, "_NATIVE", None)
+    assert expected == [cut_point(data[i:]) for i in offsets]
+
+
+@native
+def test_native_throughput(tmp_path: Path) -> None:
+    size = 64 * 1024 * 1024
+    fp = tmp_path / "large.bin"
+    fp.write_bytes(random_bytes(size))
+
+    start = time.perf_counter()
+    total = sum(len(c) for c in iter_chunks(fp))
+    elapsed = time.perf_counter() - start
+
+    assert total == size
+    # Python 实现约为 4 MB/s
+    assert size / elapsed > 50 * 1024 * 1024
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+
+from src.const.exceptions import StopOperation
+from src.models import BackupRecord, BackupUpdate
+from src.strategy.increment.increment import IncrementStrategy
+from src.strategy.increment.state import REF_DIR
+
+
+def make_strategy(*records: BackupRecord) -> IncrementStrategy:
+    self = IncrementStrategy.__new__(IncrementStrategy)
+    self.record = list(records)
+    return self
+
+
+def record(uuid: str, *merged: str) -> BackupRecord:
+    return BackupRecord(uuid=uuid, timestamp=0, timestr="", merged=list(merged))
+
+
+def test_aliases_follow_merged_records() -> None:
+    strategy = make_strategy(record("m1", "u1", "u2"), record("u3"))
+    assert strategy.get_aliases() == {
+        "u1": "m1",
+        "u2": "m1",
+        "m1": "m1",
+        "u3": "u3",
+    }
+
+
+def test_merged_again_replaces_aliases() -> None:
+    # 合并后的备份再次被合并时, 新备份同时代替之前被合并的备份
+    strategy = make_strategy(record("m2", "m1", "u1", "u2", "u3"), record("u4"))
+    aliases = strategy.get_aliases()
+    assert {aliases[u] for u in ("m1", "u1", "u2", "u3")} == {"m2"}
+    assert aliases["u4"] == "u4"
+
+
+def copy(path: str, source: str, source_uuid: str) -> BackupUpdate:
+    return BackupUpdate(
+        type="copy", path=Path(path), md5="abc", source=source, source_uuid=source_uuid
+    )
+
+
+def test_locate_file_and_live_copy() -> None:
+    strategy = make_strategy(record("u1"), record("u2"))
+    upd = BackupUpdate(type="file", path=Path("a/b"), md5="abc")
+    assert strategy.locate("u2", upd) == ("u2", Path("a/b"))
+    assert strategy.locate("u2", copy("c", "a/b", "u1")) == ("u1", Path("a/b"))
+
+
+def test_locate_copy_of_merged_source() -> None:
+    # 源备份已被合并时, 源文件保存在合并后备份的 REF_DIR 中
+    strategy = make_strategy(record("m1", "u1", "u2"), record("u3"))
+    upd = copy("c", "a/b", "u1")
+    assert strategy.locate("u3", upd) == ("m1", REF_DIR / "abc")
+
+
+def test_locate_missing_source() -> None:
+    strategy = make_strategy(record("u2"))
+    with pytest.raises(StopOperation):
+        strategy.locate("u2", copy("c", "a/b", "u1"))
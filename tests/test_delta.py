@@ -0,0 +1,82 @@
+import random
+from pathlib import Path
+
+import pytest
+
+from src.strategy.increment.delta import (
+    DELTA_HEADER,
+    DELTA_MAGIC,
+    Signature,
+    apply_delta,
+    make_delta,
+    make_signature,
+)
+from src.utils import get_hash
+
+BLOCK = 4096
+
+
+def write(fp: Path, data: bytes) -> Path:
+    fp.write_bytes(data)
+    return fp
+
+
+@pytest.fixture
+def base(tmp_path: Path) -> Path:
+    return write(tmp_path / "base.bin", random.Random(7685).randbytes(BLOCK * 64))
+
+
+def roundtrip(tmp_path: Path, base: Path, data: bytes) -> int:
+    new = write(tmp_path / "new.bin", data)
+    delta, out = tmp_path / "delta.bin", tmp_path / "out.bin"
+    signature, size = make_delta(new, make_signature(base, "md5", BLOCK), delta)
+
+    apply_delta(base, delta, out)
+    assert out.read_bytes() == data
+    assert size == delta.stat().st_size
+    assert signature == make_signature(new, "md5", BLOCK)
+    assert signature.md5 == get_hash(new)
+    return size
+
+
+def test_identical_file_only_copies(tmp_path: Path, base: Path) -> None:
+    size = roundtrip(tmp_path, base, base.read_bytes())
+    # 文件头与一条合并后的复制指令
+    assert size == len(DELTA_MAGIC) + DELTA_HEADER.size + 1 + 8
+
+
+def test_append_and_modify(tmp_path: Path, base: Path) -> None:
+    data = bytearray(base.read_bytes())
+    data[BLOCK * 10 : BLOCK * 10 + 16] = b"x" * 16
+    data += b"appended log line\n" * 100
+    size = roundtrip(tmp_path, base, bytes(data))
+    assert size < BLOCK * 3
+
+
+def test_reordered_and_truncated(tmp_path: Path, base: Path) -> None:
+    data = base.read_bytes()
+    roundtrip(tmp_path, base, data[BLOCK * 32 :] + data[: BLOCK * 8 + 123])
+    roundtrip(tmp_path, base, b"")
+
+
+def test_signature_dump_load(tmp_path: Path, base: Path) -> None:
+    signature = make_signature(base, "blake2b", BLOCK)
+    signature.dump(tmp_path / "sig" / "base.sig")
+    assert Signature.load(tmp_path / "sig" / "base.sig") == signature
+
+    assert Signature.load(tmp_path / "missing.sig") is None
+    assert Signature.load(write(tmp_path / "bad.sig", b"not a signature")) is None
+
+
+def test_apply_rejects_bad_input(tmp_path: Path, base: Path) -> None:
+    new = write(tmp_path / "new.bin", base.read_bytes() + b"tail")
+    delta, out = tmp_path / "delta.bin", tmp_path / "out.bin"
+    make_delta(new, make_signature(base, "md5", BLOCK), delta)
+
+    with pytest.raises(ValueError):
+        apply_delta(base, write(tmp_path / "bad.bin", b"garbage"), out)
+
+    # 基准版本与签名不一致
+    short = write(tmp_path / "short.bin", base.read_bytes()[: BLOCK * 4])
+    with pytest.raises(ValueError):
+        apply_delta(short, delta, out)
@@ -0,0 +1,64 @@
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import Iterator
+
+from src.utils import Hasher, HashJob
+from src.utils.hasher import BATCH_COUNT, SMALL_FILE_SIZE, _make_batches
+
+
+def job(name: str, size: int) -> HashJob:
+    return (Path(name), Path(name), "md5", size)
+
+
+def test_small_files_batched_large_files_alone() -> None:
+    jobs = [job("a", 10), job("big", SMALL_FILE_SIZE), job("b", 20), job("c", 30)]
+    batches = [[j[0].name for j in batch] for batch in _make_batches(jobs)]
+    assert batches == [["big"], ["a", "b", "c"]]
+
+
+def test_batch_count_limit() -> None:
+    jobs = [job(str(i), 1) for i in range(BATCH_COUNT + 1)]
+    sizes = [len(batch) for batch in _make_batches(jobs)]
+    assert sizes == [BATCH_COUNT, 1]
+
+
+def test_run_from_generator(tmp_path: Path) -> None:
+    expect = {}
+    for i in range(50):
+        data = bytes([i]) * (i * 1000)
+        (tmp_path / str(i)).write_bytes(data)
+        expect[Path(str(i))] = hashlib.md5(data).hexdigest()
+
+    # 任务由生成器产生, 在线程中逐批取出
+    def jobs() -> Iterator[HashJob]:
+        for key in expect:
+            fp = tmp_path / key
+            yield key, fp, "md5", fp.stat().st_size
+
+    hasher = Hasher(workers=2)
+    assert asyncio.run(hasher.run(jobs())) == expect
+    assert hasher.stats.files == 50
+    assert hasher.stats.bytes == sum(i * 1000 for i in range(50))
+
+
+def test_run_empty() -> None:
+    hasher = Hasher()
+    assert asyncio.run(hasher.run([])) == {}
+    assert hasher.stats.files == 0
+
+
+def test_tee_filter(tmp_path: Path) -> None:
+    src = tmp_path / "src"
+    src.mkdir()
+    for name in ("a", "b"):
+        (src / name).write_bytes(name.encode() * 100)
+
+    tee = tmp_path / "tee"
+    jobs = [(Path(n), src / n, "md5", 100) for n in ("a", "b")]
+    hasher = Hasher(tee=tee, tee_filter=lambda p: p.name == "a")
+    result = asyncio.run(hasher.run(jobs))
+
+    assert result[Path("b")] == hashlib.md5(b"b" * 100).hexdigest()
+    assert (tee / "a").read_bytes() == b"a" * 100
+    assert not (tee / "b").exists()
@@ -0,0 +1,62 @@
+from pathlib import Path
+
+import pytest
+
+from src.utils import PathFilter
+from src.utils.path_filter import compile_rule
+
+
+@pytest.mark.parametrize("pattern", ["", "   ", "# comment", "/", "!"])
+def test_ignored_rules(pattern: str) -> None:
+    assert compile_rule(pattern) is None
+
+
+@pytest.mark.parametrize(
+    ("pattern", "path", "matched"),
+    [
+        ("*.log", "a.log", True),
+        ("*.log", "x/y/a.log", True),
+        ("*.log", "a.log/b", False),
+        ("/build", "build", True),
+        ("/build", "src/build", False),
+        ("docs/*.md", "docs/a.md", True),
+        ("docs/*.md", "docs/sub/a.md", False),
+        ("docs/**/*.md", "docs/sub/a.md", True),
+        ("docs/**", "docs/a/b", True),
+        ("**/cache", "a/b/cache", True),
+        ("file?.txt", "file1.txt", True),
+        ("file?.txt", "file10.txt", False),
+        ("[!a]*.txt", "b.txt", True),
+        ("[!a]*.txt", "a.txt", False),
+        ("a+b(1).txt", "a+b(1).txt", True),
+    ],
+)
+def test_compile_rule(pattern: str, path: str, matched: bool) -> None:
+    rule = compile_rule(pattern)
+    assert rule is not None
+    assert bool(rule[0].fullmatch(path)) is matched
+
+
+def test_exclude_and_negate() -> None:
+    f = PathFilter(["*.log", "!keep.log", "tmp/"])
+    assert f.skip_file(Path("x/a.log"))
+    assert not f.skip_file(Path("x/keep.log"))
+    assert f.skip_dir(Path("a/tmp"))
+    # `/` 结尾的规则只匹配目录
+    assert not f.skip_file(Path("a/tmp"))
+
+
+def test_include_and_max_size() -> None:
+    f = PathFilter(include=["*.py", "/data/"], max_size=100)
+    assert not f.skip_file(Path("src/main.py"), 10)
+    assert not f.skip_file(Path("data/sub/blob.bin"), 10)
+    assert f.skip_file(Path("src/readme.md"), 10)
+    assert f.skip_file(Path("src/huge.py"), 101)
+    assert not PathFilter() and f
+
+
+def test_skip_path_checks_parents() -> None:
+    f = PathFilter(["node_modules/", "!node_modules/keep.js"])
+    assert f.skip_path(Path("a/node_modules/keep.js"), False)
+    assert f.skip_path(Path("node_modules"), True)
+    assert not f.skip_path(Path("a/src/keep.js"), False)
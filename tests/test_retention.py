@@ -0,0 +1,57 @@
+from datetime import datetime, timedelta
+from typing import List
+
+from src.config import RetentionConfig
+from src.models import BackupRecord
+from src.strategy.retention import prune_ranges, select_retained
+
+NOW = datetime(2024, 6, 15, 12, 0)
+
+
+def make_records(*ages: timedelta) -> List[BackupRecord]:
+    """按距离 `NOW` 的时间创建备份记录, uuid 为序号"""
+    times = sorted(NOW - age for age in ages)
+    return [
+        BackupRecord(uuid=str(i), timestamp=t.timestamp(), timestr=str(t))
+        for i, t in enumerate(times)
+    ]
+
+
+def hours(*values: float) -> List[timedelta]:
+    return [timedelta(hours=v) for v in values]
+
+
+def test_disabled_keeps_everything() -> None:
+    records = make_records(*hours(1, 2, 3))
+    assert select_retained(records, RetentionConfig(), NOW) == {"0", "1", "2"}
+    assert select_retained([], RetentionConfig(keep_last=1), NOW) == set()
+
+
+def test_keep_last() -> None:
+    records = make_records(*hours(1, 2, 3, 4))
+    kept = select_retained(records, RetentionConfig(keep_last=2), NOW)
+    assert kept == {"2", "3"}
+
+
+def test_hourly_and_daily_buckets() -> None:
+    # 同一小时内的多个备份只保留最新的一个
+    records = make_records(*hours(0.1, 0.2, 0.7, 1.5, 26, 27, 50))
+    kept = select_retained(records, RetentionConfig(hourly=2), NOW)
+    assert kept == {"3", "6"}
+
+    kept = select_retained(records, RetentionConfig(daily=2), NOW)
+    assert kept == {"2", "6"}
+
+
+def test_max_age_and_latest_always_kept() -> None:
+    records = make_records(*hours(1, 30, 80))
+    assert select_retained(records, RetentionConfig(max_age=2), NOW) == {"1", "2"}
+
+    records = make_records(*hours(100, 200))
+    assert select_retained(records, RetentionConfig(max_age=1), NOW) == {"1"}
+
+
+def test_prune_ranges() -> None:
+    records = make_records(*hours(1, 2, 3, 4, 5, 6))
+    assert prune_ranges(records, {"1", "2", "5"}) == [["0", "1"], ["3", "4", "5"]]
+    assert prune_ranges(records, {r.uuid for r in records}) == []
@@ -0,0 +1,46 @@
+import os
+import time
+from pathlib import Path
+
+from src.utils import StatCache
+
+
+def touch(fp: Path, age: float) -> os.stat_result:
+    fp.write_bytes(b"data")
+    mtime = time.time() - age
+    os.utime(fp, (mtime, mtime))
+    return fp.stat()
+
+
+def test_racy_mtime_not_cached(tmp_path: Path) -> None:
+    cache = StatCache(tmp_path / "stat.json")
+    st = touch(tmp_path / "new.txt", 0)
+    cache.set(Path("new.txt"), st, "digest")
+    assert cache.get(Path("new.txt"), st) is None
+
+    st = touch(tmp_path / "old.txt", 60)
+    cache.set(Path("old.txt"), st, "digest")
+    assert cache.get(Path("old.txt"), st) == "digest"
+    assert cache.get(Path("old.txt"), st, "blake2b") is None
+
+
+def test_stat_change_and_roundtrip(tmp_path: Path) -> None:
+    fp = tmp_path / "stat.json"
+    cache = StatCache(fp)
+    st = touch(tmp_path / "a.txt", 60)
+    cache.set(Path("a.txt"), st, "a")
+    cache.set(Path("b.txt"), touch(tmp_path / "b.txt", 60), "b")
+    cache.retain([Path("a.txt")])
+    cache.save()
+
+    loaded = StatCache(fp)
+    assert loaded.get(Path("a.txt"), st) == "a"
+    assert loaded.get(Path("b.txt"), (tmp_path / "b.txt").stat()) is None
+    assert loaded.get(Path("a.txt"), touch(tmp_path / "a.txt", 30)) is None
+
+
+def test_corrupted_cache_is_ignored(tmp_path: Path) -> None:
+    fp = tmp_path / "stat.json"
+    fp.write_text("{not json")
+    st = touch(tmp_path / "a.txt", 60)
+    assert StatCache(fp).get(Path("a.txt"), st) is None
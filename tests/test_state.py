@@ -0,0 +1,65 @@
+from pathlib import Path
+
+from src.models import BackupUpdate
+from src.strategy.increment.state import (
+    StateCache,
+    UpdateState,
+    apply_updates,
+    entry_type,
+    remap_state,
+)
+
+
+def update(
+    path: str, kind: str = "file", md5: str = "", source: str = ""
+) -> BackupUpdate:
+    return BackupUpdate.model_validate(
+        {"type": kind, "path": Path(path), "md5": md5, "source": source}
+    )
+
+
+def make_state() -> UpdateState:
+    state: UpdateState = {}
+    apply_updates(state, "u1", [update("a", md5="1"), update("d", "dir")])
+    apply_updates(state, "u2", [update("b", md5="2"), update("a", md5="3")])
+    apply_updates(state, "u3", [update("c", "copy", "4", "b"), update("d", "del")])
+    return state
+
+
+def test_apply_updates() -> None:
+    state = make_state()
+    assert {p.as_posix(): uuid for p, (uuid, _) in state.items()} == {
+        "a": "u2",
+        "b": "u2",
+        "c": "u3",
+    }
+    assert state[Path("a")][1].md5 == "3"
+    assert entry_type(state[Path("c")][1]) == "file"
+
+
+def test_remap_state() -> None:
+    state = make_state()
+    replaced = update("c", md5="4")
+    res = remap_state(state, {"u1", "u3"}, "merged", {Path("c"): replaced})
+
+    assert res[Path("a")][0] == "u2"
+    assert res[Path("b")][0] == "u2"
+    assert res[Path("c")] == ("merged", replaced)
+    # 不修改原状态
+    assert state[Path("c")][0] == "u3"
+
+    res = remap_state(state, {"u2"}, "merged")
+    assert res[Path("a")] == ("merged", state[Path("a")][1])
+
+
+def test_state_cache_roundtrip(tmp_path: Path) -> None:
+    cache = StateCache(tmp_path / "state" / "state.json")
+    assert cache.load(["u1"]) == (0, {})
+
+    state = make_state()
+    cache.save(["u1", "u2", "u3"], state)
+    assert cache.load(["u1", "u2", "u3", "u4"]) == (3, state)
+
+    # 备份记录链被改写 (如合并) 后缓存失效
+    assert cache.load(["merged", "u3", "u4"]) == (0, {})
+    assert cache.load(["u4"]) == (0, {})
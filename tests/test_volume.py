@@ -0,0 +1,165 @@
+from pathlib import Path
+from typing import Dict, List
+
+from src.strategy.increment.volume import (
+    SIGNATURE_HEADER_SIZE,
+    build_index,
+    required_volumes,
+)
+from src.utils.archives.archives import _parse_listing
+
+# p7zip 16.02 `7z l -slt` 读取 1 MB 分卷压缩包的输出
+SLT_OUTPUT = """
+7-Zip [64] 16.02 : Copyright (c) 1999-2016 Igor Pavlov : 2016-05-21
+p7zip Version 16.02 (locale=C.UTF-8,Utf16=on,HugeFiles=on,64 bits,4 CPUs x64)
+
+Scanning the drive for archives:
+1 file, 1048576 bytes (1024 KiB)
+
+Listing archive: backup.7z.001
+
+--
+Path = backup.7z.001
+Type = Split
+Physical Size = 1048576
+Volumes = 3
+Total Physical Size = 2623110
+----
+Path = backup.7z
+Size = 2623110
+--
+Path = backup.7z
+Type = 7z
+Physical Size = 2623110
+Headers Size = 278
+Method = LZMA2:24 7zAES
+Solid = +
+Blocks = 2
+
+----------
+Path = data/big.bin
+Size = 2621440
+Packed Size = 2621568
+Modified = 2024-06-15 12:00:00
+Attributes = A_ -rw-r--r--
+CRC = 5A3B9C1D
+Encrypted = +
+Method = LZMA2:24 7zAES:19
+Block = 0
+
+Path = data/notes.txt
+Size = 5000
+Packed Size = 1232
+Modified = 2024-06-15 12:00:00
+Attributes = A_ -rw-r--r--
+CRC = 0F1E2D3C
+Encrypted = +
+Method = LZMA2:24 7zAES:19
+Block = 1
+
+Path = data/readme.md
+Size = 800
+Packed Size = 
+Modified = 2024-06-15 12:00:00
+Attributes = A_ -rw-r--r--
+CRC = 1A2B3C4D
+Encrypted = +
+Method = LZMA2:24 7zAES:19
+Block = 1
+
+Path = data/empty
+Size = 0
+Packed Size = 0
+Modified = 2024-06-15 12:00:00
+Attributes = A_ -rw-r--r--
+CRC = 
+Encrypted = -
+Method = 
+Block = 
+
+Path = data
+Size = 0
+Packed Size = 0
+Modified = 2024-06-15 12:00:00
+Attributes = D_ drwxr-xr-x
+CRC = 
+Encrypted = -
+Method = 
+Block = 
+
+"""
+
+VOLUMES = [f"archive.7z.{i:03d}" for i in range(1, 6)]
+SIZE = 100
+
+
+def item(path: str, block: str = "", packed: str = "", **extra: str) -> Dict[str, str]:
+    return {"Path": path, "Block": block, "Packed Size": packed, **extra}
+
+
+def make_items() -> List[Dict[str, str]]:
+    # 数据块 0: 32-150, 数据块 1: 150-330, 数据块 2: 330-340
+    return [
+        item("d", Attributes="D_ drwxr-xr-x"),
+        item("d/a", "0", "118"),
+        item("d/b", "0"),
+        item("c", "1", "180"),
+        item("e"),
+        item("f", "2", "10"),
+    ]
+
+
+def test_build_index() -> None:
+    index = build_index(make_items(), VOLUMES, SIZE)
+    assert index is not None
+    assert index.files == {"d/a": 0, "d/b": 0, "c": 1, "e": -1, "f": 2}
+    assert [(b.offset, b.size) for b in index.blocks] == [
+        (SIGNATURE_HEADER_SIZE, 118),
+        (150, 180),
+        (330, 10),
+    ]
+
+
+def test_build_index_incomplete() -> None:
+    assert build_index([], VOLUMES, SIZE) is None
+    # 缺少数据块大小
+    items = [i for i in make_items() if i["Path"] != "c"]
+    assert build_index(items, VOLUMES, SIZE) is None
+
+
+def test_required_volumes() -> None:
+    index = build_index(make_items(), VOLUMES, SIZE)
+    assert index is not None
+
+    # 第一个分卷与数据块之后的压缩包头总是需要
+    assert required_volumes(index, [Path("e")]) == {0, 3, 4}
+    assert required_volumes(index, [Path("d/a")]) == {0, 1, 3, 4}
+    assert required_volumes(index, [Path("c")]) == {0, 1, 2, 3, 4}
+    assert required_volumes(index, [Path("f")]) == {0, 3, 4}
+
+
+def test_required_volumes_unknown_file() -> None:
+    index = build_index(make_items(), VOLUMES, SIZE)
+    assert index is not None
+    assert required_volumes(index, [Path("d/a"), Path("x")]) == set(range(5))
+
+
+def test_index_from_7z_listing() -> None:
+    volumes = ["backup.7z.001", "backup.7z.002", "backup.7z.003"]
+    index = build_index(_parse_listing(SLT_OUTPUT), volumes, 1024 * 1024)
+    assert index is not None
+    assert index.files == {
+        "data/big.bin": 0,
+        "data/notes.txt": 1,
+        "data/readme.md": 1,
+        "data/empty": -1,
+    }
+    assert [(b.offset, b.size) for b in index.blocks] == [
+        (SIGNATURE_HEADER_SIZE, 2621568),
+        (SIGNATURE_HEADER_SIZE + 2621568, 1232),
+    ]
+    # 数据块与压缩包头之和等于压缩包大小
+    assert index.blocks[-1].offset + index.blocks[-1].size + 278 == 2623110
+
+    assert required_volumes(index, [Path("data/notes.txt")]) == {0, 2}
+    assert required_volumes(index, [Path("data/big.bin")]) == {0, 1, 2}
@@ -0,0 +1,59 @@
+import os
+from pathlib import Path
+from typing import Dict
+
+import pytest
+
+from src.utils import walk_tree
+
+
+@pytest.fixture
+def tree(tmp_path: Path) -> Path:
+    for d in ("a/b/c", "a/d", "e"):
+        (tmp_path / d).mkdir(parents=True)
+    for f in ("f", "a/g", "a/b/h", "a/b/c/i", "a/d/j"):
+        (tmp_path / f).write_text(f)
+    return tmp_path
+
+
+def walk(root: Path, workers: int = 0, start: Path = Path()) -> Dict[str, str]:
+    return {p.as_posix(): t for t, p, _ in walk_tree(root, workers, start=start)}
+
+
+def test_matches_os_walk(tree: Path) -> None:
+    expect: Dict[str, str] = {}
+    for dirpath, dirs, files in os.walk(tree):
+        relp = Path(dirpath).relative_to(tree)
+        expect.update(((relp / d).as_posix(), "dir") for d in dirs)
+        expect.update(((relp / f).as_posix(), "file") for f in files)
+
+    assert walk(tree) == expect
+    assert walk(tree, workers=1) == expect
+
+
+def test_stat_results(tree: Path) -> None:
+    for t, p, st in walk_tree(tree):
+        if t == "dir":
+            assert st is None
+        else:
+            assert st is not None and st.st_size == len(p.as_posix())
+
+
+def test_start_subdir(tree: Path) -> None:
+    assert walk(tree, start=Path("a/b")) == {
+        "a/b/c": "dir",
+        "a/b/h": "file",
+        "a/b/c/i": "file",
+    }
+
+
+@pytest.mark.skipif(os.name == "nt", reason="需要创建符号链接")
+def test_symlinks_not_followed(tree: Path) -> None:
+    (tree / "link").symlink_to(tree / "a", target_is_directory=True)
+    (tree / "broken").symlink_to(tree / "missing")
+
+    res = {p.as_posix(): (t, st) for t, p, st in walk_tree(tree)}
+    assert res["link"][0] == "file"
+    assert not any(p.startswith("link/") for p in res)
+    # 失效的符号链接无法 stat
+    assert res["broken"] == ("file", None)
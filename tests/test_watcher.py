@@ -0,0 +1,107 @@
+import asyncio
+from pathlib import Path
+from typing import Optional, Set, Tuple
+
+import pytest
+
+from src.utils import WATCH_SUPPORTED, Journal, PathFilter, Watcher, watcher
+
+
+def test_journal_invalid_until_drained() -> None:
+    journal = Journal()
+    journal.add(Path("a"))
+    assert journal.drain() is None
+
+    # 开始监视后第一次取出时记录无效, 需要完整遍历
+    journal.watching = True
+    journal.add(Path("a"))
+    assert journal.drain() is None
+
+    journal.add(Path("a"))
+    journal.add(Path("b"))
+    assert journal.drain() == {Path("a"), Path("b")}
+    assert journal.drain() == set()
+
+
+def test_journal_invalidate() -> None:
+    journal = Journal()
+    journal.watching = True
+    journal.drain()
+
+    journal.add(Path("a"))
+    journal.invalidate()
+    journal.add(Path("b"))
+    assert journal.drain() is None
+    assert journal.drain() == set()
+
+
+def test_journal_overflow(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(watcher, "MAX_CHANGES", 10)
+    journal = Journal()
+    journal.watching = True
+    journal.drain()
+
+    for i in range(10):
+        journal.add(Path(str(i)))
+    assert journal.drain() is not None
+
+    for i in range(11):
+        journal.add(Path(str(i)))
+    assert journal.drain() is None
+
+
+async def collect(root: Path) -> Optional[Set[Path]]:
+    journal = Journal()
+    w = Watcher(root, journal)
+    await w.start()
+    try:
+        journal.drain()
+        (root / "a" / "new").write_text("new")
+        (root / "b").mkdir()
+        await asyncio.sleep(0.1)
+        # 新建目录中的文件同样被监视
+        (root / "b" / "c").write_text("c")
+        await asyncio.sleep(0.1)
+        return journal.drain()
+    finally:
+        w.stop()
+        assert not journal.watching
+
+
+@pytest.mark.skipif(not WATCH_SUPPORTED, reason="需要 inotify")
+def test_watcher_records_changes(tmp_path: Path) -> None:
+    (tmp_path / "a").mkdir()
+    assert asyncio.run(collect(tmp_path)) == {
+        Path("a/new"),
+        Path("b"),
+        Path("b/c"),
+    }
+
+
+async def collect_filtered(root: Path) -> Tuple[Set[Path], Optional[Set[Path]]]:
+    journal = Journal()
+    w = Watcher(root, journal, PathFilter(["node_modules/", ".*", "build/"]))
+    await w.start()
+    try:
+        watched = set(w._Watcher__wds.values())  # type: ignore[attr-defined]
+        journal.drain()
+        (root / "node_modules" / "x" / "new").write_text("new")
+        (root / "build").mkdir()
+        await asyncio.sleep(0.1)
+        (root / "build" / "out").write_text("out")
+        (root / "a" / "new").write_text("new")
+        await asyncio.sleep(0.1)
+        return watched, journal.drain()
+    finally:
+        w.stop()
+
+
+@pytest.mark.skipif(not WATCH_SUPPORTED, reason="需要 inotify")
+def test_watcher_skips_excluded_dirs(tmp_path: Path) -> None:
+    for d in ("a/b", "node_modules/x", ".cache"):
+        (tmp_path / d).mkdir(parents=True)
+
+    watched, changes = asyncio.run(collect_filtered(tmp_path))
+    # 被排除的目录不添加监视, 其中的变化不被记录
+    assert watched == {Path(), Path("a"), Path("a/b")}
+    assert changes == {Path("build"), Path("a/new")}